@@ -0,0 +1,113 @@
+# analytics.py - Booking rollups: per-booking deltas and the vectorized full rebuild
+
+# Reports read one row per (booking kind, item, departure month) holding
+# the number of bookings, how many of them were cancelled, and the people
+# and revenue of the ones still active. Each booking write adds its delta
+# to the row it falls in (see bookings.py), and `flask analytics rebuild`
+# recomputes every row from a scan of the booking tables with NumPy, so a
+# report's cost depends on the catalog size and date range, never on how
+# many bookings there are.
+
+import numpy as np
+
+MEASURES = ('bookings', 'cancellations', 'people', 'revenue')
+GROUPS = ('trek', 'package', 'region', 'month')
+
+# item_id * MONTH_SPAN + month index gives one integer key per rollup row
+MONTH_SPAN = 12 * 10000
+
+
+def month_label(year, month):
+    return f'{int(year):04d}-{int(month):02d}'
+
+
+def contribution(status, people, total_price):
+    """(bookings, cancellations, people, revenue) one booking adds to its rollup row"""
+    if status == 'cancelled':
+        return (1, 1, 0, 0.0)
+    return (1, 0, people or 0, total_price or 0.0)
+
+
+def booking_delta(old, new):
+    """Changes to rollup rows when a booking goes from state old to new.
+
+    old and new are (item_id, month, status, people, total_price) or None
+    for "didn't exist". Returns [((item_id, month), measures)] with zero
+    deltas left out.
+    """
+    deltas = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None:
+            continue
+        item_id, month, status, people, total_price = state
+        values = contribution(status, people, total_price)
+        current = deltas.get((item_id, month), (0, 0, 0, 0.0))
+        deltas[(item_id, month)] = tuple(a + sign * b for a, b in zip(current, values))
+    return [(key, values) for key, values in deltas.items() if any(values)]
+
+
+class RollupBuilder:
+    """Aggregate booking rows, chunk by chunk, into rollup rows.
+
+    Each chunk is an array-like of (item_id, year, month, cancelled,
+    people, total_price) rows. Chunks are reduced to one partial row per
+    key as they arrive, so memory depends on the number of rollup rows,
+    not on the number of bookings.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._sums = []
+
+    def add(self, rows):
+        # Plain tuples: NumPy probes other sequence types (database rows) for the array protocol item by item
+        data = np.array(list(map(tuple, rows)), dtype=np.float64)
+        if not len(data):
+            return
+        data = np.nan_to_num(data)  # NULL people/total_price count as 0
+        item_id, year, month, cancelled, people, price = data.T
+        active = 1.0 - cancelled
+        keys = item_id.astype(np.int64) * MONTH_SPAN + (year.astype(np.int64) * 12 + month.astype(np.int64) - 1)
+        self._reduce(keys, np.stack([np.ones_like(cancelled), cancelled, people * active, price * active]))
+
+    def _reduce(self, keys, values):
+        unique, inverse = np.unique(keys, return_inverse=True)
+        sums = np.stack([np.bincount(inverse, weights=row, minlength=len(unique)) for row in values])
+        self._keys.append(unique)
+        self._sums.append(sums)
+
+    def rows(self, kind):
+        """Rollup rows as dicts ready for an INSERT"""
+        if not self._keys:
+            return []
+        if len(self._keys) > 1:
+            keys, sums = np.concatenate(self._keys), np.concatenate(self._sums, axis=1)
+            self._keys, self._sums = [], []
+            self._reduce(keys, sums)
+        keys, sums = self._keys[0], self._sums[0]
+        item_ids, month_index = np.divmod(keys, MONTH_SPAN)
+        years, months = np.divmod(month_index, 12)
+        return [
+            {'kind': kind, 'item_id': int(item_id), 'month': month_label(year, month + 1),
+             'bookings': int(bookings), 'cancellations': int(cancellations), 'people': int(people),
+             'revenue': round(float(revenue), 2)}
+            for item_id, year, month, bookings, cancellations, people, revenue
+            in zip(item_ids, years, months, *sums)
+        ]
+
+
+def summarize(rows):
+    """Report lines from (key, label, bookings, cancellations, people, revenue) sums"""
+    report = []
+    for key, label, bookings, cancellations, people, revenue in rows:
+        bookings, cancellations = int(bookings or 0), int(cancellations or 0)
+        report.append({
+            'key': key,
+            'label': label,
+            'bookings': bookings,
+            'cancellations': cancellations,
+            'cancellation_rate': round(cancellations / bookings, 4) if bookings else 0.0,
+            'people': int(people or 0),
+            'revenue': round(float(revenue or 0), 2),
+        })
+    return report
@@ -0,0 +1,103 @@
+# api.py - Sparse fieldsets and JSON/MessagePack encoding for the /api/v1 endpoints
+
+# Records handed to the API are the namedtuples the pages already use
+# (catalog snapshots, timeline entries), so a response is a list of small
+# dicts built straight from tuples and encoded in one call. orjson and
+# msgpack are used when installed; without orjson the standard json module
+# gives the same output more slowly, and without msgpack only JSON is offered.
+
+from datetime import date, datetime
+from operator import itemgetter
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+# Names clients send in ?format= or Accept; x-msgpack is the older, common spelling
+FORMAT_NAMES = {'json': JSON, 'msgpack': MSGPACK}
+MSGPACK_ALIASES = ('application/x-msgpack',)
+
+MAX_LIMIT = 100  # records per page
+
+
+class FieldError(ValueError):
+    """A ?fields= parameter naming fields the resource doesn't have"""
+
+
+def parse_fields(value, available, default):
+    """Field names from a comma-separated ?fields= value, in the order given"""
+    if not value:
+        return default
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise FieldError(f"unknown field(s): {', '.join(unknown)}; available: {', '.join(available)}")
+    return fields or default
+
+
+def projector(record_fields, fields):
+    """Return a function turning a record (tuple with record_fields) into a dict of fields"""
+    indexes = [record_fields.index(name) for name in fields]
+    if len(indexes) == 1:
+        index, name = indexes[0], fields[0]
+        return lambda record: {name: record[index]}
+    getter = itemgetter(*indexes)
+    return lambda record: dict(zip(fields, getter(record)))
+
+
+def available_mimetypes():
+    return (JSON, MSGPACK) if msgpack is not None else (JSON,)
+
+
+def negotiate(accept_mimetypes, format_name=None):
+    """Response mimetype for a request, or None if the requested format can't be produced.
+
+    An explicit ?format= wins over the Accept header; anything that doesn't
+    ask for MessagePack gets JSON.
+    """
+    if format_name:
+        mimetype = FORMAT_NAMES.get(format_name)
+        return mimetype if mimetype in available_mimetypes() else None
+    if msgpack is None:
+        return JSON
+    best = accept_mimetypes.best_match((JSON, MSGPACK) + MSGPACK_ALIASES, default=JSON)
+    return JSON if best == JSON else MSGPACK
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not serializable")
+
+
+def encode(payload, mimetype):
+    """Serialize payload to bytes; dates become ISO 8601 strings in both formats"""
+    if mimetype == MSGPACK:
+        return msgpack.packb(payload, default=_default, datetime=False)
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def decode(data, mimetype):
+    """Parse a request body; raises ValueError if it isn't valid for mimetype"""
+    if mimetype == MSGPACK or mimetype in MSGPACK_ALIASES:
+        if msgpack is None:
+            raise ValueError("MessagePack bodies are not supported on this server")
+        try:
+            return msgpack.unpackb(data)
+        except Exception as e:
+            raise ValueError(f"not valid MessagePack: {e}")
+    try:
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    except ValueError as e:
+        raise ValueError(f"not valid JSON: {e}")
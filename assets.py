@@ -0,0 +1,281 @@
+# assets.py - Vendored, bundled, minified and precompressed CSS/JS
+
+# base.html used to pull Bootstrap, Font Awesome and jQuery from three CDNs
+# and the site's own CSS/JS unminified with no cache busting. `flask
+# build-assets` concatenates everything into one stylesheet and one script
+# named after a hash of their content, writes .gz/.br copies next to them
+# and records the names in a manifest base.html reads. Vendor files are
+# fetched once from pinned CDN URLs into assets/vendor/.
+
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import threading
+import urllib.parse
+import urllib.request
+
+MANIFEST_VERSION = 1
+
+# (path under assets/vendor, pinned CDN URL); files a stylesheet references
+# with url() (Font Awesome's webfonts) are fetched alongside it
+VENDOR = [
+    ('bootstrap/css/bootstrap.min.css', 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css'),
+    ('bootstrap/js/bootstrap.bundle.min.js', 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js'),
+    ('fontawesome/css/all.min.css', 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css'),
+]
+
+# bundle -> sources, relative to the project root, in load order. jQuery is
+# not bundled: nothing in templates or script.js uses it
+BUNDLES = {
+    'app.css': ['assets/vendor/bootstrap/css/bootstrap.min.css',
+                'assets/vendor/fontawesome/css/all.min.css',
+                'static/css/style.css'],
+    'app.js': ['assets/vendor/bootstrap/js/bootstrap.bundle.min.js',
+               'static/js/script.js'],
+}
+
+# Font Awesome stylesheets whose per-icon rules are trimmed to the icons in use
+ICON_STYLESHEETS = ('assets/vendor/fontawesome/css/all.min.css',)
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ttf')
+
+_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_SOURCE_MAP_RE = re.compile(r'/\*# sourceMappingURL=[^*]*\*/|^//# sourceMappingURL=.*$', re.MULTILINE)
+_CHARSET_RE = re.compile(r'@charset\s+"[^"]*";')
+_ICON_USE_RE = re.compile(r'\bfa-[a-z0-9-]+')
+_ICON_SELECTOR_RE = re.compile(r'^\.(fa-[a-z0-9-]+)::?(?:before|after)$')
+
+
+def _local_refs(css):
+    """Relative url() references in a stylesheet (not data: or absolute URLs)"""
+    return [ref for _, ref in _URL_RE.findall(css)
+            if not ref.startswith(('data:', 'http:', 'https:', '//', '/', '#'))]
+
+
+def fetch_vendor(root, force=False, log=print):
+    """Download missing vendor files (and the fonts their CSS uses) into assets/vendor"""
+    vendor_dir = os.path.join(root, 'assets', 'vendor')
+    pending = list(VENDOR)
+    fetched = 0
+    while pending:
+        path, url = pending.pop(0)
+        target = os.path.join(vendor_dir, path)
+        if force or not os.path.exists(target):
+            with urllib.request.urlopen(url, timeout=30) as response:
+                data = response.read()
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            fetched += 1
+            log(f"fetched {url} ({len(data) // 1024} KB)")
+        if path.endswith('.css'):
+            with open(target, encoding='utf-8') as f:
+                css = f.read()
+            for ref in dict.fromkeys(ref.split('?')[0].split('#')[0] for ref in _local_refs(css)):
+                pending.append((posixpath.normpath(posixpath.join(posixpath.dirname(path), ref)),
+                                urllib.parse.urljoin(url, ref)))
+    return fetched
+
+
+def icons_in_use(root, dirs=('templates', 'static/js')):
+    """Every fa-* class name written in the templates and scripts"""
+    used = set()
+    for directory in dirs:
+        for dirpath, _, filenames in os.walk(os.path.join(root, directory)):
+            for name in filenames:
+                with open(os.path.join(dirpath, name), encoding='utf-8', errors='ignore') as f:
+                    used.update(_ICON_USE_RE.findall(f.read()))
+    return used
+
+
+def _split_rules(css):
+    """Split CSS into top-level (prelude, block) pairs; at-rule blocks stay whole"""
+    rules, start, depth, quote = [], 0, 0, None
+    prelude_end = None
+    i = -1
+    while i + 1 < len(css):
+        i += 1
+        char = css[i]
+        if not quote and css.startswith('/*', i):
+            # Comments (license banners) may contain quotes or braces
+            i = css.find('*/', i + 2)
+            i = len(css) if i == -1 else i + 1
+            continue
+        if quote:
+            if char == quote and css[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((css[start:prelude_end], css[prelude_end:i + 1]))
+                start = i + 1
+        elif char == ';' and depth == 0:
+            # Statement at-rules such as @import
+            rules.append((css[start:i + 1], ''))
+            start = i + 1
+    if css[start:].strip():
+        rules.append((css[start:], ''))
+    return rules
+
+
+def shake_icons(css, used):
+    """Drop `.fa-name:before{content:...}` rules for icons no page uses.
+
+    Only selectors that are nothing but an icon pseudo-element are touched;
+    utility classes (.fa-spin, .fa-3x) and font faces are kept as they are.
+    """
+    kept = []
+    for prelude, block in _split_rules(css):
+        selectors = [selector.strip() for selector in prelude.split(',')]
+        matches = [_ICON_SELECTOR_RE.match(selector) for selector in selectors]
+        if block and selectors and all(matches):
+            selectors = [selector for selector, match in zip(selectors, matches) if match.group(1) in used]
+            if not selectors:
+                continue
+            prelude = ','.join(selectors)
+        kept.append(prelude + block)
+    return ''.join(kept)
+
+
+def _minify(path, text):
+    if '.min.' in os.path.basename(path):
+        return text
+    if path.endswith('.css'):
+        import rcssmin
+        return rcssmin.cssmin(text)
+    import rjsmin
+    return rjsmin.jsmin(text)
+
+
+def _hashed_name(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha1(data).hexdigest()[:10]}{ext}'
+
+
+def _write_output(output_dir, name, data):
+    """Write data and, for text formats, deterministic .gz and .br siblings"""
+    import brotli
+
+    path = os.path.join(output_dir, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    written = [name]
+    if name.endswith(COMPRESSIBLE):
+        # mtime=0 keeps the .gz identical across rebuilds of the same content
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+        written += [name + '.gz', name + '.br']
+    return written
+
+
+def build_assets(root, output_subdir='static/dist', log=print):
+    """Build every bundle into root/output_subdir and write its manifest.
+
+    Files from the previous build are kept until the one after, so pages
+    rendered (and cached) just before a rebuild can still load their assets.
+    """
+    output_dir = os.path.join(root, output_subdir)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    previous = load_manifest(manifest_path)
+    used_icons = icons_in_use(root)
+
+    assets, files = {}, []
+    for bundle, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            path = os.path.join(root, source)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{source} is missing; run `flask build-assets --fetch` first")
+            with open(path, encoding='utf-8') as f:
+                text = _SOURCE_MAP_RE.sub('', f.read())
+            if bundle.endswith('.css'):
+                text = _CHARSET_RE.sub('', text)
+                if source in ICON_STYLESHEETS:
+                    text = shake_icons(text, used_icons)
+                text = _rewrite_urls(root, source, text, output_dir, files)
+            parts.append(_minify(source, text).strip())
+        # Scripts are joined with ';' so a file without a trailing one can't merge into the next
+        joined = '\n'.join(parts) if bundle.endswith('.css') else '\n;'.join(parts)
+        if bundle.endswith('.css'):
+            joined = '@charset "UTF-8";\n' + joined
+        data = joined.encode('utf-8')
+        name = _hashed_name(bundle, data)
+        files += _write_output(output_dir, name, data)
+        assets[bundle] = posixpath.join(posixpath.relpath(output_subdir, 'static'), name)
+        log(f"{bundle}: {len(sources)} files -> {name} ({len(data) // 1024} KB, "
+            f"{os.path.getsize(os.path.join(output_dir, name + '.br')) // 1024} KB brotli)")
+
+    manifest = {'version': MANIFEST_VERSION, 'assets': assets, 'files': sorted(set(files))}
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+    keep = set(files) | set(previous.get('files', ()))
+    for name in os.listdir(output_dir):
+        if name != 'manifest.json' and name not in keep:
+            os.remove(os.path.join(output_dir, name))
+    return manifest
+
+
+def _rewrite_urls(root, source, css, output_dir, files):
+    """Copy files a stylesheet references into output_dir under hashed names"""
+    def replace(match):
+        quote, ref = match.groups()
+        if ref not in refs:
+            return match.group(0)
+        clean = ref.split('?')[0].split('#')[0]
+        path = os.path.normpath(os.path.join(root, os.path.dirname(source), clean))
+        with open(path, 'rb') as f:
+            data = f.read()
+        name = _hashed_name(os.path.basename(clean), data)
+        if name not in files:
+            files.extend(_write_output(output_dir, name, data))
+        return f'url({quote}{name}{quote})'
+
+    refs = set(_local_refs(css))
+    return _URL_RE.sub(replace, css)
+
+
+def load_manifest(path):
+    """Return a manifest dict, or {} if it is missing or from another version"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get('version') == MANIFEST_VERSION else {}
+
+
+class AssetManifest:
+    """Bundle name -> built file, re-read whenever `flask build-assets` rewrites it"""
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, bundle):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._assets = load_manifest(self.path).get('assets', {}) if mtime else {}
+                    self._mtime = mtime
+        return self._assets.get(bundle)
@@ -0,0 +1,183 @@
+"""Concurrency benchmark: booking writes and catalog reads running at the same time.
+
+Starts N writer and N reader processes (like N web workers each taking
+bookings while others browse) against one SQLite file, for each N in
+--workers, and reports throughput, latency and errors for both. Each
+engine profile runs on its own copy of the database:
+
+    sqlite-defaults  rollback journal, synchronous=FULL, 2 MB cache, no mmap
+                     (how the app ran before the engine was configured)
+    tuned            the defaults in database.py: WAL, synchronous=NORMAL, ...
+    tuned-replica    as tuned, with catalog reads sent to DATABASE_REPLICA_URL
+
+Caches are disabled so every read reaches the database.
+
+    python benchmarks/bench_concurrency.py --database /tmp/bench.db --workers 1,2,4,8
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic_data  # noqa: E402
+from bench_routes import _git_commit, _percentile  # noqa: E402
+
+PROFILES = {
+    'sqlite-defaults': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+                        'SQLITE_CACHE_SIZE': '-2000', 'SQLITE_MMAP_SIZE': '0'},
+    'tuned': {},
+    'tuned-replica': {},
+}
+
+
+def _copy_database(source, target):
+    """Consistent copy through the backup API (a WAL file may hold recent commits)"""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+    sqlite3.connect(target).close()
+
+
+def worker(role, index, env, duration, barrier, results):
+    """One process: set up a client, wait for the others, then loop until the deadline"""
+    os.environ.update(env)
+    sys.path.insert(0, synthetic_data.ROOT)
+    from app import create_app
+    from extensions import db
+    from models import Trek
+
+    app = create_app()
+
+    rng = random.Random(index)
+    client = app.test_client()
+    with app.app_context():
+        trek_ids = [trek_id for trek_id, in db.session.query(Trek.id).order_by(Trek.id).limit(200)]
+        trek_slugs = [slug for slug, in db.session.query(Trek.slug).order_by(Trek.id).limit(200)]
+
+    if role == 'write':
+        response = client.post('/login', data={'username': f'user{index + 1}', 'password': synthetic_data.PASSWORD})
+        assert response.status_code == 302, 'benchmark user could not log in'
+        # Writers spread their bookings over the dates a year or more ahead (inside
+        # QUOTE_HORIZON_DAYS), each from its own offset, so departures rarely sell out
+        first = date.today() + timedelta(days=365)
+        spread = max(app.config['QUOTE_HORIZON_DAYS'] - 366, 1)
+        dates = (first + timedelta(days=(index * 37 + n) % spread) for n in itertools.count())
+
+        def make_request():
+            return 'POST', f'/book/{rng.choice(trek_ids)}', {'trek_date': next(dates).isoformat(),
+                                                            'number_of_people': rng.randint(1, 3)}
+    else:
+        def make_request():
+            if rng.random() < 0.5:
+                return 'GET', f'/trek/{rng.choice(trek_slugs)}', None
+            return 'GET', (f"/treks?region={rng.choice(synthetic_data.REGIONS)}"
+                           f"&sort={rng.choice(['price_asc', 'duration_asc', 'default'])}"), None
+
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        method, path, data = make_request()
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        response.get_data()  # streamed pages render while the body is read
+        response.close()
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 500:
+            errors += 1
+    results.put((role, latencies, errors))
+
+
+def run_level(env, workers, duration):
+    """Run `workers` writers and `workers` readers together; returns per-role results"""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers * 2)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(role, index, env, duration, barrier, results))
+                 for role in ('write', 'read') for index in range(workers)]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for role in ('write', 'read'):
+        latencies = sorted(value for r, values, _ in collected if r == role for value in values)
+        ms = [value * 1000 for value in latencies] or [0.0]
+        summary[role] = {
+            'requests': len(latencies),
+            'errors': sum(errors for r, _, errors in collected if r == role),
+            'throughput_rps': round(len(latencies) / duration, 1),
+            'p50_ms': round(_percentile(ms, 50), 2),
+            'p95_ms': round(_percentile(ms, 95), 2),
+            'p99_ms': round(_percentile(ms, 99), 2),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='existing synthetic SQLite database; default: generate one')
+    parser.add_argument('--scale', choices=synthetic_data.SCALES, default='small',
+                        help='size of the generated database when --database is not given')
+    parser.add_argument('--workers', default='1,2,4,8', help='comma-separated writer (and reader) counts')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per level')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='comma-separated engine profiles to run')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='bench-concurrency-')
+    database = args.database
+    if database is None:
+        database = os.path.join(scratch, 'source.db')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + database
+        synthetic_data.populate(*synthetic_data.SCALES[args.scale],
+                                log=lambda message: print(message, file=sys.stderr))
+    levels = [int(n) for n in args.workers.split(',')]
+
+    results = {'meta': {'commit': _git_commit(), 'cpus': os.cpu_count(), 'duration_s': args.duration,
+                        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())},
+               'profiles': {}}
+    for profile in args.profiles.split(','):
+        target = os.path.join(scratch, f'{profile}.db')
+        _copy_database(database, target)
+        env = dict(PROFILES[profile], DATABASE_URL='sqlite:///' + target, METRICS_ENABLED='0',
+                   CATALOG_CACHE_SIZE='0', PAGE_CACHE_SIZE='0')
+        if profile == 'tuned-replica':
+            replica = os.path.join(scratch, 'replica.db')
+            _copy_database(database, replica)
+            env['DATABASE_REPLICA_URL'] = 'sqlite:///' + replica
+        # Switch the copy's journal mode up front rather than racing the workers for it
+        with sqlite3.connect(target) as connection:
+            connection.execute(f"PRAGMA journal_mode={env.get('SQLITE_JOURNAL_MODE', 'WAL')}")
+
+        results['profiles'][profile] = {}
+        for workers in levels:
+            summary = run_level(env, workers, args.duration)
+            results['profiles'][profile][str(workers)] = summary
+            write, read = summary['write'], summary['read']
+            print(f"{profile:<16}{workers:>3} + {workers:<3} writes {write['throughput_rps']:8.1f}/s "
+                  f"p95 {write['p95_ms']:8.2f} ms  {write['errors']:>4} errors   "
+                  f"reads {read['throughput_rps']:8.1f}/s p95 {read['p95_ms']:8.2f} ms  {read['errors']:>4} errors",
+                  file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
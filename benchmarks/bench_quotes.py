@@ -0,0 +1,164 @@
+"""Price quote benchmark: quote engine throughput and the /api/quote endpoint.
+
+Reports:
+
+    compile     building the quote tables from the catalog and price rules
+                (what the first quote after a catalog change pays)
+    engine      QuoteTables.quote() on batches of --batch-sizes random
+                (kind, item, date, party size) quotes given as Python lists,
+                the way the endpoint passes them: quotes/s and ms per batch
+    endpoint    POST /api/quote with --endpoint-batch quotes and GET
+                /api/quote for one, through the test client (JSON decoding,
+                validation and encoding included)
+
+The target is 100,000 quotes per second on one core.
+
+    python benchmarks/bench_quotes.py --database /tmp/bench.db --output quotes.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic_data  # noqa: E402
+from bench_routes import _git_commit, _percentile  # noqa: E402
+
+TARGET_PER_S = 100000
+
+
+def _quotes(rng, tables, count):
+    """count random valid quotes as a list of dicts"""
+    items = [(kind, int(item_id)) for kind in tables.ids for item_id in tables.ids[kind]]
+    today = date.today()
+    quotes = []
+    for _ in range(count):
+        kind, item_id = rng.choice(items)
+        quotes.append({'kind': kind, 'item_id': item_id,
+                       'date': (today + timedelta(days=rng.randrange(tables.horizon))).isoformat(),
+                       'number_of_people': rng.randint(1, 12)})
+    return quotes
+
+
+def _timings(function, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return sorted(samples)
+
+
+def bench_engine(tables, batch_sizes, seconds, rng):
+    results = {}
+    for size in batch_sizes:
+        quotes = _quotes(rng, tables, size)
+        columns = [[quote[field] for quote in quotes] for field in ('kind', 'item_id', 'date', 'number_of_people')]
+        tables.quote(*columns)
+        # Enough batches to fill about `seconds`, judged from one timed run
+        once = _timings(lambda: tables.quote(*columns), 1)[0]
+        samples = _timings(lambda: tables.quote(*columns), max(3, int(seconds / max(once, 1e-6))))
+        p50 = _percentile(samples, 50)
+        results[str(size)] = {'batches': len(samples), 'p50_ms': round(p50 * 1000, 3),
+                              'p99_ms': round(_percentile(samples, 99) * 1000, 3),
+                              'quotes_per_s': round(size / p50)}
+    return results
+
+
+def bench_endpoint(app, tables, batch, requests, rng):
+    client = app.test_client()
+    quotes = _quotes(rng, tables, batch)
+    body = json.dumps({'quotes': quotes})
+    single = quotes[0]
+
+    def post():
+        response = client.post('/api/quote', data=body, content_type='application/json')
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    def get():
+        response = client.get('/api/quote', query_string=single)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    post()
+    get()
+    posts = _timings(post, requests)
+    gets = _timings(get, requests * 10)
+    return {'post': {'quotes': batch, 'requests': len(posts), 'p50_ms': round(_percentile(posts, 50) * 1000, 2),
+                     'p99_ms': round(_percentile(posts, 99) * 1000, 2),
+                     'quotes_per_s': round(batch / _percentile(posts, 50))},
+            'get': {'requests': len(gets), 'p50_ms': round(_percentile(gets, 50) * 1000, 3),
+                    'p99_ms': round(_percentile(gets, 99) * 1000, 3)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='existing synthetic SQLite database; default: generate a small one')
+    parser.add_argument('--batch-sizes', default='1,100,10000,100000', help='comma-separated engine batch sizes')
+    parser.add_argument('--seconds', type=float, default=2.0, help='time spent per engine batch size')
+    parser.add_argument('--endpoint-batch', type=int, default=10000, help='quotes per POST /api/quote')
+    parser.add_argument('--requests', type=int, default=20, help='timed POST requests')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    database = args.database
+    if database is None:
+        import tempfile
+        database = os.path.join(tempfile.mkdtemp(prefix='bench-quotes-'), 'bench.db')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + database
+        synthetic_data.populate(*synthetic_data.SCALES['small'], log=lambda message: print(message, file=sys.stderr))
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(database)
+
+    sys.path.insert(0, synthetic_data.ROOT)
+    import pricing
+    from app import create_app
+    from catalog import get_quote_tables
+    from extensions import db
+    from models import PriceRule
+
+    app = create_app({'RATE_LIMIT_ENABLED': False, 'QUOTE_BATCH_SIZE': max(args.endpoint_batch, 10000)})
+    rng = random.Random(7)
+    results = {'meta': {'commit': _git_commit(), 'database': os.path.abspath(database), 'cpus': os.cpu_count(),
+                        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}}
+    with app.app_context():
+        # Databases built before price rules existed get the init-db rules
+        db.create_all()
+        if not db.session.scalar(db.select(db.func.count()).select_from(PriceRule)):
+            db.session.add_all(PriceRule(**pricing.validate_rule(rule)) for rule in pricing.EXAMPLE_RULES)
+            db.session.commit()
+
+        started = time.perf_counter()
+        tables = get_quote_tables()
+        results['compile'] = {'items': len(tables), 'rules': db.session.scalar(
+                                  db.select(db.func.count()).select_from(PriceRule)),
+                              'horizon_days': tables.horizon, 'ms': round((time.perf_counter() - started) * 1000, 1)}
+        results['engine'] = bench_engine(tables, [int(size) for size in args.batch_sizes.split(',')],
+                                         args.seconds, rng)
+    results['endpoint'] = bench_endpoint(app, tables, args.endpoint_batch, args.requests, rng)
+
+    compiled = results['compile']
+    print(f"compile     {compiled['items']} items, {compiled['rules']} rules, {compiled['horizon_days']} days: "
+          f"{compiled['ms']:.1f} ms", file=sys.stderr)
+    for size, engine in results['engine'].items():
+        print(f"engine      {int(size):>7,} quotes  p50 {engine['p50_ms']:9.3f} ms  {engine['quotes_per_s']:>11,} quotes/s"
+              f"{'' if int(size) < 1000 or engine['quotes_per_s'] >= TARGET_PER_S else '  BELOW TARGET'}",
+              file=sys.stderr)
+    post, get = results['endpoint']['post'], results['endpoint']['get']
+    print(f"POST        {post['quotes']:>7,} quotes  p50 {post['p50_ms']:9.2f} ms  {post['quotes_per_s']:>11,} quotes/s",
+          file=sys.stderr)
+    print(f"GET               1 quote   p50 {get['p50_ms']:9.3f} ms", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
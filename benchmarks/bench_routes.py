@@ -0,0 +1,302 @@
+"""Route-level benchmark: latency percentiles, throughput, queries and memory per route.
+
+Drives every page through the Flask test client against a synthetic
+database (see synthetic_data.py), so the numbers cover routing, queries,
+templates and caches but not the network or WSGI server. Results are
+written as JSON; pass an earlier result as --baseline to print the change
+per route.
+
+    python benchmarks/bench_routes.py --scale medium --output before.json
+    python benchmarks/bench_routes.py --database /tmp/bench.db --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic_data  # noqa: E402
+
+MEMORY_SAMPLES = 10  # requests per route traced for peak allocation
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def build_routes(app, db, models, rng):
+    """(name, method, client, make_request) where make_request() returns (path, form data)"""
+    User, Trek, TravelPackage, Booking = models
+    with app.app_context():
+        trek_slugs = [slug for slug, in db.session.query(Trek.slug).order_by(Trek.id).limit(200)]
+        package_slugs = [slug for slug, in db.session.query(TravelPackage.slug).order_by(TravelPackage.id).limit(200)]
+        trek_ids = [trek_id for trek_id, in db.session.query(Trek.id).order_by(Trek.id).limit(200)]
+        package_ids = [package_id for package_id, in db.session.query(TravelPackage.id).order_by(TravelPackage.id).limit(200)]
+        # The busiest account gives the dashboard its worst realistic case
+        busiest = db.session.query(Booking.user_id).group_by(Booking.user_id).order_by(
+            db.func.count().desc()).limit(1).scalar() or 1
+        username = db.session.get(User, busiest).username
+
+    anonymous = app.test_client()
+    member = app.test_client()
+    staff = app.test_client()
+    staff.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {app.config['REPORTS_TOKEN']}"
+    response = member.post('/login', data={'username': username, 'password': synthetic_data.PASSWORD})
+    assert response.status_code == 302, 'benchmark user could not log in'
+
+    # Bookings land on a new date each, a year or more ahead, so they rarely run
+    # into sold-out departures while staying inside QUOTE_HORIZON_DAYS
+    future = iter(range(10**6))
+    first = date.today() + timedelta(days=365)
+    spread = max(app.config['QUOTE_HORIZON_DAYS'] - 366, 1)
+
+    def booking_date():
+        return (first + timedelta(days=next(future) % spread)).isoformat()
+
+    registrations = iter(range(10**6))
+
+    def register():
+        n = next(registrations)
+        return '/register', {'username': f'bench{n}', 'email': f'bench{n}@example.com',
+                             'password': 'bench-password', 'full_name': 'Bench', 'phone': ''}
+
+    def cancel():
+        # Make (untimed) the booking that the timed request then cancels
+        member.post(f'/book/{trek_ids[0]}', data={'trek_date': booking_date(), 'number_of_people': 1})
+        with app.app_context():
+            booking_id = db.session.query(db.func.max(Booking.id)).filter(Booking.user_id == busiest).scalar()
+        return f'/cancel-booking/{booking_id}', None
+
+    words = ['everest', 'annapurna', 'lakes', 'namche', 'pass', 'kathmandu', 'ridge trek']
+    return [
+        ('home', 'GET', anonymous, lambda: ('/', None)),
+        ('about', 'GET', anonymous, lambda: ('/about', None)),
+        ('treks', 'GET', anonymous, lambda: ('/treks', None)),
+        ('treks_filtered', 'GET', anonymous, lambda: (
+            f"/treks?region={rng.choice(synthetic_data.REGIONS)}&difficulty={rng.choice(synthetic_data.DIFFICULTIES)}"
+            f"&sort=price_asc&min_days=5", None)),
+        ('treks_sorted', 'GET', anonymous, lambda: (
+            f"/treks?sort={rng.choice(['price_desc', 'duration_asc', 'altitude_desc'])}", None)),
+        ('trek_detail', 'GET', anonymous, lambda: (f'/trek/{rng.choice(trek_slugs)}', None)),
+        ('travel', 'GET', anonymous, lambda: ('/travel', None)),
+        ('travel_filtered', 'GET', anonymous, lambda: (
+            f"/travel?destination={rng.choice(synthetic_data.DESTINATIONS)}&sort=price_desc", None)),
+        ('travel_detail', 'GET', anonymous, lambda: (f'/travel/{rng.choice(package_slugs)}', None)),
+        ('search', 'GET', anonymous, lambda: (f'/search?q={rng.choice(words)}', None)),
+        ('api_search', 'GET', anonymous, lambda: (f'/api/search?q={rng.choice(words)}', None)),
+        ('contact', 'GET', anonymous, lambda: ('/contact', None)),
+        ('contact_post', 'POST', anonymous, lambda: (
+            '/contact', {'name': 'Bench', 'email': 'bench@example.com', 'message': 'Hello'})),
+        ('privacy', 'GET', anonymous, lambda: ('/privacy', None)),
+        ('terms', 'GET', anonymous, lambda: ('/terms', None)),
+        ('login', 'GET', anonymous, lambda: ('/login', None)),
+        ('login_post', 'POST', app.test_client(), lambda: (
+            '/login', {'username': username, 'password': synthetic_data.PASSWORD})),
+        ('register', 'GET', anonymous, lambda: ('/register', None)),
+        ('register_post', 'POST', anonymous, register),
+        ('dashboard', 'GET', member, lambda: ('/dashboard', None)),
+        ('dashboard_filtered', 'GET', member, lambda: ('/dashboard?status=confirmed', None)),
+        ('trek_detail_member', 'GET', member, lambda: (f'/trek/{rng.choice(trek_slugs)}', None)),
+        ('book_trek', 'GET', member, lambda: (f'/book/{rng.choice(trek_ids)}', None)),
+        ('book_trek_post', 'POST', member, lambda: (
+            f'/book/{rng.choice(trek_ids)}', {'trek_date': booking_date(), 'number_of_people': rng.randint(1, 3)})),
+        ('book_travel_post', 'POST', member, lambda: (
+            f'/book-travel/{rng.choice(package_ids)}',
+            {'travel_date': booking_date(), 'number_of_people': rng.randint(1, 3)})),
+        ('cancel_booking', 'GET', member, cancel),
+        ('api_treks', 'GET', anonymous, lambda: ('/api/v1/treks', None)),
+        ('api_treks_filtered', 'GET', anonymous, lambda: (
+            f"/api/v1/treks?region={rng.choice(synthetic_data.REGIONS)}"
+            f"&difficulty={rng.choice(synthetic_data.DIFFICULTIES)}&sort=price_asc&min_days=5", None)),
+        ('api_trek_detail', 'GET', anonymous, lambda: (f'/api/v1/treks/{rng.choice(trek_slugs)}', None)),
+        ('api_packages', 'GET', anonymous, lambda: (
+            f"/api/v1/packages?destination={rng.choice(synthetic_data.DESTINATIONS)}&sort=price_desc", None)),
+        ('api_bookings', 'GET', member, lambda: ('/api/v1/bookings', None)),
+        ('api_book_post', 'POST', member, lambda: (
+            '/api/v1/bookings', {'kind': 'trek', 'item_id': rng.choice(trek_ids), 'date': booking_date(),
+                                 'number_of_people': rng.randint(1, 3)})),
+        ('report_region', 'GET', staff, lambda: ('/internal/reports/bookings?group=region', None)),
+        ('report_month_csv', 'GET', staff, lambda: ('/internal/reports/bookings.csv?group=month', None)),
+    ]
+
+
+def _open(client, method, path, data):
+    # API routes take JSON bodies, pages take forms
+    if path.startswith('/api/') and data is not None:
+        return client.open(path, method=method, json=data)
+    return client.open(path, method=method, data=data)
+
+
+def run_route(client, method, make_request, requests, warmup, count_queries):
+    """Time one route; returns its result dict"""
+    for _ in range(warmup):
+        path, data = make_request()
+        _open(client, method, path, data).get_data()
+
+    latencies, statuses, queries, body_bytes = [], Counter(), 0, 0
+    for _ in range(requests):
+        path, data = make_request()
+        before = count_queries()
+        request_started = time.perf_counter()
+        response = _open(client, method, path, data)
+        body = response.get_data()  # streamed pages render while the body is read
+        latencies.append(time.perf_counter() - request_started)
+        queries += count_queries() - before
+        statuses[response.status_code] += 1
+        body_bytes += len(body)
+    # Request time only: some routes set up their request (e.g. a booking to cancel) untimed
+    elapsed = sum(latencies)
+
+    peak = 0
+    tracemalloc.start()
+    for _ in range(MEMORY_SAMPLES):
+        path, data = make_request()
+        tracemalloc.reset_peak()
+        _open(client, method, path, data).get_data()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        'method': method,
+        'path': path,
+        'requests': requests,
+        'errors': sum(count for status, count in statuses.items() if status >= 500),
+        'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+        'throughput_rps': round(requests / elapsed, 1),
+        'latency_ms': {
+            'mean': round(sum(ms) / len(ms), 3),
+            'p50': round(_percentile(ms, 50), 3),
+            'p95': round(_percentile(ms, 95), 3),
+            'p99': round(_percentile(ms, 99), 3),
+            'max': round(ms[-1], 3),
+        },
+        'queries_per_request': round(queries / requests, 2),
+        'response_bytes': round(body_bytes / requests),
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=synthetic_data.ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(baseline, results):
+    print(f"{'route':<22}{'p50 ms':>18}{'p95 ms':>18}{'req/s':>18}{'queries':>12}", file=sys.stderr)
+    for name, result in results['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            continue
+
+        def change(old, new):
+            return f"{new:>8.2f} ({(new - old) / old * 100 if old else 0:+5.0f}%)"
+
+        print(f"{name:<22}{change(before['latency_ms']['p50'], result['latency_ms']['p50'])}"
+              f"{change(before['latency_ms']['p95'], result['latency_ms']['p95'])}"
+              f"{change(before['throughput_rps'], result['throughput_rps'])}"
+              f"{before['queries_per_request']:>5} -> {result['queries_per_request']:<4}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='existing synthetic SQLite database; default: generate one')
+    parser.add_argument('--scale', choices=synthetic_data.SCALES, default='small',
+                        help='size of the generated database when --database is not given')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per route first')
+    parser.add_argument('--routes', help='comma-separated route names to run (default: all)')
+    parser.add_argument('--cold-caches', action='store_true', help='disable the catalog/page/user caches')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    database = args.database
+    if database is None:
+        database = os.path.join(tempfile.mkdtemp(prefix='bench-routes-'), 'bench.db')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + database
+        synthetic_data.populate(*synthetic_data.SCALES[args.scale], seed=args.seed,
+                                log=lambda message: print(message, file=sys.stderr))
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(database)
+    if args.cold_caches:
+        for name in ('CATALOG_CACHE_SIZE', 'PAGE_CACHE_SIZE', 'USER_CACHE_SIZE'):
+            os.environ[name] = '0'
+
+    sys.path.insert(0, synthetic_data.ROOT)
+    from sqlalchemy import event
+    from app import create_app
+    from extensions import db
+    from models import User, Trek, TravelPackage, Booking, TravelBooking
+
+    app = create_app({'REPORTS_TOKEN': 'bench'})
+
+    with app.app_context():
+        engine = db.engine
+        counts = {'users': db.session.query(User).count(), 'treks': db.session.query(Trek).count(),
+                  'packages': db.session.query(TravelPackage).count(),
+                  'bookings': db.session.query(Booking).count(),
+                  'travel_bookings': db.session.query(TravelBooking).count()}
+    executed = [0]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        executed[0] += 1
+
+    rng = random.Random(args.seed)
+    routes = build_routes(app, db, (User, Trek, TravelPackage, Booking), rng)
+    selected = set(args.routes.split(',')) if args.routes else None
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': counts,
+            'requests_per_route': args.requests,
+            'cold_caches': args.cold_caches,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'routes': {},
+    }
+    for name, method, client, make_request in routes:
+        if selected and name not in selected:
+            continue
+        result = run_route(client, method, make_request, args.requests, args.warmup, lambda: executed[0])
+        results['routes'][name] = result
+        print(f"{name:<22} p50 {result['latency_ms']['p50']:8.2f} ms  p99 {result['latency_ms']['p99']:8.2f} ms  "
+              f"{result['throughput_rps']:8.1f} req/s  {result['queries_per_request']:5} queries  "
+              f"{result['peak_alloc_kb']:8.1f} KB  {result['response_bytes']:8} bytes", file=sys.stderr)
+    results['meta']['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(json.load(f), results)
+    return 1 if any(result['errors'] for result in results['routes'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
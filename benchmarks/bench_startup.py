@@ -0,0 +1,193 @@
+"""Startup and per-worker memory benchmark for the app under gunicorn.
+
+Starts gunicorn with --workers N against a synthetic database, sends one
+concurrent request per worker until a whole wave succeeds, serves a short
+round of pages and then reads every process's memory from
+/proc/<pid>/smaps_rollup (Linux only):
+
+    import_s    importing the app module in a fresh interpreter
+    ready_s     launch until a first wave of one request per worker was answered
+    first_ms    slowest response of that first wave (cold templates, caches, connections)
+    warm_ms     slowest response of the same wave once every route has been served
+    rss_mb      resident memory of each worker
+    pss_mb      the same with pages shared between processes split among them
+    uss_mb      memory only that worker holds: what one more worker costs
+
+Compare workers that each import the app with the preloading gunicorn.conf.py:
+
+    python benchmarks/bench_startup.py --database /tmp/bench.db --config '' --output before.json
+    python benchmarks/bench_startup.py --database /tmp/bench.db --output after.json
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic_data  # noqa: E402
+from bench_routes import _git_commit  # noqa: E402
+
+ROUTES = ('/', '/treks', '/treks?region=Everest', '/travel', '/about', '/api/v1/treks', '/search?q=everest')
+START_TIMEOUT = 120
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _get(url):
+    """(status, milliseconds) for one GET with a fresh connection"""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            status = response.status
+    except OSError:
+        status = None
+    return status, (time.perf_counter() - started) * 1000
+
+
+def _wave(base, path, count):
+    """Send count requests at once; (all succeeded, slowest ms)"""
+    results = [None] * count
+
+    def fetch(index):
+        results[index] = _get(base + path)
+    threads = [threading.Thread(target=fetch, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return all(status == 200 for status, _ in results), max(elapsed for _, elapsed in results)
+
+
+def _smaps(pid):
+    """{'rss', 'pss', 'uss'} in MB for one process"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    uss = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {'rss': fields['Rss'] / 1024, 'pss': fields['Pss'] / 1024, 'uss': uss / 1024}
+
+
+def _children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def import_time(root, module, env, repeat=3):
+    """Best wall time of importing module in a fresh interpreter"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], cwd=root, env=env, check=True)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def measure(root, app, config, workers, env, requests):
+    port = _free_port()
+    base = f'http://127.0.0.1:{port}'
+    command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+               '--log-level', 'warning']
+    # gunicorn reads ./gunicorn.conf.py unless given another file
+    command += ['--config', config or os.devnull]
+    started = time.perf_counter()
+    server = subprocess.Popen(command + [app], cwd=root, env=env)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise SystemExit(f'gunicorn exited with {server.returncode}')
+            if time.perf_counter() - started > START_TIMEOUT:
+                raise SystemExit('gunicorn did not start')
+            ok, first_ms = _wave(base, '/treks', workers)
+            if ok:
+                break
+            time.sleep(0.05)
+        ready = time.perf_counter() - started
+        for _ in range(requests):
+            for path in ROUTES:
+                status, _ = _get(base + path)
+                assert status == 200, f'{path}: {status}'
+        _, warm_ms = _wave(base, '/treks', workers)
+        master = _smaps(server.pid)
+        children = [_smaps(pid) for pid in _children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    def summary(key):
+        values = [child[key] for child in children]
+        return {'mean': round(statistics.mean(values), 1), 'max': round(max(values), 1)}
+    return {
+        'ready_s': round(ready, 3),
+        'first_ms': round(first_ms, 1),
+        'warm_ms': round(warm_ms, 1),
+        'workers': len(children),
+        'master_mb': {key: round(value, 1) for key, value in master.items()},
+        'rss_mb': summary('rss'),
+        'pss_mb': summary('pss'),
+        'uss_mb': summary('uss'),
+        'total_pss_mb': round(master['pss'] + sum(child['pss'] for child in children), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='existing synthetic SQLite database; default: generate a small one')
+    parser.add_argument('--root', default=synthetic_data.ROOT, help='directory gunicorn runs the app from')
+    parser.add_argument('--app', default='wsgi:app', help='WSGI application, module:name')
+    parser.add_argument('--config', default='gunicorn.conf.py', help="gunicorn config file ('' for none)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20, help='rounds over the routes before measuring memory')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    args = parser.parse_args()
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        parser.error('needs Linux /proc/<pid>/smaps_rollup')
+
+    database = args.database
+    if database is None:
+        database = os.path.join(tempfile.mkdtemp(prefix='bench-startup-'), 'bench.db')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + database
+        synthetic_data.populate(*synthetic_data.SCALES['small'], log=lambda message: print(message, file=sys.stderr))
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.abspath(database), RATE_LIMIT_ENABLED='0',
+               RATE_LIMIT_FILE=os.path.join(tempfile.mkdtemp(prefix='bench-startup-'), 'ratelimit.bin'))
+
+    results = {
+        'meta': {'commit': _git_commit(), 'database': os.path.abspath(database), 'app': args.app,
+                 'config': args.config or None, 'workers': args.workers,
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())},
+        'import_s': round(import_time(args.root, args.app.split(':')[0], env), 3),
+    }
+    results.update(measure(args.root, args.app, args.config, args.workers, env, args.requests))
+
+    print(f"import {results['import_s']:.2f}s, ready {results['ready_s']:.2f}s, first wave "
+          f"{results['first_ms']:.0f} ms, warm wave {results['warm_ms']:.0f} ms", file=sys.stderr)
+    print(f"per worker: RSS {results['rss_mb']['mean']:.1f} MB, PSS {results['pss_mb']['mean']:.1f} MB, "
+          f"USS {results['uss_mb']['mean']:.1f} MB; all processes PSS {results['total_pss_mb']:.1f} MB",
+          file=sys.stderr)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Streaming and compression benchmark: time to first byte, peak memory and bytes per page.
+
+Calls the WSGI app directly (no server or network) and reads each body
+chunk by chunk the way a server sends it. Every route is fetched with no
+compression, gzip and brotli, once with pages rendered in one piece
+(STREAM_TEMPLATES=0) and once streamed, each mode in its own process:
+
+    ttfb        time until the first body chunk is ready
+    total       time until the last one
+    peak_kb     peak Python allocation during one request (tracemalloc)
+    bytes       body bytes on the wire
+
+    python benchmarks/bench_streaming.py --database /tmp/bench.db --cold-caches --output streaming.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic_data  # noqa: E402
+from bench_routes import _git_commit, _percentile  # noqa: E402
+
+MODES = {'buffered': '0', 'streamed': '1'}
+ENCODINGS = {'identity': None, 'gzip': 'gzip', 'br': 'gzip, deflate, br'}
+MEMORY_SAMPLES = 10
+
+
+def fetch(app, path, accept_encoding, cookie):
+    """(ttfb, total, bytes, status) for one request read to the end"""
+    from werkzeug.test import EnvironBuilder
+
+    headers = {}
+    if accept_encoding:
+        headers['Accept-Encoding'] = accept_encoding
+    if cookie:
+        headers['Cookie'] = f'session={cookie}'
+    environ = EnvironBuilder(path=path, headers=headers).get_environ()
+    statuses = []
+    started = time.perf_counter()
+    body = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    first, size = None, 0
+    try:
+        for chunk in body:
+            if chunk and first is None:
+                first = time.perf_counter() - started
+            size += len(chunk)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return first or 0.0, time.perf_counter() - started, size, statuses[0]
+
+
+def run_worker(requests, warmup):
+    """Measure every route and encoding in this process (mode set by the parent)"""
+    sys.path.insert(0, synthetic_data.ROOT)
+    from app import create_app
+    from extensions import db
+    from models import Booking, User
+
+    app = create_app()
+
+    with app.app_context():
+        busiest = db.session.query(Booking.user_id).group_by(Booking.user_id).order_by(
+            db.func.count().desc()).limit(1).scalar() or 1
+        username = db.session.get(User, busiest).username
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': synthetic_data.PASSWORD})
+    cookie = client.get_cookie('session').value
+
+    routes = {
+        'treks': ('/treks', None),
+        'treks_filtered': ('/treks?difficulty=Moderate&sort=price_desc', None),
+        'travel': ('/travel', None),
+        'dashboard': ('/dashboard?status=', cookie),
+    }
+    results = {}
+    for name, (path, session_cookie) in routes.items():
+        for encoding, accept in ENCODINGS.items():
+            for _ in range(warmup):
+                fetch(app, path, accept, session_cookie)
+            ttfb, total, sizes = [], [], set()
+            for _ in range(requests):
+                first, elapsed, size, status = fetch(app, path, accept, session_cookie)
+                assert status.startswith('200'), f'{path}: {status}'
+                ttfb.append(first * 1000)
+                total.append(elapsed * 1000)
+                sizes.add(size)
+            peak = 0
+            tracemalloc.start()
+            for _ in range(MEMORY_SAMPLES):
+                tracemalloc.reset_peak()
+                fetch(app, path, accept, session_cookie)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            ttfb.sort()
+            total.sort()
+            results.setdefault(name, {})[encoding] = {
+                'ttfb_ms': {'p50': round(_percentile(ttfb, 50), 3), 'p95': round(_percentile(ttfb, 95), 3)},
+                'total_ms': {'p50': round(_percentile(total, 50), 3), 'p95': round(_percentile(total, 95), 3)},
+                'peak_kb': round(peak / 1024, 1),
+                'bytes': round(sum(sizes) / len(sizes)),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='existing synthetic SQLite database; default: generate a small one')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route and encoding')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--cold-caches', action='store_true', help='disable the catalog/page/user caches')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--worker', choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.requests, args.warmup)))
+        return 0
+
+    database = args.database
+    if database is None:
+        import tempfile
+        database = os.path.join(tempfile.mkdtemp(prefix='bench-streaming-'), 'bench.db')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + database
+        synthetic_data.populate(*synthetic_data.SCALES['small'], log=lambda message: print(message, file=sys.stderr))
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.abspath(database), RATE_LIMIT_ENABLED='0')
+    if args.cold_caches:
+        for name in ('CATALOG_CACHE_SIZE', 'PAGE_CACHE_SIZE', 'USER_CACHE_SIZE'):
+            env[name] = '0'
+
+    results = {'meta': {'commit': _git_commit(), 'database': os.path.abspath(database), 'requests': args.requests,
+                        'cold_caches': args.cold_caches,
+                        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}}
+    for mode, flag in MODES.items():
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', mode, '--requests', str(args.requests),
+             '--warmup', str(args.warmup)],
+            env=dict(env, STREAM_TEMPLATES=flag), capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'route':<16}{'encoding':<10}{'TTFB p50 ms':>22}{'total p50 ms':>22}{'peak KB':>20}{'bytes':>16}",
+          file=sys.stderr)
+    for route, encodings in results['streamed'].items():
+        for encoding, streamed in encodings.items():
+            buffered = results['buffered'][route][encoding]
+            print(f"{route:<16}{encoding:<10}"
+                  f"{buffered['ttfb_ms']['p50']:>10.2f} -> {streamed['ttfb_ms']['p50']:<8.2f}"
+                  f"{buffered['total_ms']['p50']:>10.2f} -> {streamed['total_ms']['p50']:<8.2f}"
+                  f"{buffered['peak_kb']:>8.0f} -> {streamed['peak_kb']:<8.0f}"
+                  f"{streamed['bytes']:>10}", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
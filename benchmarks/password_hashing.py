@@ -0,0 +1,66 @@
+"""Microbenchmark for password hashing settings: logins per second per core.
+
+For each werkzeug method it times check_password_hash on one thread (the
+cost of one login on one core), then runs the same verifications through
+PasswordHasher's bounded pool to show how throughput scales with workers.
+
+    python benchmarks/password_hashing.py --logins 50
+    python benchmarks/password_hashing.py --method scrypt:16384:8:1 --method pbkdf2:sha256:600000
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from passwords import PasswordHasher
+
+DEFAULT_METHODS = [
+    'scrypt',  # werkzeug default, scrypt:32768:8:1
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+]
+
+
+def single_core_rate(method, logins):
+    password_hash = generate_password_hash('correct horse battery staple', method=method)
+    started = time.perf_counter()
+    for _ in range(logins):
+        check_password_hash(password_hash, 'correct horse battery staple')
+    return logins / (time.perf_counter() - started)
+
+
+def pool_rate(method, logins, workers):
+    hasher = PasswordHasher(method=method, workers=workers, max_queue=logins)
+    password_hash = hasher.hash('correct horse battery staple')
+    started = time.perf_counter()
+    # Callers block on their result, so use as many caller threads as logins in flight
+    with ThreadPoolExecutor(max_workers=workers * 2) as callers:
+        list(callers.map(lambda _: hasher.verify(password_hash, 'correct horse battery staple'), range(logins)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--method', action='append', help='werkzeug method string (repeatable)')
+    parser.add_argument('--logins', type=int, default=40, help='verifications per measurement')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='pool size')
+    args = parser.parse_args()
+
+    print(f"{'method':<26} {'ms/login':>9} {'logins/s/core':>14} {f'pool x{args.workers} logins/s':>20}")
+    for method in args.method or DEFAULT_METHODS:
+        per_core = single_core_rate(method, args.logins)
+        pooled = pool_rate(method, args.logins, args.workers)
+        print(f"{method:<26} {1000 / per_core:>9.1f} {per_core:>14.1f} {pooled:>20.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Stress test for departure capacity: many threads booking the same date.
+
+Runs against a throwaway SQLite database and drives the real /book and
+/cancel-booking routes through Flask test clients, one per thread. Then
+--racers clients of the same user cancel each of --races bookings at the
+same moment. Exits with status 1 if the departure was ever oversold, or its
+seat counters or booking_rollups disagree with the bookings table.
+
+    python benchmarks/stress_bookings.py --threads 32 --attempts 20 --capacity 12 --races 40
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--attempts', type=int, default=20, help='booking attempts per thread')
+    parser.add_argument('--capacity', type=int, default=12)
+    parser.add_argument('--cancel-rate', type=float, default=0.2,
+                        help='chance a thread cancels one of its bookings after booking')
+    parser.add_argument('--races', type=int, default=20, help='bookings cancelled by several clients at once')
+    parser.add_argument('--racers', type=int, default=4, help='clients cancelling each of those bookings')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='stress-bookings-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'stress.db')
+    os.environ['DEPARTURE_CAPACITY'] = str(args.capacity)
+    sys.path.insert(0, ROOT)
+
+    from app import create_app
+    from extensions import db
+    from bookings import rebuild_booking_rollups
+    from models import User, Trek, Booking, BookingRollup, Departure
+
+    app = create_app({'TESTING': True, 'RATE_LIMIT_ENABLED': False})
+    with app.app_context():
+        db.create_all()
+        trek = Trek(name='Stress Trek', slug='stress-trek', region='Everest', duration=10,
+                    difficulty='Moderate', price=100.0, description='', itinerary='', includes='', excludes='')
+        db.session.add(trek)
+        for i in range(args.threads):
+            user = User(username=f'user{i}', email=f'user{i}@example.com')
+            user.set_password('stress-password')
+            db.session.add(user)
+        db.session.commit()
+        trek_id = trek.id
+
+    trek_date = (date.today() + timedelta(days=30)).isoformat()
+    counts = {'booked': 0, 'sold_out': 0, 'cancelled': 0, 'errors': 0}
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    def worker(i):
+        client = app.test_client()
+        client.post('/login', data={'username': f'user{i}', 'password': 'stress-password'})
+        rng = random.Random(i)
+        start.wait()
+        for _ in range(args.attempts):
+            response = client.post(f'/book/{trek_id}', data={
+                'trek_date': trek_date, 'number_of_people': rng.randint(1, 3)})
+            outcome = 'errors'
+            if response.status_code == 302:
+                outcome = 'booked' if response.location.endswith('/dashboard') else 'sold_out'
+            with lock:
+                counts[outcome] += 1
+            if outcome == 'booked' and rng.random() < args.cancel_rate:
+                with app.app_context():
+                    user_id = User.query.filter_by(username=f'user{i}').first().id
+                    booking = Booking.query.filter_by(user_id=user_id, status='pending').first()
+                if booking:
+                    client.get(f'/cancel-booking/{booking.id}')
+                    with lock:
+                        counts['cancelled'] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # The same booking cancelled from several clients at once must give its seats back once;
+    # every other booking stays active, so seats released twice show up as a counter mismatch
+    with app.app_context():
+        raced = Booking.query.filter(Booking.trek_id == trek_id, Booking.status != 'cancelled').order_by(
+            Booking.id).all()[::2][:args.races]
+        raced = [(booking.id, db.session.get(User, booking.user_id).username) for booking in raced]
+    for booking_id, username in raced:
+        clients = [app.test_client() for _ in range(args.racers)]
+        for client in clients:
+            client.post('/login', data={'username': username, 'password': 'stress-password'})
+        race = threading.Barrier(args.racers)
+
+        def cancel(client):
+            race.wait()
+            if client.get(f'/cancel-booking/{booking_id}').status_code != 302:
+                with lock:
+                    counts['errors'] += 1
+        racers = [threading.Thread(target=cancel, args=(client,)) for client in clients]
+        for thread in racers:
+            thread.start()
+        for thread in racers:
+            thread.join()
+    counts['raced'] = len(raced)
+
+    with app.app_context():
+        departure = Departure.query.filter_by(item_kind='trek', item_id=trek_id).one()
+        active = db.session.query(db.func.coalesce(db.func.sum(Booking.number_of_people), 0)).filter(
+            Booking.trek_id == trek_id, Booking.status != 'cancelled').scalar()
+        capacity, seats_booked, seats_held = departure.capacity, departure.seats_booked, departure.seats_held
+        # The incrementally kept rollups against a rebuild from the bookings, which is rolled back
+        rollup_query = db.select(BookingRollup.kind, BookingRollup.item_id, BookingRollup.month, BookingRollup.bookings,
+                                 BookingRollup.cancellations, BookingRollup.people,
+                                 db.func.round(BookingRollup.revenue, 2)).order_by(
+                                     BookingRollup.kind, BookingRollup.item_id, BookingRollup.month)
+        rollups = [tuple(row) for row in db.session.execute(rollup_query)]
+        rebuild_booking_rollups(db.session.connection())
+        rebuilt = [tuple(row) for row in db.session.execute(rollup_query)]
+        db.session.rollback()
+
+    attempts = args.threads * args.attempts
+    print(f"{attempts} attempts from {args.threads} threads in {elapsed:.2f}s "
+          f"({attempts / elapsed:.0f} bookings/s)")
+    print("booked={booked} sold_out={sold_out} cancelled={cancelled} raced={raced} errors={errors}".format(**counts))
+    print(f"capacity={capacity} seats_booked={seats_booked} seats_held={seats_held} active_booked_seats={active}")
+
+    print(f"rollups={rollups}")
+    if rollups != rebuilt:
+        print(f"rebuilt={rebuilt}")
+
+    ok = (active <= capacity and active == seats_booked and rollups == rebuilt
+          and counts['errors'] == 0)
+    print('OK: no oversell' if ok else 'FAIL: departure oversold or counters out of sync')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Deterministic synthetic data for benchmarks: users, catalog and bookings.
+
+The same --seed and counts always produce the same rows, so results from
+different commits are measured against identical data. Rows are written
+with batched Core inserts rather than the ORM, which keeps a 1M-booking
+database to a few minutes and constant memory. Departure seat counters
+are filled in to match the generated bookings.
+
+    python benchmarks/synthetic_data.py --scale large --database /tmp/bench.db
+    python benchmarks/synthetic_data.py --bookings 1000000 --database /tmp/bench.db
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (users, treks, packages, trek bookings, travel bookings)
+SCALES = {
+    'small': (200, 60, 30, 1500, 500),
+    'medium': (2000, 300, 120, 35000, 15000),
+    'large': (20000, 1000, 400, 175000, 75000),
+    'xl': (100000, 2000, 800, 700000, 300000),
+}
+
+PASSWORD = 'benchmark-password'
+START_DATE = date(2025, 1, 6)  # first departure; a Monday, so departures are weekly
+WEEKS = 104
+BATCH_SIZE = 10000
+
+REGIONS = ['Everest', 'Annapurna', 'Langtang', 'Manaslu', 'Mustang', 'Dolpo', 'Kanchenjunga', 'Makalu']
+DIFFICULTIES = ['Easy', 'Moderate', 'Difficult']
+DESTINATIONS = ['Kathmandu', 'Pokhara', 'Chitwan', 'Lumbini', 'Bandipur', 'Nagarkot', 'Janakpur']
+PACKAGE_TYPES = ['Cultural', 'Adventure', 'Relaxation', 'Wildlife', 'Spiritual']
+PLACES = ['Namche', 'Tengboche', 'Ghorepani', 'Manang', 'Kyanjin', 'Samagaun', 'Lo Manthang',
+          'Gokyo', 'Dingboche', 'Tatopani', 'Chhomrong', 'Sinon', 'Phakding', 'Lukla', 'Jomsom']
+NAME_WORDS = ['Base Camp', 'Circuit', 'Valley', 'Ridge', 'Lakes', 'Pass', 'Sanctuary', 'Trail', 'Loop', 'Traverse']
+STATUSES = ['pending'] * 5 + ['confirmed'] * 4 + ['cancelled']
+
+
+def _itinerary(rng, days):
+    lines = []
+    for day in range(1, days + 1):
+        place = rng.choice(PLACES)
+        if rng.random() < 0.6:
+            lines.append(f"Day {day}: Trek to {place} ({rng.randint(1500, 5600):,}m)")
+        else:
+            lines.append(f"Day {day}: Explore {place}")
+    return '\n'.join(lines)
+
+
+def _treks(rng, count):
+    for i in range(1, count + 1):
+        region = rng.choice(REGIONS)
+        duration = rng.randint(4, 21)
+        itinerary = _itinerary(rng, duration)
+        yield {
+            'name': f"{region} {rng.choice(NAME_WORDS)} Trek {i}",
+            'slug': f"{region.lower()}-trek-{i}",
+            'region': region,
+            'duration': duration,
+            'difficulty': rng.choice(DIFFICULTIES),
+            'max_altitude': rng.randint(3000, 5600),
+            'price': float(rng.randrange(400, 3500, 25)),
+            'description': f"A {duration}-day trek through the {region} region past {rng.choice(PLACES)} "
+                           f"and {rng.choice(PLACES)}, with teahouse nights and mountain views.",
+            'itinerary': itinerary,
+            'includes': 'Airport pickups, All permits (TIMS, national park), Teahouse accommodation, Guide, Porter',
+            'excludes': 'International flights, Nepal visa, Travel insurance, Personal expenses (drinks, wifi), Tips',
+            'image_url': '/static/images/everest.jpg',
+        }
+
+
+def _packages(rng, count):
+    for i in range(1, count + 1):
+        destination = rng.choice(DESTINATIONS)
+        duration = rng.randint(2, 10)
+        yield {
+            'name': f"{destination} {rng.choice(PACKAGE_TYPES)} Tour {i}",
+            'slug': f"{destination.lower()}-tour-{i}",
+            'destination': destination,
+            'duration': duration,
+            'package_type': rng.choice(PACKAGE_TYPES),
+            'price': float(rng.randrange(150, 1500, 10)),
+            'description': f"{duration} days in {destination} with a local guide.",
+            'itinerary': _itinerary(rng, duration),
+            'includes': 'Hotel accommodation, Breakfast, Guided tours, Entrance fees',
+            'excludes': 'Lunch and dinner, Travel insurance, Tips',
+            'image_url': '/static/images/kathmandu.jpg',
+        }
+
+
+def _skewed(rng, count):
+    """1-based id where low ids are booked far more often, like popular treks"""
+    return int(count * rng.random() ** 2) + 1
+
+
+def _insert_batches(connection, table, rows, log=None):
+    from sqlalchemy import insert
+
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            connection.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+            if log and total % (BATCH_SIZE * 10) == 0:
+                log(f"  {table.name}: {total} rows")
+    if batch:
+        connection.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+def populate(users, treks, packages, trek_bookings, travel_bookings, seed=42, log=print):
+    """Fill the database the app is configured for; it must be empty"""
+    sys.path.insert(0, ROOT)
+    import migrations
+    import search as catalog_search
+    from app import create_app
+    from bookings import rebuild_booking_rollups
+    from catalog import rebuild_similar_items
+    from extensions import db, password_hasher
+    from itinerary import build_details
+    from models import User, Trek, TravelPackage, Booking, TravelBooking, Departure
+
+    app = create_app()
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.session.connection())
+        db.session.commit()
+        connection = db.session.connection()
+
+        password_hash = password_hasher.hash(PASSWORD)
+        epoch = datetime(2024, 1, 1)
+        _insert_batches(connection, User.__table__, ({
+            'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': password_hash,
+            'full_name': f'Benchmark User {i}', 'phone': f'+977-98{i:08d}',
+            'created_at': epoch + timedelta(minutes=i),
+        } for i in range(1, users + 1)), log)
+
+        for table, rows in ((Trek.__table__, _treks(rng, treks)), (TravelPackage.__table__, _packages(rng, packages))):
+            _insert_batches(connection, table, (dict(
+                row, details=build_details(row['itinerary'], row['includes'], row['excludes']),
+                created_at=epoch, updated_at=epoch) for row in rows))
+        if connection.dialect.name == 'sqlite':
+            catalog_search.rebuild_index(connection, [
+                *(('trek', row) for row in connection.execute(db.select(Trek.__table__))),
+                *(('travel', row) for row in connection.execute(db.select(TravelPackage.__table__))),
+            ])
+        for kind in ('trek', 'travel'):
+            rebuild_similar_items(connection, kind)
+        log(f"catalog: {users} users, {treks} treks, {packages} packages")
+
+        # Departure ids are handed out as bookings are generated; the rows
+        # themselves are written afterwards, once their seat totals are known
+        departures = {}
+
+        def departure_for(kind, item_id, departure_date, seats, cancelled):
+            key = (kind, item_id, departure_date)
+            entry = departures.get(key)
+            if entry is None:
+                entry = departures[key] = [len(departures) + 1, 0]
+            if not cancelled:
+                entry[1] += seats
+            return entry[0]
+
+        def bookings(kind, count, item_count, price_of):
+            for _ in range(count):
+                item_id = _skewed(rng, item_count)
+                departure_date = START_DATE + timedelta(weeks=rng.randrange(WEEKS))
+                people = rng.randint(1, 4)
+                status = rng.choice(STATUSES)
+                row = {
+                    'booking_date': datetime.combine(departure_date, datetime.min.time())
+                    - timedelta(days=rng.randint(7, 180), minutes=rng.randrange(1440)),
+                    'number_of_people': people,
+                    'total_price': price_of[item_id] * people,
+                    'status': status,
+                    'user_id': _skewed(rng, users),
+                    'departure_id': departure_for(kind, item_id, departure_date, people, status == 'cancelled'),
+                }
+                if kind == 'trek':
+                    row.update(trek_date=departure_date, trek_id=item_id,
+                               special_requests='Vegetarian meals' if rng.random() < 0.1 else None)
+                else:
+                    row.update(travel_date=departure_date, package_id=item_id)
+                yield row
+
+        trek_prices = dict(connection.execute(db.select(Trek.id, Trek.price)).all())
+        package_prices = dict(connection.execute(db.select(TravelPackage.id, TravelPackage.price)).all())
+        _insert_batches(connection, Booking.__table__, bookings('trek', trek_bookings, treks, trek_prices), log)
+        _insert_batches(connection, TravelBooking.__table__,
+                        bookings('travel', travel_bookings, packages, package_prices), log)
+
+        capacity = app.config['DEPARTURE_CAPACITY']
+        _insert_batches(connection, Departure.__table__, ({
+            'id': departure_id, 'item_kind': kind, 'item_id': item_id, 'departure_date': departure_date,
+            'capacity': max(capacity, seats), 'seats_booked': seats, 'seats_held': 0, 'version': 0,
+        } for (kind, item_id, departure_date), (departure_id, seats) in departures.items()))
+        # Core inserts skip the mapper events that maintain the rollups
+        rebuild_booking_rollups(connection)
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('ANALYZE')
+        db.session.commit()
+
+    log(f"bookings: {trek_bookings} trek, {travel_bookings} travel on {len(departures)} departures "
+        f"in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='SQLite file to create (must not exist)')
+    parser.add_argument('--scale', choices=SCALES, default='medium')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--treks', type=int)
+    parser.add_argument('--packages', type=int)
+    parser.add_argument('--bookings', type=int, help='total bookings, split 70/30 between treks and travel')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        parser.error(f"{args.database} already exists")
+    users, treks, packages, trek_bookings, travel_bookings = SCALES[args.scale]
+    if args.bookings is not None:
+        trek_bookings = args.bookings * 7 // 10
+        travel_bookings = args.bookings - trek_bookings
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(args.database)
+    populate(args.users or users, args.treks or treks, args.packages or packages,
+             trek_bookings, travel_bookings, seed=args.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
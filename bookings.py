@@ -0,0 +1,536 @@
+# bookings.py - Booking data layer: seats, bookings, dashboard timeline, rollups and archive
+
+# Everything that writes or reports on trek and travel bookings. Seat
+# counts, rollups and the archive are kept consistent by doing their work
+# in the same transaction (or flush) as the booking change they follow.
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+import heapq
+import random
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import analytics
+import catalog_io
+from catalog import bindable, get_package, get_trek, quote_price
+from extensions import db
+from models import (ARCHIVE_BIND, ARCHIVED_BOOKING_MODELS, BOOKING_MODELS, Booking, BookingRollup, Departure,
+                    SeatHold, TravelBooking, TravelPackage, Trek)
+from tasks import queue_cancellation_jobs
+
+# Departure capacity
+# Seats are claimed with a single conditional UPDATE on the departure row, so
+# concurrent bookings can never push seats_booked + seats_held past capacity.
+# A booking first holds its seats in a short transaction, then converts the
+# hold when the booking row is committed; a request that dies in between
+# leaves only a hold, which expires and gives the seats back.
+class SeatsUnavailable(Exception):
+    """Raised when a departure does not have enough free seats"""
+    def __init__(self, available):
+        super().__init__(f'only {available} seats available')
+        self.available = available
+
+RESERVATION_RETRIES = 5
+
+def _insert_ignore(table, values):
+    """INSERT that silently skips rows violating a unique constraint"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(table).values(**values))
+        except IntegrityError:
+            pass
+        return
+    db.session.execute(insert(table).values(**values).on_conflict_do_nothing())
+
+def get_departure_id(kind, item_id, departure_date):
+    """Id of the departure for an item and date, created with default capacity if new"""
+    lookup = db.select(Departure.id).where(Departure.item_kind == kind,
+                                           Departure.item_id == item_id,
+                                           Departure.departure_date == departure_date)
+    departure_id = db.session.execute(lookup).scalar()
+    if departure_id is None:
+        _insert_ignore(Departure.__table__, {
+            'item_kind': kind, 'item_id': item_id, 'departure_date': departure_date,
+            'capacity': current_app.config['DEPARTURE_CAPACITY'], 'seats_booked': 0, 'seats_held': 0, 'version': 0,
+        })
+        departure_id = db.session.execute(lookup).scalar()
+    return departure_id
+
+def seats_available(departure_id):
+    departure = db.session.get(Departure, departure_id)
+    return departure.capacity - departure.seats_booked - departure.seats_held
+
+def _release_expired_holds(departure_id, now):
+    """Give the seats of expired holds on one departure back to the pool"""
+    expired = db.session.execute(db.select(SeatHold.id, SeatHold.seats).where(
+        SeatHold.departure_id == departure_id, SeatHold.expires_at <= now)).all()
+    for hold_id, seats in expired:
+        # Only the request that actually deletes the hold gives its seats back
+        deleted = db.session.execute(db.delete(SeatHold).where(SeatHold.id == hold_id)).rowcount
+        if deleted:
+            db.session.execute(db.update(Departure).where(Departure.id == departure_id).values(
+                seats_held=Departure.seats_held - seats, version=Departure.version + 1))
+
+def _claim_seats(departure_id, seats, column):
+    """Atomically add seats to seats_held or seats_booked if they fit in capacity"""
+    claimed = db.session.execute(
+        db.update(Departure)
+        .where(Departure.id == departure_id,
+               Departure.seats_booked + Departure.seats_held + seats <= Departure.capacity)
+        .values({column: getattr(Departure, column) + seats, 'version': Departure.version + 1})
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        raise SeatsUnavailable(max(seats_available(departure_id), 0))
+
+def _with_retries(operation):
+    """Run a write transaction, retrying when SQLite reports the database is locked"""
+    for attempt in range(RESERVATION_RETRIES):
+        try:
+            return operation()
+        except OperationalError as exc:
+            db.session.rollback()
+            if 'locked' not in str(exc) and 'busy' not in str(exc) or attempt == RESERVATION_RETRIES - 1:
+                raise
+            time.sleep(random.uniform(0.01, 0.05) * (2 ** attempt))
+        except Exception:
+            db.session.rollback()
+            raise
+
+def hold_seats(kind, item_id, departure_date, seats):
+    """Set seats aside on a departure for SEAT_HOLD_TTL seconds.
+    
+    Commits its own short transaction and returns (departure_id, hold_id).
+    Raises SeatsUnavailable if the departure is full.
+    """
+    def operation():
+        now = datetime.utcnow()
+        departure_id = get_departure_id(kind, item_id, departure_date)
+        _release_expired_holds(departure_id, now)
+        _claim_seats(departure_id, seats, 'seats_held')
+        hold = SeatHold(departure_id=departure_id, seats=seats,
+                        expires_at=now + timedelta(seconds=current_app.config['SEAT_HOLD_TTL']))
+        db.session.add(hold)
+        db.session.commit()
+        return departure_id, hold.id
+    return _with_retries(operation)
+
+def convert_hold(departure_id, hold_id, seats):
+    """Turn a hold into booked seats as part of the caller's transaction"""
+    deleted = db.session.execute(db.delete(SeatHold).where(SeatHold.id == hold_id)).rowcount
+    if deleted:
+        db.session.execute(db.update(Departure).where(Departure.id == departure_id).values(
+            seats_held=Departure.seats_held - seats, seats_booked=Departure.seats_booked + seats,
+            version=Departure.version + 1).execution_options(synchronize_session=False))
+    else:
+        # The hold expired and was swept; the seats have to be claimed again
+        _claim_seats(departure_id, seats, 'seats_booked')
+
+def release_seats(departure_id, seats):
+    """Give a cancelled booking's seats back, as part of the caller's transaction"""
+    if departure_id is None:
+        return
+    db.session.execute(db.update(Departure).where(Departure.id == departure_id).values(
+        seats_booked=db.case((Departure.seats_booked >= seats, Departure.seats_booked - seats), else_=0),
+        version=Departure.version + 1).execution_options(synchronize_session=False))
+
+def cancel_reservation(kind, booking):
+    """Cancel a booking and give its seats back, committing both.
+    
+    The status changes with one conditional UPDATE, so when the same booking
+    is cancelled by several requests at once only the one whose UPDATE
+    changed the row releases the seats, updates the rollups and queues the
+    cancellation emails. Returns False if the booking was already cancelled.
+    """
+    model, _, item_fk, date_field = BOOKING_MODELS[kind]
+    
+    def operation():
+        connection = db.session.connection()
+        before = _rollup_state(booking, item_fk, date_field)
+        cancelled = connection.execute(db.update(model).where(
+            model.id == booking.id, model.status != 'cancelled').values(status='cancelled')).rowcount == 1
+        if cancelled:
+            release_seats(booking.departure_id, booking.number_of_people)
+            after = before[:2] + ('cancelled',) + before[3:]
+            _apply_rollup_deltas(connection, kind, analytics.booking_delta(before, after))
+            queue_cancellation_jobs(connection, kind, booking.id)
+        db.session.commit()
+        return cancelled
+    return _with_retries(operation)
+
+def reserve_booking(kind, item_id, departure_date, seats, make_booking):
+    """Hold seats, then insert the booking built by make_booking(departure_id) and
+    convert the hold, committing both together. Returns the committed booking.
+    """
+    departure_id, hold_id = hold_seats(kind, item_id, departure_date, seats)
+    
+    def operation():
+        booking = make_booking(departure_id)
+        db.session.add(booking)
+        convert_hold(departure_id, hold_id, seats)
+        db.session.commit()
+        return booking
+    return _with_retries(operation)
+
+def create_booking(kind, item, departure_date, people, user_id, special_requests=None):
+    """Reserve seats on a trek or travel package and commit the booking at its price.
+    
+    Raises pricing.QuoteError if the booking can't be priced (e.g. a past
+    date) and SeatsUnavailable if the departure can't take that many people.
+    """
+    _, total_price = quote_price(kind, item, departure_date, people)
+    if kind == 'trek':
+        def make_booking(departure_id):
+            return Booking(trek_date=departure_date, number_of_people=people, total_price=total_price,
+                           special_requests=special_requests, user_id=user_id, trek_id=item.id,
+                           departure_id=departure_id)
+    else:
+        def make_booking(departure_id):
+            return TravelBooking(travel_date=departure_date, number_of_people=people, total_price=total_price,
+                                 user_id=user_id, package_id=item.id, departure_id=departure_id)
+    return reserve_booking(kind, item.id, departure_date, people, make_booking)
+
+# Dashboard data layer
+# One row of the merged trek/travel booking timeline shown on the dashboard
+TimelineEntry = namedtuple('TimelineEntry', [
+    'kind', 'id', 'date', 'booking_date', 'item_name', 'item_slug',
+    'number_of_people', 'total_price', 'status'
+])
+
+BOOKING_STATUSES = ('pending', 'confirmed', 'cancelled')
+TIMELINE_PAGE_SIZE = 20
+# Tie-breaker when a trek and a travel booking share the same date
+TIMELINE_KIND_RANK = {'trek': 1, 'travel': 0}
+
+def _timeline_sort_key(entry):
+    return (entry.date, TIMELINE_KIND_RANK[entry.kind], entry.id)
+
+def encode_timeline_cursor(entry):
+    """Build the opaque 'older bookings' cursor from the last entry on a page"""
+    return '{}.{}.{}'.format(entry.date.isoformat(), entry.kind, entry.id)
+
+def decode_timeline_cursor(cursor):
+    """Parse a timeline cursor, returning None if it is missing or malformed"""
+    try:
+        date_str, kind, entry_id = cursor.split('.')
+        if kind not in TIMELINE_KIND_RANK:
+            return None
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), kind, bindable(int(entry_id))
+    except (AttributeError, ValueError):
+        return None
+
+def _timeline_query(kind, user_id, status, cursor, limit, archived=False):
+    """Fetch one page of a single booking kind joined to its trek/package name"""
+    if kind == 'trek':
+        model, item, date_field, item_field = Booking, Trek, 'trek_date', 'trek_id'
+    else:
+        model, item, date_field, item_field = TravelBooking, TravelPackage, 'travel_date', 'package_id'
+    if archived:
+        model = ARCHIVED_BOOKING_MODELS[kind]
+    date_col, item_fk = getattr(model, date_field), getattr(model, item_field)
+    
+    if archived:
+        # The archive may be another database, so names come from the catalog cache
+        query = db.session.query(
+            model.id, date_col, model.booking_date, item_fk,
+            model.number_of_people, model.total_price, model.status
+        ).filter(model.user_id == user_id)
+    else:
+        query = db.session.query(
+            model.id, date_col, model.booking_date, item.name, item.slug,
+            model.number_of_people, model.total_price, model.status
+        ).join(item, item.id == item_fk).filter(model.user_id == user_id)
+    
+    if status:
+        query = query.filter(model.status == status)
+    
+    # Keyset pagination: only rows that sort strictly after the cursor
+    if cursor:
+        cursor_date, cursor_kind, cursor_id = cursor
+        rank, cursor_rank = TIMELINE_KIND_RANK[kind], TIMELINE_KIND_RANK[cursor_kind]
+        if rank < cursor_rank:
+            query = query.filter(date_col <= cursor_date)
+        elif rank > cursor_rank:
+            query = query.filter(date_col < cursor_date)
+        else:
+            query = query.filter(db.or_(
+                date_col < cursor_date,
+                db.and_(date_col == cursor_date, model.id < cursor_id)
+            ))
+    
+    rows = query.order_by(date_col.desc(), model.id.desc()).limit(limit).all()
+    if archived:
+        get_item = get_trek if kind == 'trek' else get_package
+        entries = []
+        for booking_id, date, booking_date, item_id, people, price, booking_status in rows:
+            snapshot = get_item(item_id)
+            entries.append(TimelineEntry(kind, booking_id, date, booking_date,
+                                         snapshot.name if snapshot else 'No longer offered',
+                                         snapshot.slug if snapshot else None, people, price, booking_status))
+        return entries
+    return [TimelineEntry(kind, *row) for row in rows]
+
+def booking_timeline(user_id, status=None, cursor=None, limit=TIMELINE_PAGE_SIZE, archived=False):
+    """Return (entries, next_cursor) for a user's trek and travel bookings.
+    
+    Both booking kinds are read with one joined query each, so the number of
+    queries stays fixed no matter how many bookings the user has. With
+    archived, the bookings moved to the archive are read instead.
+    """
+    if status not in BOOKING_STATUSES:
+        status = None
+    cursor = decode_timeline_cursor(cursor)
+    
+    trek_entries = _timeline_query('trek', user_id, status, cursor, limit + 1, archived)
+    travel_entries = _timeline_query('travel', user_id, status, cursor, limit + 1, archived)
+    
+    merged = heapq.merge(trek_entries, travel_entries, key=_timeline_sort_key, reverse=True)
+    entries = [entry for _, entry in zip(range(limit + 1), merged)]
+    
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_timeline_cursor(entries[-1])
+    return entries, next_cursor
+
+# Booking analytics
+# booking_rollups holds bookings, cancellations, people and revenue per
+# trek/package and departure month. Every booking insert, update or delete
+# adds its difference to the affected rows in the same flush, so the totals
+# commit (or roll back) with the booking; reports only read rollups.
+# cancel_reservation() applies its own difference, and only when its
+# guarded UPDATE changed the row; other core statements that bypass the ORM
+# must be followed by `flask analytics rebuild`.
+def _rollup_state(target, item_fk, date_field, before=False):
+    """(item_id, month, status, people, total_price) of a booking, before or after this flush"""
+    attrs = db.inspect(target).attrs
+    
+    def value(name):
+        if before and attrs[name].history.deleted:
+            return attrs[name].history.deleted[0]
+        return getattr(target, name)
+    return (value(item_fk), value(date_field).strftime('%Y-%m'), value('status') or 'pending',
+            value('number_of_people'), value('total_price'))
+
+def _apply_rollup_deltas(connection, kind, deltas):
+    """Add measure deltas to rollup rows, creating rows that don't exist yet"""
+    table = BookingRollup.__table__
+    dialect = connection.dialect.name
+    for (item_id, month), values in deltas:
+        row = dict(zip(analytics.MEASURES, values), kind=kind, item_id=item_id, month=month)
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(table).values(**row)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.kind, table.c.item_id, table.c.month],
+                set_={name: table.c[name] + statement.excluded[name] for name in analytics.MEASURES}))
+            continue
+        updated = connection.execute(db.update(table).where(
+            table.c.kind == kind, table.c.item_id == item_id, table.c.month == month).values(
+            {name: table.c[name] + row[name] for name in analytics.MEASURES})).rowcount
+        if not updated:
+            connection.execute(db.insert(table).values(**row))
+
+def _track_booking_rollups(kind, item_fk, date_field):
+    """Mapper listeners keeping booking_rollups in step with one booking model"""
+    def after_insert(mapper, connection, target):
+        _apply_rollup_deltas(connection, kind, analytics.booking_delta(
+            None, _rollup_state(target, item_fk, date_field)))
+    
+    def after_update(mapper, connection, target):
+        _apply_rollup_deltas(connection, kind, analytics.booking_delta(
+            _rollup_state(target, item_fk, date_field, before=True), _rollup_state(target, item_fk, date_field)))
+    
+    def after_delete(mapper, connection, target):
+        _apply_rollup_deltas(connection, kind, analytics.booking_delta(
+            _rollup_state(target, item_fk, date_field, before=True), None))
+    return after_insert, after_update, after_delete
+
+for _kind, (_model, _item_model, _item_fk, _date_field) in BOOKING_MODELS.items():
+    for _event_name, _listener in zip(('after_insert', 'after_update', 'after_delete'),
+                                      _track_booking_rollups(_kind, _item_fk, _date_field)):
+        event.listen(_model, _event_name, _listener)
+
+def _add_chunks(builder, connection, query):
+    for chunk in connection.execute(query).partitions():
+        builder.add(chunk)
+
+def rebuild_booking_rollups(connection, chunk_size=50000):
+    """Recompute booking_rollups from a full scan of both booking tables and their archives.
+    
+    Runs in the caller's transaction and takes the rollup table for itself
+    first (SQLite's write lock; a table lock on PostgreSQL), so bookings
+    committed while it scans are neither lost nor counted twice. With a
+    separate archive database, don't run it during `flask bookings archive`.
+    """
+    table = BookingRollup.__table__
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('LOCK TABLE booking_rollups IN EXCLUSIVE MODE')
+    connection.execute(db.delete(table))
+    counts = {}
+    for kind, (hot_model, item_model, item_fk, date_field) in BOOKING_MODELS.items():
+        builder = analytics.RollupBuilder()
+        for model in (hot_model, ARCHIVED_BOOKING_MODELS[kind]):
+            date_column = getattr(model, date_field)
+            query = db.select(getattr(model, item_fk), db.extract('year', date_column), db.extract('month', date_column),
+                              db.case((model.status == 'cancelled', 1), else_=0),
+                              model.number_of_people, model.total_price)
+            query = query.execution_options(yield_per=chunk_size)
+            if model is hot_model or db.engines[ARCHIVE_BIND] is db.engine:
+                _add_chunks(builder, connection, query)
+            else:
+                with db.engines[ARCHIVE_BIND].connect() as archive_connection:
+                    _add_chunks(builder, archive_connection, query)
+        rows = builder.rows(kind)
+        for batch in catalog_io.batched(rows, 1000):
+            connection.execute(db.insert(table), batch)
+        counts[kind] = len(rows)
+    return counts
+
+# group -> per booking kind: (item model or None, key column, label column)
+REPORT_GROUPS = {
+    'trek': {'trek': (Trek, Trek.slug, Trek.name)},
+    'package': {'travel': (TravelPackage, TravelPackage.slug, TravelPackage.name)},
+    'region': {'trek': (Trek, Trek.region, Trek.region),
+               'travel': (TravelPackage, TravelPackage.destination, TravelPackage.destination)},
+    'month': {'trek': (None, BookingRollup.month, BookingRollup.month),
+              'travel': (None, BookingRollup.month, BookingRollup.month)},
+}
+REPORT_FIELDS = ('key', 'label', 'bookings', 'cancellations', 'cancellation_rate', 'people', 'revenue')
+
+def booking_report(group, kind=None, start=None, end=None):
+    """Report lines for a group, optionally one booking kind and a YYYY-MM month range.
+    
+    Reads booking_rollups only (joined to the catalog for names and
+    regions), so it costs the same at any booking volume.
+    """
+    rollup = BookingRollup
+    totals = {}
+    for rollup_kind, (item_model, key_column, label_column) in REPORT_GROUPS[group].items():
+        if kind and rollup_kind != kind:
+            continue
+        query = db.select(key_column, label_column, *(db.func.sum(getattr(rollup, name)) for name in analytics.MEASURES))
+        if item_model is not None:
+            query = query.join(item_model, item_model.id == rollup.item_id)
+        query = query.where(rollup.kind == rollup_kind)
+        if start:
+            query = query.where(rollup.month >= start)
+        if end:
+            query = query.where(rollup.month <= end)
+        for key, label, *sums in db.session.execute(query.group_by(key_column, label_column)):
+            # Regions and months collect trek and travel rows under one key
+            previous = totals.get(key)
+            totals[key] = [label] + ([a + (b or 0) for a, b in zip(previous[1:], sums)] if previous
+                                     else [value or 0 for value in sums])
+    lines = analytics.summarize((key, label, *sums) for key, (label, *sums) in totals.items())
+    if group == 'month':
+        return sorted(lines, key=lambda line: line['key'])
+    return sorted(lines, key=lambda line: (-line['revenue'], line['key']))
+
+def parse_report_args(args):
+    """(group, kind, start, end) from query arguments, or None if they are invalid"""
+    group = args.get('group', 'month')
+    kind = args.get('kind') or None
+    start, end = args.get('from') or None, args.get('to') or None
+    month_pattern = '%Y-%m'
+    try:
+        for month in (start, end):
+            if month:
+                datetime.strptime(month, month_pattern)
+    except ValueError:
+        return None
+    if group not in REPORT_GROUPS or kind not in (None, 'trek', 'travel'):
+        return None
+    return group, kind, start, end
+
+# Booking archive
+# `flask bookings archive` moves bookings whose departure is more than
+# BOOKING_ARCHIVE_DAYS past, and (by default) cancelled ones, into
+# bookings_archive / travel_bookings_archive, which live in the same database
+# or in DATABASE_ARCHIVE_URL. The hot tables then hold only the bookings
+# pages work with; the dashboard reads the archive when asked to.
+# Each batch is deleted from the hot table with RETURNING and the returned
+# rows are upserted into the archive, which commits first: a run that stops
+# anywhere leaves every booking in the hot table, the archive or both, and
+# running it again finishes the move. The statements are Core, so rollups
+# keep counting archived bookings and no jobs are queued.
+def _archive_condition(model, date_field, cutoff, cancelled):
+    condition = getattr(model, date_field) < cutoff
+    return db.or_(condition, model.status == 'cancelled') if cancelled else condition
+
+def _upsert_archived(connection, table, rows):
+    """Write archived rows, replacing copies left by an interrupted run"""
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={column.name: statement.excluded[column.name] for column in table.columns if column.name != 'id'}),
+            rows)
+        return
+    connection.execute(db.delete(table).where(table.c.id.in_([row['id'] for row in rows])))
+    connection.execute(db.insert(table), rows)
+
+def archive_booking_batch(kind, cutoff, cancelled=True, batch_size=1000):
+    """Move the next batch_size archivable bookings of a kind (lowest ids first); returns how many moved"""
+    model, _, _, date_field = BOOKING_MODELS[kind]
+    hot, archive = model.__table__, ARCHIVED_BOOKING_MODELS[kind].__table__
+    columns = [hot.c[column.name] for column in archive.columns if column.name != 'archived_at']
+    batch = (db.select(hot.c.id).where(_archive_condition(model, date_field, cutoff, cancelled))
+             .order_by(hot.c.id).limit(batch_size))
+    hot_engine, archive_engine = db.engines[None], db.engines[ARCHIVE_BIND]
+    
+    with hot_engine.begin() as connection:
+        if connection.dialect.delete_returning:
+            rows = connection.execute(db.delete(hot).where(hot.c.id.in_(batch.scalar_subquery()))
+                                      .returning(*columns)).mappings().all()
+        else:
+            ids = connection.execute(batch.with_for_update()).scalars().all()
+            rows = connection.execute(db.select(*columns).where(hot.c.id.in_(ids))).mappings().all()
+            connection.execute(db.delete(hot).where(hot.c.id.in_(ids)))
+        if not rows:
+            return 0
+        archived_at = datetime.utcnow()
+        rows = [dict(row, archived_at=archived_at) for row in rows]
+        if archive_engine is hot_engine:
+            _upsert_archived(connection, archive, rows)
+        else:
+            # Archive commits first; if the hot delete then fails, the next run moves the rows again
+            with archive_engine.begin() as archive_connection:
+                _upsert_archived(archive_connection, archive, rows)
+    return len(rows)
+
+def archive_bookings(kind, older_than_days=None, cancelled=True, batch_size=1000, max_batches=None, progress=None):
+    """Move a kind's archivable bookings batch by batch; returns how many moved.
+    
+    progress, if given, is called with the running total after each batch.
+    """
+    days = current_app.config['BOOKING_ARCHIVE_DAYS'] if older_than_days is None else older_than_days
+    cutoff = datetime.utcnow().date() - timedelta(days=days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_booking_batch(kind, cutoff, cancelled, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        if progress:
+            progress(moved)
+    return moved
@@ -0,0 +1,533 @@
+# catalog.py - Catalog data layer: snapshots, listings, facets, search and similar items
+
+# Treks and travel packages are read as immutable snapshots through the
+# catalog cache (extensions.catalog_cache), from the replica when there is
+# one. Writes go through the ORM as usual; the listeners here keep the
+# caches, the full-text index and the similar-items lists in step with them.
+
+from collections import namedtuple
+from datetime import datetime
+import math
+import time
+
+from flask import current_app
+from sqlalchemy import event
+
+import catalog_io
+import pricing
+import search as catalog_search
+import similar
+from extensions import catalog_cache, catalog_session, db, page_cache
+from itinerary import build_details
+from models import (CATALOG_KINDS, CATALOG_MODELS, SEARCH_KINDS, CatalogVector, CatalogVersion, PriceRule, SimilarItem,
+                    TravelPackage, Trek)
+from tasks import job_handler, job_queue
+
+# Catalog snapshots
+TrekSnapshot = namedtuple('TrekSnapshot', [c.name for c in Trek.__table__.columns])
+PackageSnapshot = namedtuple('PackageSnapshot', [c.name for c in TravelPackage.__table__.columns])
+
+def _snapshot(snapshot_cls, row):
+    snapshot = snapshot_cls(*(getattr(row, field) for field in snapshot_cls._fields))
+    if snapshot.details is None:
+        # Row saved before the details column existed (see `flask backfill-details`)
+        snapshot = snapshot._replace(details=build_details(row.itinerary, row.includes, row.excludes))
+    return snapshot
+
+def _snapshot_one(snapshot_cls, query):
+    row = query.first()
+    return _snapshot(snapshot_cls, row) if row is not None else None
+
+def _snapshot_all(snapshot_cls, query):
+    return tuple(_snapshot(snapshot_cls, row) for row in query.all())
+
+def get_featured_treks(limit=3):
+    """Most recently added treks for the home page"""
+    return catalog_cache.get_or_load(
+        ('treks', 'featured', limit),
+        lambda: _snapshot_all(TrekSnapshot, catalog_session.query(Trek).order_by(Trek.created_at.desc()).limit(limit)))
+
+def get_trek_by_slug(slug):
+    return catalog_cache.get_or_load(
+        ('trek', 'slug', slug),
+        lambda: _snapshot_one(TrekSnapshot, catalog_session.query(Trek).filter_by(slug=slug)))
+
+def get_trek(trek_id):
+    return catalog_cache.get_or_load(
+        ('trek', 'id', trek_id),
+        lambda: _snapshot_one(TrekSnapshot, catalog_session.query(Trek).filter_by(id=trek_id)))
+
+def get_package_by_slug(slug):
+    return catalog_cache.get_or_load(
+        ('package', 'slug', slug),
+        lambda: _snapshot_one(PackageSnapshot, catalog_session.query(TravelPackage).filter_by(slug=slug)))
+
+def get_package(package_id):
+    return catalog_cache.get_or_load(
+        ('package', 'id', package_id),
+        lambda: _snapshot_one(PackageSnapshot, catalog_session.query(TravelPackage).filter_by(id=package_id)))
+
+def get_similar_treks(trek_id):
+    """Precomputed neighbours of a trek, most similar first"""
+    return catalog_cache.get_or_load(
+        ('trek', 'similar', trek_id),
+        lambda: _snapshot_all(TrekSnapshot, catalog_session.query(Trek).join(
+            SimilarItem, db.and_(SimilarItem.kind == 'trek', SimilarItem.similar_id == Trek.id)).filter(
+            SimilarItem.item_id == trek_id).order_by(SimilarItem.rank)))
+
+def get_similar_packages(package_id):
+    return catalog_cache.get_or_load(
+        ('package', 'similar', package_id),
+        lambda: _snapshot_all(PackageSnapshot, catalog_session.query(TravelPackage).join(
+            SimilarItem, db.and_(SimilarItem.kind == 'travel', SimilarItem.similar_id == TravelPackage.id)).filter(
+            SimilarItem.item_id == package_id).order_by(SimilarItem.rank)))
+
+# Catalog listings
+# /treks and /travel take equality filters (facets), range filters and a sort
+# order, and page through results with a keyset cursor on (sort value, id)
+LISTING_PAGE_SIZE = 12
+DIFFICULTY_ORDER = ('Easy', 'Moderate', 'Difficult')
+
+TrekFilters = namedtuple('TrekFilters', [
+    'region', 'difficulty', 'min_price', 'max_price', 'min_days', 'max_days',
+    'min_altitude', 'max_altitude', 'sort'
+])
+PackageFilters = namedtuple('PackageFilters', [
+    'destination', 'package_type', 'min_price', 'max_price', 'min_days', 'max_days', 'sort'
+])
+CatalogPage = namedtuple('CatalogPage', ['items', 'next_cursor'])
+
+# sort name -> (column, descending, cursor value type)
+TREK_SORTS = {
+    'default': (Trek.id, False, int),
+    'price_asc': (Trek.price, False, float),
+    'price_desc': (Trek.price, True, float),
+    'duration_asc': (Trek.duration, False, int),
+    'duration_desc': (Trek.duration, True, int),
+    'altitude_desc': (db.func.coalesce(Trek.max_altitude, 0), True, int),
+}
+PACKAGE_SORTS = {
+    'default': (TravelPackage.id, False, int),
+    'price_asc': (TravelPackage.price, False, float),
+    'price_desc': (TravelPackage.price, True, float),
+    'duration_asc': (TravelPackage.duration, False, int),
+    'duration_desc': (TravelPackage.duration, True, int),
+}
+SORT_LABELS = {
+    'default': 'Recommended',
+    'price_asc': 'Price: low to high',
+    'price_desc': 'Price: high to low',
+    'duration_asc': 'Duration: shortest first',
+    'duration_desc': 'Duration: longest first',
+    'altitude_desc': 'Highest altitude first',
+}
+
+# Database integers are 64-bit; binding anything larger raises OverflowError
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+def bindable(value):
+    """value, if the database can compare with it; ValueError for integers
+    beyond 64 bits and for infinite or NaN floats"""
+    if isinstance(value, int) and not INT64_MIN <= value <= INT64_MAX:
+        raise ValueError(f'{value} is out of range')
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f'{value} is not a finite number')
+    return value
+
+def _arg(args, name, type=str):
+    """Read an optional query argument, treating blanks and bad values as unset"""
+    value = args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return bindable(type(value))
+    except ValueError:
+        return None
+
+def parse_trek_filters(args):
+    sort = args.get('sort')
+    return TrekFilters(
+        region=_arg(args, 'region'),
+        difficulty=_arg(args, 'difficulty'),
+        min_price=_arg(args, 'min_price', float),
+        max_price=_arg(args, 'max_price', float),
+        min_days=_arg(args, 'min_days', int),
+        max_days=_arg(args, 'max_days', int),
+        min_altitude=_arg(args, 'min_altitude', int),
+        max_altitude=_arg(args, 'max_altitude', int),
+        sort=sort if sort in TREK_SORTS else 'default',
+    )
+
+def parse_package_filters(args):
+    sort = args.get('sort')
+    return PackageFilters(
+        destination=_arg(args, 'destination'),
+        package_type=_arg(args, 'type'),
+        min_price=_arg(args, 'min_price', float),
+        max_price=_arg(args, 'max_price', float),
+        min_days=_arg(args, 'min_days', int),
+        max_days=_arg(args, 'max_days', int),
+        sort=sort if sort in PACKAGE_SORTS else 'default',
+    )
+
+def _range_filters(query, model, filters):
+    """Apply the price/duration/altitude range filters shared by listings and facets"""
+    if filters.min_price is not None:
+        query = query.filter(model.price >= filters.min_price)
+    if filters.max_price is not None:
+        query = query.filter(model.price <= filters.max_price)
+    if filters.min_days is not None:
+        query = query.filter(model.duration >= filters.min_days)
+    if filters.max_days is not None:
+        query = query.filter(model.duration <= filters.max_days)
+    if getattr(filters, 'min_altitude', None) is not None:
+        query = query.filter(model.max_altitude >= filters.min_altitude)
+    if getattr(filters, 'max_altitude', None) is not None:
+        query = query.filter(model.max_altitude <= filters.max_altitude)
+    return query
+
+def _decode_listing_cursor(cursor, value_type):
+    """Parse a '<sort value>~<id>' cursor, returning None if malformed"""
+    try:
+        value, item_id = cursor.rsplit('~', 1)
+        return bindable(value_type(value)), bindable(int(item_id))
+    except (AttributeError, ValueError):
+        return None
+
+def _listing_page(model, snapshot_cls, sorts, query, sort, cursor, limit):
+    """Order a listing query by the chosen sort and fetch one keyset page"""
+    column, descending, value_type = sorts[sort]
+    
+    position = _decode_listing_cursor(cursor, value_type)
+    if position:
+        value, item_id = position
+        if descending:
+            query = query.filter(db.or_(column < value, db.and_(column == value, model.id < item_id)))
+        else:
+            query = query.filter(db.or_(column > value, db.and_(column == value, model.id > item_id)))
+    
+    if descending:
+        query = query.order_by(column.desc(), model.id.desc())
+    else:
+        query = query.order_by(column.asc(), model.id.asc())
+    
+    rows = query.add_columns(column).limit(limit + 1).all()
+    items = tuple(_snapshot(snapshot_cls, row) for row, _ in rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        last_row, last_value = rows[limit - 1]
+        next_cursor = '{}~{}'.format(last_value, last_row.id)
+    return CatalogPage(items, next_cursor)
+
+def list_treks(filters, cursor=None, limit=LISTING_PAGE_SIZE):
+    """One page of treks matching the filters"""
+    def load():
+        query = _range_filters(catalog_session.query(Trek), Trek, filters)
+        if filters.region:
+            query = query.filter(Trek.region == filters.region)
+        if filters.difficulty:
+            query = query.filter(Trek.difficulty == filters.difficulty)
+        return _listing_page(Trek, TrekSnapshot, TREK_SORTS, query, filters.sort, cursor, limit)
+    return catalog_cache.get_or_load(('treks', 'page', filters, cursor, limit), load)
+
+def list_packages(filters, cursor=None, limit=LISTING_PAGE_SIZE):
+    """One page of travel packages matching the filters"""
+    def load():
+        query = _range_filters(catalog_session.query(TravelPackage), TravelPackage, filters)
+        if filters.destination:
+            query = query.filter(TravelPackage.destination == filters.destination)
+        if filters.package_type:
+            query = query.filter(TravelPackage.package_type == filters.package_type)
+        return _listing_page(TravelPackage, PackageSnapshot, PACKAGE_SORTS, query, filters.sort, cursor, limit)
+    return catalog_cache.get_or_load(('packages', 'page', filters, cursor, limit), load)
+
+def _facet_counts(model, first, second, filters, first_value, second_value):
+    """Count rows per value of two facet columns with one GROUP BY query.
+    
+    Each facet's counts honour the other facet's selection but not its own,
+    so the sidebar shows how many results picking a different value would give.
+    """
+    query = catalog_session.query(first, second, db.func.count(model.id)).group_by(first, second)
+    rows = _range_filters(query, model, filters).all()
+    
+    first_counts, second_counts = {}, {}
+    for a, b, count in rows:
+        if not second_value or b == second_value:
+            first_counts[a] = first_counts.get(a, 0) + count
+        if not first_value or a == first_value:
+            second_counts[b] = second_counts.get(b, 0) + count
+    return first_counts, second_counts
+
+def trek_facets(filters):
+    """Region and difficulty counts for the /treks filter sidebar"""
+    def load():
+        regions, difficulties = _facet_counts(Trek, Trek.region, Trek.difficulty, filters,
+                                              filters.region, filters.difficulty)
+        rank = {name: i for i, name in enumerate(DIFFICULTY_ORDER)}
+        return {
+            'region': tuple(sorted(regions.items())),
+            'difficulty': tuple(sorted(difficulties.items(),
+                                       key=lambda item: (rank.get(item[0], len(rank)), item[0]))),
+        }
+    return catalog_cache.get_or_load(('treks', 'facets', filters._replace(sort=None)), load)
+
+def package_facets(filters):
+    """Destination and package type counts for the /travel filter sidebar"""
+    def load():
+        destinations, types = _facet_counts(TravelPackage, TravelPackage.destination,
+                                             TravelPackage.package_type, filters,
+                                             filters.destination, filters.package_type)
+        return {
+            'destination': tuple(sorted(destinations.items())),
+            'type': tuple(sorted((t, n) for t, n in types.items() if t)),
+        }
+    return catalog_cache.get_or_load(('packages', 'facets', filters._replace(sort=None)), load)
+
+# Price quotes
+# Every item's price and the rate rules, compiled into pricing.QuoteTables
+# once per day and cached like the snapshots, so a change to either shows
+# in every worker within CATALOG_VERSION_CHECK seconds. /api/quote and the
+# bookings price through them.
+def get_quote_tables():
+    today = datetime.utcnow().date()
+    def load():
+        items = [(kind, item_id, price) for kind, model in CATALOG_KINDS.items()
+                 for item_id, price in catalog_session.execute(db.select(model.id, model.price))]
+        rules = catalog_session.execute(db.select(*PriceRule.__table__.columns).order_by(PriceRule.id)).all()
+        return pricing.QuoteTables(items, rules, today, horizon=current_app.config['QUOTE_HORIZON_DAYS'])
+    return catalog_cache.get_or_load(('quotes', today), load)
+
+def quote_price(kind, item, departure_date, people):
+    """(unit price, total price) of booking item (a row or snapshot) at its current price; raises QuoteError"""
+    # Never price a booking from rules another process has already changed
+    sync_catalog_version(max_age=0)
+    tables = get_quote_tables()
+    if tables.rows([kind], [item.id])[0] < 0:
+        # Added since the tables were compiled
+        catalog_cache.discard(('quotes', datetime.utcnow().date()))
+        tables = get_quote_tables()
+    return tables.quote_one(kind, item.id, departure_date, people, price=item.price)
+
+# Other processes
+# Each worker caches on its own and a commit only clears the caches of the
+# process that made it, so catalog writes also bump the catalog_version row
+# in their transaction. Before a request reads the catalog, a worker that
+# hasn't looked for CATALOG_VERSION_CHECK seconds compares that row with the
+# version its caches were filled at, and drops them if it has moved.
+def _bump_catalog_version(connection):
+    table = CatalogVersion.__table__
+    bumped = connection.execute(db.update(table).where(table.c.id == 1).values(version=table.c.version + 1))
+    if not bumped.rowcount:
+        # Database not upgraded since catalog_version was added
+        connection.execute(db.insert(table).values(id=1, version=1))
+
+def sync_catalog_version(max_age=None):
+    """Drop this process's catalog caches if another process changed the catalog since they were filled.
+    
+    Reads catalog_version at most every max_age seconds (CATALOG_VERSION_CHECK).
+    """
+    state = current_app.extensions['catalog_version']
+    max_age = current_app.config['CATALOG_VERSION_CHECK'] if max_age is None else max_age
+    now = time.monotonic()
+    if state['checked'] is not None and now - state['checked'] < max_age:
+        return
+    state['checked'] = now
+    version = catalog_session.scalar(db.select(CatalogVersion.version).where(CatalogVersion.id == 1)) or 0
+    if state['version'] is not None and version != state['version']:
+        _drop_catalog_caches()
+    state['version'] = version
+
+@event.listens_for(db.session, 'after_flush')
+def _track_catalog_writes(session, flush_context):
+    """Remember when a flush touched a Trek, TravelPackage or PriceRule row and tell the other processes"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, CATALOG_MODELS + (PriceRule,)):
+            session.info['catalog_dirty'] = True
+            _bump_catalog_version(session.connection())
+            break
+
+def _drop_catalog_caches():
+    catalog_cache.invalidate()
+    page_cache.invalidate()
+
+def invalidate_catalog():
+    """Drop cached catalog snapshots and every page rendered from them, in every process.
+    
+    For writes made without the ORM (bulk SQL, commands, jobs), after their commit.
+    """
+    with db.engine.begin() as connection:
+        _bump_catalog_version(connection)
+    _drop_catalog_caches()
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_catalog_on_commit(session):
+    # The flush bumped catalog_version already
+    if session.info.pop('catalog_dirty', False):
+        _drop_catalog_caches()
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_catalog_writes(session):
+    session.info.pop('catalog_dirty', None)
+
+# Full-text search index
+# The FTS5 table is created with the rest of the schema and kept in step
+# with Trek/TravelPackage rows inside the same flush that writes them.
+# Only SQLite has one; elsewhere search.py matches the catalog tables.
+SEARCH_PAGE_SIZE = 20
+
+@event.listens_for(db.Model.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        catalog_search.create_index(connection)
+
+def _index_catalog_item(mapper, connection, target):
+    if connection.dialect.name == 'sqlite':
+        catalog_search.index_document(connection, SEARCH_KINDS[type(target)], target)
+
+def _unindex_catalog_item(mapper, connection, target):
+    if connection.dialect.name == 'sqlite':
+        catalog_search.remove_document(connection, SEARCH_KINDS[type(target)], target.id)
+
+for _model in SEARCH_KINDS:
+    event.listen(_model, 'after_insert', _index_catalog_item)
+    event.listen(_model, 'after_update', _index_catalog_item)
+    event.listen(_model, 'after_delete', _unindex_catalog_item)
+
+# Similar treks and packages
+# Every catalog write stores the item's feature vector (similar.py) in the
+# same flush and queues a refresh_similar_items job, which recomputes only
+# the neighbour lists the change can affect: the changed items' own, lists
+# that contain them, and lists they now outrank the last entry of. Detail
+# pages read the stored lists. A vector edited while a refresh runs keeps a
+# version ahead of indexed_version and is picked up by the next refresh.
+def store_item_vectors(connection, kind, items):
+    """Upsert the vectors of catalog rows and mark them for the next refresh"""
+    table = CatalogVector.__table__
+    rows = [{'kind': kind, 'item_id': item.id, 'vector': similar.to_blob(similar.item_vector(kind, item))}
+            for item in items]
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.kind, table.c.item_id],
+            set_={'vector': statement.excluded.vector, 'version': table.c.version + 1}), rows)
+        return
+    for row in rows:
+        updated = connection.execute(db.update(table).where(
+            table.c.kind == kind, table.c.item_id == row['item_id']).values(
+            vector=row['vector'], version=table.c.version + 1)).rowcount
+        if not updated:
+            connection.execute(db.insert(table).values(**row))
+
+def queue_similar_refresh(connection, kind, session_info=None):
+    """Queue one refresh per kind and transaction (session_info tracks what is queued)"""
+    if session_info is not None:
+        queued = session_info.setdefault('similar_refresh_queued', set())
+        if kind in queued:
+            return
+        queued.add(kind)
+    job_queue.enqueue(connection, 'refresh_similar_items', {'kind': kind})
+
+def _vectorize_catalog_item(mapper, connection, target):
+    kind = SEARCH_KINDS[type(target)]
+    state = db.inspect(target)
+    if state.has_identity and not any(state.attrs[name].history.has_changes() for name in similar.FIELDS[kind]):
+        return
+    store_item_vectors(connection, kind, [target])
+    queue_similar_refresh(connection, kind, state.session.info)
+
+def _remove_catalog_vector(mapper, connection, target):
+    kind = SEARCH_KINDS[type(target)]
+    connection.execute(db.delete(CatalogVector.__table__).where(
+        CatalogVector.kind == kind, CatalogVector.item_id == target.id))
+    queue_similar_refresh(connection, kind, db.inspect(target).session.info)
+
+for _model in SEARCH_KINDS:
+    event.listen(_model, 'after_insert', _vectorize_catalog_item)
+    event.listen(_model, 'after_update', _vectorize_catalog_item)
+    event.listen(_model, 'after_delete', _remove_catalog_vector)
+
+@event.listens_for(db.session, 'after_commit')
+def _reset_similar_refresh(session):
+    session.info.pop('similar_refresh_queued', None)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_similar_refresh(session):
+    session.info.pop('similar_refresh_queued', None)
+
+def update_similar_items(connection, kind, full=False):
+    """Recompute stale neighbour lists (all of them with full); returns how many were written"""
+    vectors_table, items_table = CatalogVector.__table__, SimilarItem.__table__
+    known_ids = db.select(vectors_table.c.item_id).where(vectors_table.c.kind == kind)
+    # Lists of deleted items go; lists that point at them are redone below
+    connection.execute(db.delete(items_table).where(
+        items_table.c.kind == kind, items_table.c.item_id.not_in(known_ids)))
+    rows = connection.execute(db.select(
+        vectors_table.c.item_id, vectors_table.c.vector, vectors_table.c.version,
+        vectors_table.c.indexed_version, vectors_table.c.threshold).where(
+        vectors_table.c.kind == kind).order_by(vectors_table.c.item_id)).all()
+    if not rows:
+        return 0
+    ids = [row.item_id for row in rows]
+    vectors = similar.from_blobs(row.vector for row in rows)
+    if full:
+        targets = range(len(rows))
+    else:
+        changed = [index for index, row in enumerate(rows) if row.version != row.indexed_version]
+        listing = set(connection.execute(db.select(items_table.c.item_id).where(
+            items_table.c.kind == kind, items_table.c.similar_id.not_in(known_ids))).scalars())
+        for batch in catalog_io.batched((ids[index] for index in changed), 500):
+            listing.update(connection.execute(db.select(items_table.c.item_id).where(
+                items_table.c.kind == kind, items_table.c.similar_id.in_(batch))).scalars())
+        position = {item_id: index for index, item_id in enumerate(ids)}
+        targets = similar.rows_to_refresh(vectors, changed, [row.threshold for row in rows],
+                                          [position[item_id] for item_id in listing])
+    if not len(targets):
+        return 0
+    
+    k = current_app.config['SIMILAR_ITEMS']
+    neighbours, scores = similar.top_k(vectors, k, targets)
+    target_ids = [ids[index] for index in targets]
+    for batch in catalog_io.batched(target_ids, 500):
+        connection.execute(db.delete(items_table).where(items_table.c.kind == kind, items_table.c.item_id.in_(batch)))
+    entries = ({'kind': kind, 'item_id': item_id, 'rank': rank, 'similar_id': int(ids[neighbour]),
+                'score': float(score)}
+               for item_id, row_neighbours, row_scores in zip(target_ids, neighbours, scores)
+               for rank, (neighbour, score) in enumerate(zip(row_neighbours, row_scores)))
+    for batch in catalog_io.batched(entries, 1000):
+        connection.execute(db.insert(items_table), batch)
+    # A short list (fewer than k other items) takes any newcomer
+    full_lists = neighbours.shape[1] == k
+    connection.execute(db.update(vectors_table).where(
+        vectors_table.c.kind == kind, vectors_table.c.item_id == db.bindparam('target_id')).values(
+        indexed_version=db.bindparam('read_version'), threshold=db.bindparam('last_score')), [
+        {'target_id': item_id, 'read_version': rows[index].version,
+         'last_score': float(row_scores[-1]) if full_lists else None}
+        for item_id, index, row_scores in zip(target_ids, targets, scores)])
+    return len(target_ids)
+
+def rebuild_similar_items(connection, kind, chunk_size=1000):
+    """Recompute every vector of a kind from the catalog table, then every neighbour list"""
+    model = CATALOG_KINDS[kind]
+    table = CatalogVector.__table__
+    connection.execute(db.delete(table).where(table.c.kind == kind))
+    query = db.select(model.id, *(getattr(model, name) for name in similar.FIELDS[kind]))
+    for chunk in connection.execute(query.execution_options(yield_per=chunk_size)).partitions():
+        connection.execute(db.insert(table), [
+            {'kind': kind, 'item_id': row.id, 'vector': similar.to_blob(similar.item_vector(kind, row))}
+            for row in chunk])
+    return update_similar_items(connection, kind, full=True)
+
+@job_handler()
+def refresh_similar_items(payload, job):
+    if update_similar_items(db.session.connection(), payload['kind']):
+        db.session.commit()
+        invalidate_catalog()
+    else:
+        db.session.commit()
@@ -0,0 +1,92 @@
+# catalog_cache.py - In-process read-through cache for catalog data
+
+from collections import OrderedDict
+import threading
+import time
+
+_MISSING = object()
+
+
+class CatalogCache:
+    """Thread-safe LRU cache with a per-entry TTL.
+
+    Values are expected to be immutable snapshots (tuples, namedtuples) so the
+    same object can be handed to every request without copying.
+    """
+
+    def __init__(self, max_entries=512, ttl=300, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation; loads that started before the bump
+        # are not stored, so a slow reader cannot re-cache stale rows
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, version=None):
+        """Store value unless the cache was invalidated since version was read"""
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss"""
+        version = self.version
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # Load outside the lock so one slow query does not block other keys
+        value = loader()
+        self.set(key, value, version=version)
+        return value
+
+    def discard(self, key):
+        """Drop a single entry, e.g. after that row was written"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self.version += 1
+
+    def invalidate(self):
+        """Drop every entry, e.g. after a catalog write"""
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
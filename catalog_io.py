@@ -0,0 +1,127 @@
+# catalog_io.py - Streaming JSONL/CSV reading, validation and writing of catalog rows
+
+# Supplier inventories run to thousands of treks and packages, so files are
+# read and written one row at a time and handed on in fixed-size batches;
+# memory use depends on the batch size, not on the file.
+
+import csv
+import json
+import re
+from itertools import islice
+
+# Importable/exported columns per kind, in file order; slug is the upsert key
+FIELDS = {
+    'trek': ['slug', 'name', 'region', 'duration', 'difficulty', 'max_altitude', 'price',
+             'description', 'itinerary', 'includes', 'excludes', 'image_url'],
+    'travel': ['slug', 'name', 'destination', 'duration', 'package_type', 'price',
+               'description', 'itinerary', 'includes', 'excludes', 'image_url'],
+}
+REQUIRED = {
+    'trek': ['slug', 'name', 'region', 'duration', 'difficulty', 'price'],
+    'travel': ['slug', 'name', 'destination', 'duration', 'price'],
+}
+INTEGER_FIELDS = {'duration', 'max_altitude'}
+FLOAT_FIELDS = {'price'}
+DIFFICULTIES = ('Easy', 'Moderate', 'Difficult')
+# Column widths from the models; longer values would be truncated or rejected
+MAX_LENGTHS = {'slug': 100, 'name': 100, 'region': 50, 'destination': 50, 'difficulty': 20,
+               'package_type': 50, 'image_url': 200}
+
+_SLUG_RE = re.compile(r'^[a-z0-9]+(?:-[a-z0-9]+)*$')
+
+
+class InvalidRow(ValueError):
+    """A row that cannot be imported; the message says why"""
+
+
+def detect_format(filename, fmt=None):
+    """'jsonl' or 'csv', from an explicit choice or the file extension"""
+    if fmt:
+        return fmt
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) for each record in a JSONL or CSV text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, InvalidRow(f"not valid JSON: {e}")
+            continue
+        yield line_number, record if isinstance(record, dict) else InvalidRow("expected a JSON object")
+
+
+def validate_row(kind, record):
+    """Return a clean dict with exactly FIELDS[kind], or raise InvalidRow.
+
+    CSV gives every value as a string, so numbers are parsed and empty
+    strings become NULL; unknown keys are ignored.
+    """
+    if isinstance(record, InvalidRow):
+        raise record
+    row = {}
+    for field in FIELDS[kind]:
+        value = record.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is not None and field in INTEGER_FIELDS | FLOAT_FIELDS:
+            try:
+                value = int(value) if field in INTEGER_FIELDS else float(value)
+            except (TypeError, ValueError):
+                raise InvalidRow(f"{field} must be a number, got {value!r}")
+        elif value is not None and not isinstance(value, str):
+            raise InvalidRow(f"{field} must be text, got {value!r}")
+        row[field] = value
+
+    missing = [field for field in REQUIRED[kind] if row[field] is None]
+    if missing:
+        raise InvalidRow(f"missing {', '.join(missing)}")
+    if not _SLUG_RE.match(row['slug']):
+        raise InvalidRow(f"slug {row['slug']!r} must be lowercase letters, digits and hyphens")
+    for field, limit in MAX_LENGTHS.items():
+        if row.get(field) is not None and len(row[field]) > limit:
+            raise InvalidRow(f"{field} is longer than {limit} characters")
+    if row['duration'] < 1:
+        raise InvalidRow("duration must be at least 1 day")
+    if row['price'] < 0:
+        raise InvalidRow("price must not be negative")
+    if kind == 'trek' and row['difficulty'] not in DIFFICULTIES:
+        raise InvalidRow(f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+    return row
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_rows(stream, fmt, fields, rows):
+    """Write rows (tuples in fields order) as JSONL or CSV; returns the count"""
+    count = 0
+    if fmt == 'csv':
+        # '\n' rather than csv's default '\r\n': the stream already translates newlines
+        writer = csv.writer(stream, lineterminator='\n')
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+    for row in rows:
+        stream.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False))
+        stream.write('\n')
+        count += 1
+    return count
@@ -0,0 +1,839 @@
+# commands.py - The `flask` command line: schema, indexes, builds, jobs and exports
+
+# Each command runs inside an app context of the app `flask` loaded
+# (create_app() by default); init_app() adds them all to app.cli.
+
+from datetime import datetime, timedelta
+from glob import glob
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+import click
+from flask import current_app, url_for
+from flask.cli import AppGroup, with_appcontext
+
+import assets
+import catalog_io
+import freeze
+import images
+import migrations
+import pricing
+import search as catalog_search
+from bookings import (REPORT_FIELDS, REPORT_GROUPS, archive_bookings, booking_report, parse_report_args,
+                      rebuild_booking_rollups)
+from catalog import (get_featured_treks, get_quote_tables, invalidate_catalog, list_packages, list_treks,
+                     package_facets, parse_package_filters, parse_trek_filters, queue_similar_refresh,
+                     rebuild_similar_items, store_item_vectors, trek_facets, update_similar_items)
+from extensions import catalog_session, db
+from itinerary import build_details
+from models import (ARCHIVED_BOOKING_MODELS, BOOKING_MODELS, CATALOG_KINDS, DeadJob, Job, PriceRule, SimilarItem,
+                    TravelPackage, Trek)
+from tasks import job_queue
+from web import ASSET_DIR, IMAGE_DERIVED_DIR
+
+@click.command("upgrade-db")
+@with_appcontext
+def upgrade_db():
+    """Apply pending schema migrations (indexes, new columns) to an existing database"""
+    db.create_all()
+    ran = migrations.upgrade(db.session.connection())
+    db.session.commit()
+    print("Applied migrations: " + (', '.join(ran) if ran else 'none, database is up to date'))
+
+@click.command("backfill-details")
+@with_appcontext
+@click.option('--batch-size', default=500, show_default=True, help='Rows updated per transaction')
+@click.option('--all', 'reparse_all', is_flag=True, help='Re-parse rows that already have details')
+def backfill_details(batch_size, reparse_all):
+    """Parse itinerary/includes/excludes into the details column for existing rows"""
+    total = 0
+    for model in (Trek, TravelPackage):
+        table = model.__table__
+        # Keep updated_at as is: re-parsing does not change what visitors see
+        statement = db.update(table).where(table.c.id == db.bindparam('row_id')).values(
+            details=db.bindparam('parsed'), updated_at=table.c.updated_at)
+        last_id = 0
+        while True:
+            query = db.session.query(model.id, model.itinerary, model.includes, model.excludes).filter(model.id > last_id)
+            if not reparse_all:
+                query = query.filter(model.details.is_(None))
+            rows = query.order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            db.session.execute(statement, [
+                {'row_id': row.id, 'parsed': build_details(row.itinerary, row.includes, row.excludes)}
+                for row in rows
+            ])
+            db.session.commit()
+            last_id = rows[-1].id
+            total += len(rows)
+    invalidate_catalog()
+    print(f"Parsed details for {total} treks and travel packages")
+
+@click.command("rebuild-search-index")
+@with_appcontext
+def rebuild_search_index():
+    """Rebuild the full-text search index from the catalog tables"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect != 'sqlite':
+        print(f"Search on {dialect} reads the catalog tables directly; there is no index to rebuild")
+        return
+    
+    def catalog_items():
+        for trek in Trek.query.yield_per(500):
+            yield 'trek', trek
+        for package in TravelPackage.query.yield_per(500):
+            yield 'travel', package
+    
+    count = catalog_search.rebuild_index(db.session.connection(), catalog_items())
+    db.session.commit()
+    print(f"Indexed {count} treks and travel packages")
+
+@click.command("build-images")
+@with_appcontext
+@click.option('--widths', default=','.join(map(str, images.DEFAULT_WIDTHS)), show_default=True,
+              help='Comma-separated derivative widths in pixels')
+@click.option('--force', is_flag=True, help='Rebuild images that have not changed')
+def build_images(widths, force):
+    """Generate resized AVIF/WebP/JPEG derivatives of static/images and their manifest"""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise click.ClickException("Pillow is required: pip install Pillow")
+    manifest = images.build_derivatives(current_app.static_folder, output_subdir=IMAGE_DERIVED_DIR,
+                                        widths=[int(width) for width in widths.split(',')], force=force)
+    print(f"Built derivatives for {len(manifest['images'])} images in static/{IMAGE_DERIVED_DIR} "
+          f"({', '.join(images.available_formats())})")
+
+@click.command("build-assets")
+@with_appcontext
+@click.option('--fetch', is_flag=True, help='Download missing vendor files into assets/vendor first')
+@click.option('--refetch', is_flag=True, help='Download every vendor file again')
+def build_assets(fetch, refetch):
+    """Bundle, minify and precompress CSS/JS into static/dist"""
+    if fetch or refetch:
+        assets.fetch_vendor(current_app.root_path, force=refetch)
+    try:
+        manifest = assets.build_assets(current_app.root_path, output_subdir=f'static/{ASSET_DIR}')
+    except (FileNotFoundError, ImportError) as e:
+        raise click.ClickException(str(e))
+    print(f"Built {', '.join(manifest['assets'])} in static/{ASSET_DIR}")
+
+# Bulk catalog import/export: flask catalog import|export
+catalog_cli = AppGroup('catalog', help='Bulk import and export of treks and travel packages.')
+
+# Columns the search and similarity indexes need back from an upsert
+# (see search._document and similar.FIELDS)
+SEARCH_COLUMNS = {
+    'trek': ['id', 'slug', 'name', 'region', 'difficulty', 'price', 'duration', 'max_altitude', 'image_url',
+             'description', 'itinerary', 'includes'],
+    'travel': ['id', 'slug', 'name', 'destination', 'package_type', 'price', 'duration', 'image_url',
+               'description', 'itinerary', 'includes'],
+}
+
+def _upsert_catalog_rows(kind, rows):
+    """INSERT ... ON CONFLICT (slug) DO UPDATE for a batch of validated rows.
+    
+    Core statements bypass the ORM events, so details, the search index and
+    the similarity vectors are filled in here instead.
+    """
+    table = CATALOG_KINDS[kind].__table__
+    now = datetime.utcnow()
+    for row in rows:
+        row['details'] = build_details(row['itinerary'], row['includes'], row['excludes'])
+        row['updated_at'] = now
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise click.ClickException(f"catalog import needs INSERT ... ON CONFLICT, which {dialect} lacks")
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.slug],
+        set_={name: statement.excluded[name] for name in rows[0] if name != 'slug'})
+    upserted = db.session.execute(statement.returning(*(table.c[name] for name in SEARCH_COLUMNS[kind])), rows).all()
+    connection = db.session.connection()
+    if dialect == 'sqlite':
+        catalog_search.index_documents(connection, kind, upserted)
+    store_item_vectors(connection, kind, upserted)
+    queue_similar_refresh(connection, kind, db.session.info)
+
+@catalog_cli.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--kind', type=click.Choice(sorted(CATALOG_KINDS)), required=True)
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='Default: from the file extension')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per INSERT ... ON CONFLICT')
+@click.option('--batches-per-commit', default=10, show_default=True, help='Batches per transaction')
+@click.option('--dry-run', is_flag=True, help='Validate the file without writing anything')
+def catalog_import(source, kind, fmt, batch_size, batches_per_commit, dry_run):
+    """Upsert treks or travel packages from a JSONL or CSV file (or - for stdin), matched on slug"""
+    fmt = catalog_io.detect_format(source.name, fmt)
+    started = time.perf_counter()
+    imported = invalid = 0
+    
+    def valid_rows():
+        nonlocal invalid
+        for line_number, record in catalog_io.read_rows(source, fmt):
+            try:
+                yield catalog_io.validate_row(kind, record)
+            except catalog_io.InvalidRow as e:
+                invalid += 1
+                click.echo(f"{source.name}:{line_number}: {e}", err=True)
+    
+    for number, batch in enumerate(catalog_io.batched(valid_rows(), batch_size), 1):
+        # ON CONFLICT can't touch the same row twice in one statement; the last row for a slug wins
+        batch = list({row['slug']: row for row in batch}.values())
+        if not dry_run:
+            _upsert_catalog_rows(kind, batch)
+            if number % batches_per_commit == 0:
+                db.session.commit()
+                elapsed = time.perf_counter() - started
+                click.echo(f"  {imported + len(batch)} rows ({(imported + len(batch)) / elapsed:.0f} rows/s)", err=True)
+        imported += len(batch)
+    db.session.commit()
+    if imported and not dry_run:
+        invalidate_catalog()
+    
+    elapsed = time.perf_counter() - started
+    print(f"{'Validated' if dry_run else 'Imported'} {imported} {kind} rows in {elapsed:.2f}s "
+          f"({imported / elapsed if elapsed else 0:.0f} rows/s), {invalid} invalid")
+    if invalid:
+        raise SystemExit(1)
+
+@catalog_cli.command('export')
+@click.argument('target', type=click.File('w', encoding='utf-8'))
+@click.option('--kind', type=click.Choice(sorted(CATALOG_KINDS)), required=True)
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='Default: from the file extension')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched from the database at a time')
+def catalog_export(target, kind, fmt, batch_size):
+    """Write treks or travel packages to a JSONL or CSV file (or - for stdout) in a form import reads back"""
+    model = CATALOG_KINDS[kind]
+    fields = catalog_io.FIELDS[kind]
+    started = time.perf_counter()
+    query = db.select(*(model.__table__.c[name] for name in fields)).order_by(model.id)
+    rows = db.session.execute(query.execution_options(yield_per=batch_size))
+    count = catalog_io.write_rows(target, catalog_io.detect_format(target.name, fmt), fields, rows)
+    elapsed = time.perf_counter() - started
+    # stdout may be the export itself, so the summary goes to stderr
+    click.echo(f"Exported {count} {kind} rows in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.0f} rows/s)", err=True)
+
+# Background job workers and housekeeping: flask jobs work|status|retry-dead|prune
+jobs_cli = AppGroup('jobs', help='Run and inspect background jobs (emails, notifications, invoices).')
+
+def _run_worker(app, burst, poll_interval):
+    """Work the queue in this process until SIGTERM/SIGINT (finishing the current job first)"""
+    stopping = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: stopping.append(signum))
+    with app.app_context():
+        ran = job_queue.work(db.engine, poll_interval=poll_interval, burst=burst, should_stop=lambda: bool(stopping))
+    click.echo(f"worker {os.getpid()} ran {ran} jobs", err=True)
+
+@jobs_cli.command('work')
+@click.option('--processes', default=1, show_default=True, help='Worker processes to fork')
+@click.option('--burst', is_flag=True, help='Exit once no jobs are due instead of waiting for more')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds to sleep when the queue is empty')
+def jobs_work(processes, burst, poll_interval):
+    """Run queued jobs"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(process)d %(levelname)s %(message)s')
+    app = current_app._get_current_object()
+    if processes == 1:
+        _run_worker(app, burst, poll_interval)
+        return
+    # Connections must not be shared across fork; each child opens its own
+    db.engine.dispose()
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_run_worker, args=(app, burst, poll_interval)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    
+    def stop(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker in workers:
+        worker.join()
+
+@jobs_cli.command('status')
+def jobs_status():
+    """Count jobs by name and status, and list the dead letters"""
+    rows = db.session.execute(db.select(Job.name, Job.status, db.func.count(), db.func.min(Job.run_at))
+                              .group_by(Job.name, Job.status).order_by(Job.name, Job.status)).all()
+    for name, status, count, due in rows:
+        print(f"{name:<24}{status:<10}{count:>8}" + (f"  next due {due:%Y-%m-%d %H:%M:%S}" if status == 'queued' else ''))
+    dead = db.session.execute(db.select(DeadJob).order_by(DeadJob.id)).scalars().all()
+    print(f"{len(dead)} dead jobs")
+    for job in dead:
+        print(f"  #{job.id} {job.name} {job.key or ''} failed {job.failed_at:%Y-%m-%d %H:%M} after {job.attempts} "
+              f"attempts: {job.error.strip().splitlines()[-1] if job.error else ''}")
+
+@jobs_cli.command('retry-dead')
+@click.argument('ids', nargs=-1, type=int)
+def jobs_retry_dead(ids):
+    """Queue dead jobs again (all of them, or the dead-letter ids given)"""
+    count, skipped = job_queue.retry_dead(db.session.connection(), ids)
+    db.session.commit()
+    print(f"Requeued {count} jobs")
+    if skipped:
+        # Their idempotency key is taken by a job still in the jobs table
+        print(f"Kept {len(skipped)} dead jobs whose key is still queued or done (dead-letter ids "
+              f"{', '.join(map(str, skipped))}); retry them after `flask jobs prune` if they still need to run")
+
+@jobs_cli.command('prune')
+@click.option('--days', default=7, show_default=True, help='Delete finished jobs older than this')
+def jobs_prune(days):
+    """Delete finished jobs; their idempotency keys can then be used again"""
+    count = job_queue.prune(db.session.connection(), timedelta(days=days))
+    db.session.commit()
+    print(f"Deleted {count} finished jobs")
+
+# Similar items index: flask similar rebuild|refresh
+similar_cli = AppGroup('similar', help='Precomputed "similar treks / packages" lists.')
+
+@similar_cli.command('rebuild')
+@click.option('--kind', type=click.Choice(sorted(CATALOG_KINDS)), help='Default: both')
+def similar_rebuild(kind):
+    """Recompute every vector and neighbour list (after changing similar.py or restoring a backup)"""
+    for kind in [kind] if kind else sorted(CATALOG_KINDS):
+        started = time.perf_counter()
+        count = rebuild_similar_items(db.session.connection(), kind)
+        db.session.commit()
+        print(f"Indexed {count} {kind} items in {time.perf_counter() - started:.2f}s")
+    invalidate_catalog()
+
+@similar_cli.command('refresh')
+def similar_refresh():
+    """Recompute the lists affected by catalog changes since the last refresh (what the job does)"""
+    for kind in sorted(CATALOG_KINDS):
+        count = update_similar_items(db.session.connection(), kind)
+        db.session.commit()
+        print(f"Refreshed {count} {kind} lists")
+    invalidate_catalog()
+
+# Booking archive: flask bookings archive
+bookings_cli = AppGroup('bookings', help='Booking maintenance.')
+
+@bookings_cli.command('archive')
+@click.option('--older-than-days', type=int, help='Archive bookings departing more than this many days ago '
+                                                  '[default: BOOKING_ARCHIVE_DAYS]')
+@click.option('--cancelled/--no-cancelled', default=True, show_default=True,
+              help='Also archive cancelled bookings, whatever their date')
+@click.option('--kind', type=click.Choice(['trek', 'travel']), help='Default: both')
+@click.option('--batch-size', default=1000, show_default=True, help='Bookings moved per transaction')
+@click.option('--max-batches', type=int, help='Stop after this many batches per kind (run again to continue)')
+def bookings_archive(older_than_days, cancelled, kind, batch_size, max_batches):
+    """Move old and cancelled bookings out of the hot booking tables"""
+    for kind in [kind] if kind else ['trek', 'travel']:
+        started = time.perf_counter()
+        moved = archive_bookings(kind, older_than_days, cancelled, batch_size, max_batches,
+                                 progress=lambda moved: click.echo(f"  {kind}: {moved} moved", err=True))
+        model = BOOKING_MODELS[kind][0]
+        remaining = db.session.scalar(db.select(db.func.count()).select_from(model))
+        archived = db.session.scalar(db.select(db.func.count()).select_from(ARCHIVED_BOOKING_MODELS[kind]))
+        db.session.commit()
+        print(f"Archived {moved} {kind} bookings in {time.perf_counter() - started:.2f}s "
+              f"({remaining} hot, {archived} archived)")
+
+# Booking rollups: flask analytics rebuild|export
+analytics_cli = AppGroup('analytics', help='Booking revenue, people and cancellation rollups.')
+
+@analytics_cli.command('rebuild')
+@click.option('--chunk-size', default=50000, show_default=True, help='Booking rows aggregated at a time')
+def analytics_rebuild(chunk_size):
+    """Recompute booking_rollups from every booking (after imports, restores or bulk SQL)"""
+    started = time.perf_counter()
+    counts = rebuild_booking_rollups(db.session.connection(), chunk_size)
+    db.session.commit()
+    print(f"Rebuilt {counts['trek']} trek and {counts['travel']} travel rollup rows "
+          f"in {time.perf_counter() - started:.2f}s")
+
+@analytics_cli.command('export')
+@click.argument('target', type=click.File('w', encoding='utf-8'))
+@click.option('--group', type=click.Choice(sorted(REPORT_GROUPS)), default='month', show_default=True)
+@click.option('--kind', type=click.Choice(['trek', 'travel']), help='Default: both')
+@click.option('--from', 'start', help='First departure month, YYYY-MM')
+@click.option('--to', 'end', help='Last departure month, YYYY-MM')
+def analytics_export(target, group, kind, start, end):
+    """Write a booking report to a CSV file (or - for stdout)"""
+    if parse_report_args({'group': group, 'kind': kind, 'from': start, 'to': end}) is None:
+        raise click.BadParameter('--from and --to must be YYYY-MM')
+    lines = booking_report(group, kind, start, end)
+    catalog_io.write_rows(target, 'csv', REPORT_FIELDS, ([line[field] for field in REPORT_FIELDS] for line in lines))
+
+# Rate rules: flask pricing import|export|quote
+pricing_cli = AppGroup('pricing', help='Seasonal, early-bird and group price rules.')
+
+@pricing_cli.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='Default: from the file extension')
+def pricing_import(source, fmt):
+    """Replace every price rule with the rules in a JSONL or CSV file (or - for stdin)"""
+    rules, invalid = [], 0
+    for line_number, record in catalog_io.read_rows(source, catalog_io.detect_format(source.name, fmt)):
+        try:
+            if isinstance(record, catalog_io.InvalidRow):
+                raise record
+            rules.append(pricing.validate_rule(record))
+        except (catalog_io.InvalidRow, pricing.InvalidRule) as e:
+            invalid += 1
+            click.echo(f"{source.name}:{line_number}: {e}", err=True)
+    if invalid:
+        raise click.ClickException(f"{invalid} invalid rules; nothing was changed")
+    db.session.execute(db.delete(PriceRule))
+    db.session.add_all(PriceRule(**rule) for rule in rules)
+    db.session.commit()
+    print(f"Imported {len(rules)} price rules")
+
+@pricing_cli.command('export')
+@click.argument('target', type=click.File('w', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='Default: from the file extension')
+def pricing_export(target, fmt):
+    """Write the price rules to a JSONL or CSV file (or - for stdout) in a form import reads back"""
+    query = db.select(*(PriceRule.__table__.c[name] for name in pricing.RULE_FIELDS)).order_by(PriceRule.id)
+    count = catalog_io.write_rows(target, catalog_io.detect_format(target.name, fmt), pricing.RULE_FIELDS,
+                                  db.session.execute(query))
+    click.echo(f"Exported {count} price rules", err=True)
+
+@pricing_cli.command('quote')
+@click.option('--kind', type=click.Choice(sorted(CATALOG_KINDS)), required=True)
+@click.option('--item-id', type=int, required=True)
+@click.option('--date', 'departure_date', required=True, help='Departure date, YYYY-MM-DD')
+@click.option('--people', default=1, show_default=True)
+def pricing_quote(kind, item_id, departure_date, people):
+    """Price one booking the way the site would"""
+    try:
+        unit_price, total_price = get_quote_tables().quote_one(kind, item_id, departure_date, people)
+    except pricing.QuoteError as e:
+        raise click.ClickException(str(e))
+    print(f"{people} x {unit_price:.2f} = {total_price:.2f}")
+
+# Static export: flask freeze
+# The pages every anonymous visitor gets the same way are rendered into
+# FREEZE_DIR (see freeze.py) for nginx or a CDN to serve, so app workers only
+# see logged-in, booking and uncommon filter traffic. Each page's fingerprint
+# covers the templates, the static files and every catalog row it shows: the
+# item and its similar items on a detail page, the first page of results and
+# the facet counts on a listing. A run renders only the pages whose
+# fingerprint changed, spread over forked processes.
+FREEZE_STATIC_ENDPOINTS = ('main.about', 'main.privacy', 'main.terms')
+FREEZE_CHUNK_SIZE = 50  # pages handed to a render process at a time
+
+# listing endpoint -> (kind, filter parser, page loader, facet loader, facets
+# frozen in combination as (query argument, column), in the filter form's order)
+FREEZE_LISTINGS = {
+    'main.treks': ('trek', parse_trek_filters, list_treks, trek_facets,
+              ('region', Trek.region), ('difficulty', Trek.difficulty)),
+    'main.travel': ('travel', parse_package_filters, list_packages, package_facets,
+               ('destination', TravelPackage.destination), ('type', TravelPackage.package_type)),
+}
+
+def _row_digests(model):
+    """{id: digest of every column} for one catalog table"""
+    query = db.select(*model.__table__.columns).execution_options(yield_per=5000)
+    return {row.id: hashlib.sha1(repr(tuple(row)).encode('utf-8')).digest()
+            for row in catalog_session.execute(query)}
+
+def _similar_lists(kind):
+    lists = {}
+    query = db.select(SimilarItem.item_id, SimilarItem.similar_id).filter_by(kind=kind).order_by(
+        SimilarItem.item_id, SimilarItem.rank)
+    for item_id, similar_id in catalog_session.execute(query):
+        lists.setdefault(item_id, []).append(similar_id)
+    return lists
+
+def _filter_combinations(first, second):
+    """Query pairs for no filter, each facet value alone and each pair of values that has results"""
+    (first_name, first_column), (second_name, second_column) = first, second
+    combinations = {()}
+    for a, b in catalog_session.query(first_column, second_column).distinct():
+        combinations.add(((first_name, a),))
+        if b:
+            combinations.add(((second_name, b),))
+            combinations.add(((first_name, a), (second_name, b)))
+    return sorted(combinations)
+
+def frozen_pages(site_version):
+    """{url: fingerprint} of every page `flask freeze` writes"""
+    pages = {}
+    with current_app.test_request_context():
+        for endpoint in FREEZE_STATIC_ENDPOINTS:
+            pages[url_for(endpoint)] = site_version
+        digests = {'trek': _row_digests(Trek), 'travel': _row_digests(TravelPackage)}
+        pages[url_for('main.index')] = freeze.fingerprint(
+            site_version, [digests['trek'][trek.id] for trek in get_featured_treks(3)])
+
+        for endpoint, (kind, parse, load, facets, *facet_columns) in FREEZE_LISTINGS.items():
+            for pairs in _filter_combinations(*facet_columns):
+                filters = parse(dict(pairs))
+                page = load(filters)
+                query = freeze.query_string(pairs)
+                url = url_for(endpoint) + ('?' + query if query else '')
+                pages[url] = freeze.fingerprint(site_version, facets(filters), page.next_cursor,
+                                                [digests[kind][item.id] for item in page.items])
+
+        for kind, model, endpoint in (('trek', Trek, 'main.trek_detail'), ('travel', TravelPackage, 'main.travel_detail')):
+            similar_lists = _similar_lists(kind)
+            for item_id, slug in catalog_session.execute(db.select(model.id, model.slug)):
+                pages[url_for(endpoint, slug=slug)] = freeze.fingerprint(
+                    site_version, digests[kind][item_id],
+                    [digests[kind].get(other) for other in similar_lists.get(item_id, ())])
+    return pages
+
+def _freeze_worker(task):
+    """Render a chunk of pages as an anonymous visitor; [(url, path, sha1, written, error)]"""
+    output, hashed, pages = task
+    client = current_app.test_client()
+    results = []
+    for url, previous_sha1 in pages:
+        relpath = freeze.page_path(url)
+        response = client.get(url)
+        body = response.get_data()
+        if response.status_code != 200:
+            results.append((url, relpath, previous_sha1, False, response.status))
+            continue
+        body = freeze.rewrite_static_refs(body.decode('utf-8'), hashed, current_app.static_url_path + '/').encode('utf-8')
+        sha1 = hashlib.sha1(body).hexdigest()
+        # Unchanged output keeps its mtime, so syncing to a CDN skips it
+        written = sha1 != previous_sha1 or not os.path.exists(os.path.join(output, relpath))
+        if written:
+            freeze.write_file(output, relpath, body, brotli_quality=freeze.PAGE_BROTLI_QUALITY)
+        results.append((url, relpath, sha1, written, None))
+    return results
+
+@click.command("freeze")
+@with_appcontext
+@click.option('--output', type=click.Path(file_okay=False), help='Output directory [default: FREEZE_DIR]')
+@click.option('--processes', default=os.cpu_count() or 1, show_default=True, help='Render processes to fork')
+@click.option('--force', is_flag=True, help='Render every page, changed or not')
+def freeze_site(output, processes, force):
+    """Render the anonymous catalog pages and static files into a directory nginx or a CDN can serve"""
+    started = time.perf_counter()
+    output = os.path.abspath(output or current_app.config['FREEZE_DIR'])
+    manifest = freeze.load_manifest(output)
+    hashed = freeze.sync_static(current_app.static_folder, os.path.join(output, current_app.static_url_path.strip('/')), manifest)
+    code = sorted(glob(os.path.join(current_app.root_path, '*.py')))
+    site_version = freeze.fingerprint(
+        freeze.tree_digest(os.path.join(current_app.root_path, current_app.template_folder), *code), hashed)
+    pages = frozen_pages(site_version)
+    render, delete = freeze.plan(pages, manifest, output)
+    if force:
+        render = sorted(pages)
+
+    previous = manifest['pages']
+    chunks = [render[start:start + FREEZE_CHUNK_SIZE] for start in range(0, len(render), FREEZE_CHUNK_SIZE)]
+    tasks = [(output, hashed, [(url, previous.get(url, (None, None, None))[2]) for url in chunk]) for chunk in chunks]
+    written, failed = 0, []
+
+    def collect(results):
+        nonlocal written
+        for chunk in results:
+            for url, relpath, sha1, changed, error in chunk:
+                # A failed page keeps its old file and is tried again next run
+                previous[url] = [None if error else pages[url], relpath, sha1]
+                written += changed
+                if error:
+                    failed.append(f"{url}: {error}")
+
+    if processes > 1 and len(tasks) > 1:
+        # Connections must not be shared across fork; each child opens its own
+        catalog_session.remove()
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            collect(pool.imap_unordered(_freeze_worker, tasks))
+    else:
+        collect(map(_freeze_worker, tasks))
+
+    for url in [url for url in previous if url not in pages]:
+        del previous[url]
+    for relpath in delete:
+        freeze.remove_file(output, relpath)
+    freeze.save_manifest(output, manifest)
+    print(f"Rendered {len(render)} of {len(pages)} pages into {output} ({written} changed, "
+          f"{len(delete)} removed) in {time.perf_counter() - started:.2f}s")
+    if failed:
+        raise click.ClickException(f"{len(failed)} pages failed:\n  " + '\n  '.join(failed[:20]))
+
+# Initialize database and create sample data
+@click.command("init-db")
+@with_appcontext
+def init_db():
+    """Initialize the database with sample data"""
+    db.create_all()
+    migrations.upgrade(db.session.connection())
+    
+    # Sample trek data
+    sample_treks = [
+        {
+            'name': 'Everest Base Camp Trek',
+            'slug': 'everest-base-camp',
+            'region': 'Everest',
+            'duration': 14,
+            'difficulty': 'Moderate',
+            'max_altitude': 5545,
+            'price': 1500.00,
+            'description': 'Trek to the base of the world\'s highest mountain. This classic trek offers stunning views of Everest, Lhotse, and Nuptse. Experience Sherpa culture in Namche Bazaar and visit ancient Buddhist monasteries.',
+            'itinerary': 'Day 1: Fly to Lukla (2,800m)\nDay 2: Trek to Phakding (2,652m)\nDay 3: Trek to Namche Bazaar (3,440m)\nDay 4: Acclimatization day in Namche\nDay 5: Trek to Tengboche (3,867m)\nDay 6: Trek to Dingboche (4,410m)\nDay 7: Acclimatization day\nDay 8: Trek to Lobuche (4,940m)\nDay 9: Trek to Gorakshep (5,170m), hike to Everest Base Camp (5,364m)\nDay 10: Hike Kala Patthar (5,545m), trek to Pheriche\nDay 11: Trek to Namche\nDay 12: Trek to Lukla\nDay 13: Fly back to Kathmandu\nDay 14: Buffer day',
+            'includes': 'Airport pickups and drops, All permits (Sagarmatha National Park fee, TIMS card), Teahouse accommodation during trek, All meals (breakfast, lunch, dinner) during trek, Experienced English-speaking guide, Porter service (2 trekkers: 1 porter), First aid kit, All government taxes and office service charge',
+            'excludes': 'International airfare, Nepal visa fee, Lunch and dinner in Kathmandu, Travel insurance, Personal expenses (drinks, hot shower, battery charging, wifi), Tips for guide and porter',
+            'image_url': '/static/images/everest.jpg'
+        },
+        {
+            'name': 'Annapurna Circuit Trek',
+            'slug': 'annapurna-circuit',
+            'region': 'Annapurna',
+            'duration': 16,
+            'difficulty': 'Moderate',
+            'max_altitude': 5416,
+            'price': 1400.00,
+            'description': 'One of the world\'s greatest treks, the Annapurna Circuit takes you around the entire Annapurna massif. Experience dramatic landscapes from subtropical forests to high deserts, cross the famous Thorong La pass, and visit the holy pilgrimage site of Muktinath.',
+            'itinerary': 'Day 1: Drive from Kathmandu to Besisahar to Ngadi\nDay 2: Trek to Jagat\nDay 3: Trek to Dharapani\nDay 4: Trek to Chame\nDay 5: Trek to Pisang\nDay 6: Trek to Manang\nDay 7: Acclimatization day in Manang\nDay 8: Trek to Yak Kharka\nDay 9: Trek to Thorong Phedi\nDay 10: Cross Thorong La Pass (5,416m) to Muktinath\nDay 11: Trek to Kagbeni\nDay 12: Trek to Marpha\nDay 13: Trek to Ghasa\nDay 14: Trek to Tatopani (hot springs)\nDay 15: Trek to Ghorepani\nDay 16: Hike Poon Hill, trek to Nayapul, drive to Pokhara',
+            'includes': 'All ground transportation, All permits (ACAP, TIMS), Teahouse accommodation, Three meals daily during trek, Experienced guide, Porter service, Down jacket and sleeping bag (if needed), First aid kit',
+            'excludes': 'International flights, Nepal visa, Meals in Kathmandu and Pokhara, Travel insurance, Hot showers, battery charging, wifi, Alcoholic drinks, Tips',
+            'image_url': '/static/images/annapurna.jpg'
+        },
+        {
+            'name': 'Langtang Valley Trek',
+            'slug': 'langtang-valley',
+            'region': 'Langtang',
+            'duration': 10,
+            'difficulty': 'Easy',
+            'max_altitude': 3870,
+            'price': 900.00,
+            'description': 'The Langtang Valley is one of the most beautiful Himalayan valleys, known for its stunning mountain views, rich culture, and diverse wildlife. This trek is perfect for beginners and those with limited time, offering incredible scenery without extreme altitude.',
+            'itinerary': 'Day 1: Drive from Kathmandu to Syabrubesi\nDay 2: Trek to Lama Hotel\nDay 3: Trek to Langtang Village\nDay 4: Trek to Kyanjin Gompa\nDay 5: Explore Kyanjin Gompa, hike to Tserko Ri\nDay 6: Trek back to Lama Hotel\nDay 7: Trek to Syabrubesi\nDay 8: Drive back to Kathmandu\nDay 9: Kathmandu sightseeing\nDay 10: Departure',
+            'includes': 'All transportation, Langtang National Park permit, TIMS card, Teahouse accommodation, Three meals daily, Experienced guide, Porter service, All government taxes',
+            'excludes': 'Nepal visa, International flights, Meals in Kathmandu, Travel insurance, Personal expenses, Tips',
+            'image_url': '/static/images/langtang.jpg'
+        },
+        # Add these after the Langtang trek, before the closing ]
+    {
+        'name': 'Manaslu Circuit Trek',
+        'slug': 'manaslu-circuit',
+        'region': 'Manaslu',
+        'duration': 18,
+        'difficulty': 'Difficult',
+        'max_altitude': 5160,
+        'price': 1800.00,
+        'description': 'A restricted area trek offering pristine wilderness and authentic culture. Circle the world\'s 8th highest mountain through remote villages and high passes.',
+        'itinerary': 'Day 1: Drive Kathmandu to Soti Khola\nDay 2: Trek to Machha Khola\nDay 3: Trek to Jagat\nDay 4: Trek to Deng\nDay 5: Trek to Namrung\nDay 6: Trek to Samagaun\nDay 7: Acclimatization day\nDay 8: Trek to Samdo\nDay 9: Trek to Dharamsala/Larkya Phedi\nDay 10: Cross Larkya La Pass to Bimthang\nDay 11: Trek to Tilije\nDay 12: Trek to Dharapani\nDay 13: Drive back to Kathmandu',
+        'includes': 'Special restricted area permit, All transportation, Teahouse accommodation, All meals, Experienced guide, Porter service, All taxes',
+        'excludes': 'International flights, Nepal visa, Travel insurance, Personal expenses, Tips',
+        'image_url': '/static/images/manaslu.jpg'
+    },
+    {
+        'name': 'Ghorepani Poon Hill Trek',
+        'slug': 'ghorepani-poon-hill',
+        'region': 'Annapurna',
+        'duration': 7,
+        'difficulty': 'Easy',
+        'max_altitude': 3210,
+        'price': 700.00,
+        'description': 'A short and sweet trek perfect for beginners. Hike to Poon Hill for sunrise views over Annapurna and Dhaulagiri ranges. Experience Gurung culture and rhododendron forests.',
+        'itinerary': 'Day 1: Drive Pokhara to Nayapul, trek to Tikhedhunga\nDay 2: Trek to Ghorepani\nDay 3: Early morning hike to Poon Hill, trek to Tadapani\nDay 4: Trek to Ghandruk\nDay 5: Trek to Nayapul, drive to Pokhara\nDay 6: Free day in Pokhara\nDay 7: Drive back to Kathmandu',
+        'includes': 'All transportation, ACAP permit, TIMS card, Teahouse accommodation, All meals, English-speaking guide, Porter service',
+        'excludes': 'International flights, Nepal visa, Travel insurance, Personal expenses, Tips',
+        'image_url': '/static/images/poonhill.jpg'
+    },
+    {
+        'name': 'Upper Mustang Trek',
+        'slug': 'upper-mustang',
+        'region': 'Mustang',
+        'duration': 14,
+        'difficulty': 'Moderate',
+        'max_altitude': 3810,
+        'price': 2200.00,
+        'description': 'Explore the forbidden kingdom of Mustang, a hidden desert landscape with ancient caves, monasteries, and Tibetan culture. Feel like you\'ve stepped into Tibet.',
+        'itinerary': 'Day 1: Fly Pokhara to Jomsom, trek to Kagbeni\nDay 2: Trek to Chele\nDay 3: Trek to Syangbochen\nDay 4: Trek to Ghami\nDay 5: Trek to Tsarang\nDay 6: Trek to Lo Manthang\nDay 7: Explore Lo Manthang\nDay 8: Trek to Drakmar\nDay 9: Trek to Ghiling\nDay 10: Trek to Chhusang\nDay 11: Trek to Jomsom\nDay 12: Fly back to Pokhara\nDay 13-14: Buffer days',
+        'includes': 'Special Mustang permit ($500), All flights, All accommodation, All meals, Experienced guide, Porter service, All taxes',
+        'excludes': 'International flights, Nepal visa, Travel insurance, Personal expenses, Tips',
+        'image_url': '/static/images/mustang.jpg'
+    },
+    {
+        'name': 'Mardi Himal Trek',
+        'slug': 'mardi-himal',
+        'region': 'Annapurna',
+        'duration': 8,
+        'difficulty': 'Moderate',
+        'max_altitude': 4500,
+        'price': 850.00,
+        'description': 'A hidden gem offering spectacular close-up views of Machhapuchhre (Fishtail) and Annapurna. This off-the-beaten-path trek takes you through lush forests and traditional villages to the beautiful Mardi Himal Base Camp.',
+        'itinerary': 'Day 1: Drive Pokhara to Kande, trek to Australian Camp\nDay 2: Trek to Forest Camp\nDay 3: Trek to Low Camp\nDay 4: Trek to High Camp\nDay 5: Hike to Mardi Himal Base Camp, return to High Camp\nDay 6: Trek to Siding Village\nDay 7: Trek to Lumre, drive to Pokhara\nDay 8: Free day in Pokhara',
+        'includes': 'All transportation, ACAP permit, TIMS card, Teahouse accommodation, All meals, English-speaking guide, Porter service',
+        'excludes': 'International flights, Nepal visa, Travel insurance, Personal expenses, Tips',
+        'image_url': '/static/images/mardi-himal.jpg'
+    },
+    {
+        'name': 'Gokyo Lakes Trek',
+        'slug': 'gokyo-lakes',
+        'region': 'Everest',
+        'duration': 12,
+        'difficulty': 'Moderate',
+        'max_altitude': 5360,
+        'price': 1350.00,
+        'description': 'Experience the stunning turquoise Gokyo Lakes and climb Gokyo Ri for breathtaking views of Everest, Cho Oyu, and Makalu. Cross the famous Cho La pass and visit the magnificent Ngozumpa Glacier.',
+        'itinerary': 'Day 1: Fly to Lukla, trek to Phakding\nDay 2: Trek to Namche Bazaar\nDay 3: Acclimatization day\nDay 4: Trek to Dole\nDay 5: Trek to Machhermo\nDay 6: Trek to Gokyo\nDay 7: Hike Gokyo Ri, explore lakes\nDay 8: Trek to Thagnak\nDay 9: Cross Cho La pass to Dzongla\nDay 10: Trek to Lobuche\nDay 11: Trek to Gorakshep, hike Kala Patthar\nDay 12: Trek to Lukla, fly to Kathmandu',
+        'includes': 'Flights Kathmandu-Lukla, All permits, Teahouse accommodation, All meals, Experienced guide, Porter service, First aid kit',
+        'excludes': 'International flights, Nepal visa, Travel insurance, Personal expenses, Tips',
+        'image_url': '/static/images/gokyo.jpg'
+    },
+    {
+        'name': 'Tsum Valley Trek',
+        'slug': 'tsum-valley',
+        'region': 'Manaslu',
+        'duration': 16,
+        'difficulty': 'Difficult',
+        'max_altitude': 5090,
+        'price': 1950.00,
+        'description': 'Discover the hidden Tsumbas Valley, a sacred Himalayan pilgrimage site with ancient Buddhist monasteries, mani walls, and unique culture. This restricted area trek offers untouched landscapes and authentic experiences.',
+        'itinerary': 'Day 1: Drive Kathmandu to Soti Khola\nDay 2: Trek to Machha Khola\nDay 3: Trek to Jagat\nDay 4: Trek to Philim\nDay 5: Trek to Chumling\nDay 6: Trek to Chhekampar\nDay 7: Trek to Mu Gompa\nDay 8: Explore Mu Gompa area\nDay 9: Trek to Rachen Gompa\nDay 10: Trek to Gumba Lungdang\nDay 11: Trek to Lokpa\nDay 12: Trek to Dharapani\nDay 13-14: Drive back to Kathmandu\nDay 15-16: Buffer days',
+        'includes': 'Special restricted area permit, All transportation, Teahouse accommodation, All meals, Experienced guide, Porter service, All taxes',
+        'excludes': 'International flights, Nepal visa, Travel insurance, Personal expenses, Tips',
+        'image_url': '/static/images/tsum-valley.jpg'
+    }
+    ]
+    
+    for trek_data in sample_treks:
+        trek = Trek(**trek_data)
+        db.session.add(trek)
+    
+        # Sample travel packages data
+    sample_packages = [
+        {
+            'name': 'Kathmandu Valley Heritage Tour',
+            'slug': 'kathmandu-heritage',
+            'destination': 'Kathmandu',
+            'duration': 4,
+            'price': 400.00,
+            'description': 'Explore the cultural heart of Nepal. Visit UNESCO World Heritage sites including Pashupatinath, Boudhanath, Swayambhunath, and Kathmandu Durbar Square. Experience the living heritage of the Newar community.',
+            'itinerary': 'Day 1: Arrival in Kathmandu, evening cultural show and dinner\nDay 2: Visit Pashupatinath and Boudhanath, afternoon Patan Durbar Square\nDay 3: Visit Swayambhunath (Monkey Temple), Kathmandu Durbar Square, Thamel shopping\nDay 4: Optional Bhaktapur tour, departure',
+            'includes': 'Airport transfers, 3 nights hotel with breakfast, Private AC vehicle, English-speaking guide, All entry fees, Welcome dinner',
+            'excludes': 'International flights, Nepal visa, Lunch and dinner, Travel insurance, Personal expenses',
+            'image_url': '/static/images/kathmandu.jpg',
+            'package_type': 'Cultural'
+        },
+        {
+            'name': 'Pokhara Adventure & Relaxation',
+            'slug': 'pokhara-adventure',
+            'destination': 'Pokhara',
+            'duration': 5,
+            'price': 500.00,
+            'description': 'Experience the magic of Pokhara, the city of lakes. Enjoy stunning views of Annapurna range, boating on Phewa Lake, and optional adventure activities like paragliding and zip-lining.',
+            'itinerary': 'Day 1: Drive or fly to Pokhara, lakeside evening\nDay 2: Sunrise at Sarangkot, boating at Phewa Lake, visit Tal Barahi temple\nDay 3: Adventure day - paragliding, zip-lining, or ultralight flight (optional extra)\nDay 4: Visit Davis Falls, Gupteshwor Cave, International Mountain Museum\nDay 5: Free morning, return to Kathmandu',
+            'includes': 'Hotel accommodation with breakfast, All ground transportation, Boating at Phewa Lake, Guide for sightseeing, All entry fees',
+            'excludes': 'Flights (can be added), Adventure activities, Lunch and dinner, Travel insurance',
+            'image_url': '/static/images/pokhara.jpg',
+            'package_type': 'Adventure'
+        },
+        {
+            'name': 'Chitwan Jungle Safari',
+            'slug': 'chitwan-safari',
+            'destination': 'Chitwan',
+            'duration': 3,
+            'price': 350.00,
+            'description': 'Discover wildlife in Chitwan National Park, a UNESCO World Heritage site. Spot rhinos, deer, crocodiles, and if lucky, the Royal Bengal Tiger. Enjoy jungle walks, canoe rides, and cultural programs.',
+            'itinerary': 'Day 1: Drive to Chitwan, welcome program, Tharu cultural show\nDay 2: Morning canoe ride, jungle walk, elephant safari, bird watching\nDay 3: Bird watching, drive back to Kathmandu',
+            'includes': 'Transportation, Resort accommodation with all meals, All jungle activities, National Park fees, Guide, Cultural program',
+            'excludes': 'International flights, Travel insurance, Alcoholic drinks, Personal expenses',
+            'image_url': '/static/images/chitwan.jpg',
+            'package_type': 'Wildlife'
+        },
+        {
+            'name': 'Lumbini Pilgrimage Tour',
+            'slug': 'lumbini-pilgrimage',
+            'destination': 'Lumbini',
+            'duration': 3,
+            'price': 300.00,
+            'description': 'Visit the birthplace of Lord Buddha, one of the holiest sites for Buddhists worldwide. Explore monasteries built by different countries, meditate under the Bodhi tree, and feel the peaceful atmosphere.',
+            'itinerary': 'Day 1: Fly to Bhairahawa, transfer to Lumbini, visit Maya Devi Temple\nDay 2: Explore monastic zone, visit monasteries of different countries, meditation session\nDay 3: Visit nearby Kushinagar (India) option, return to Kathmandu',
+            'includes': 'All transportation, Hotel accommodation with breakfast, English-speaking guide, All entry fees',
+            'excludes': 'International flights, India visa (if visiting Kushinagar), Lunch and dinner, Travel insurance',
+            'image_url': '/static/images/lumbini.jpg',
+            'package_type': 'Pilgrimage'
+        },
+        {
+            'name': 'Nepal Highlights Tour',
+            'slug': 'nepal-highlights',
+            'destination': 'Multiple Cities',
+            'duration': 10,
+            'price': 1200.00,
+            'description': 'The ultimate Nepal experience combining culture, adventure, and wildlife. Visit Kathmandu, Pokhara, and Chitwan in one comprehensive package. Perfect for first-time visitors.',
+            'itinerary': 'Day 1-2: Kathmandu sightseeing\nDay 3-5: Pokhara adventure\nDay 6-8: Chitwan safari\nDay 9: Return to Kathmandu\nDay 10: Departure',
+            'includes': 'All transportation, Domestic flights, Hotel accommodation with breakfast, All activities as per itinerary, Experienced guide, All entry fees',
+            'excludes': 'International flights, Nepal visa, Travel insurance, Personal expenses, Tips',
+            'image_url': '/static/images/nepal-highlights.jpg',
+            'package_type': 'Combination'
+        },
+            # NEW TRAVEL PACKAGES - Add these after Nepal Highlights
+    {
+        'name': 'Bandipur Heritage Village',
+        'slug': 'bandipur-village',
+        'destination': 'Bandipur',
+        'duration': 3,
+        'price': 280.00,
+        'description': 'Step back in time in the charming hilltop town of Bandipur. Wander through Newari streets, enjoy panoramic mountain views, and experience traditional village life. Perfect for culture lovers and photographers.',
+        'itinerary': 'Day 1: Drive Kathmandu to Bandipur, sunset view\nDay 2: Explore Bandipur - Tundikhel, Siddha Gufa, Thani Mai Temple\nDay 3: Morning walk, drive back to Kathmandu',
+        'includes': 'Transportation, Hotel accommodation with breakfast, Guided village tour, All entry fees',
+        'excludes': 'Lunch and dinner, Travel insurance, Personal expenses',
+        'image_url': '/static/images/bandipur.jpg',
+        'package_type': 'Cultural'
+    },
+    {
+        'name': 'Kathmandu to Pokhara Hiking Trail',
+        'slug': 'kathmandu-pokhara-hiking',
+        'destination': 'Multiple Cities',
+        'duration': 7,
+        'price': 650.00,
+        'description': 'Combine culture and nature on this unique hiking trail from Kathmandu Valley to Pokhara. Walk through traditional villages, terraced farms, and forests while experiencing rural Nepali life.',
+        'itinerary': 'Day 1: Drive to Sundarijal, trek to Chisapani\nDay 2: Trek to Nagarkot\nDay 3: Trek to Dhulikhel\nDay 4: Trek to Panauti\nDay 5: Drive to Pokhara\nDay 6: Pokhara sightseeing\nDay 7: Return to Kathmandu',
+        'includes': 'All transportation, Accommodation with breakfast, Guide, Porter service, All entry fees',
+        'excludes': 'Lunch and dinner, Travel insurance, Personal expenses, Tips',
+        'image_url': '/static/images/kathmandu-pokhara-trail.jpg',
+        'package_type': 'Adventure'
+    },
+    {
+        'name': 'Nepal Foodie Tour',
+        'slug': 'nepal-foodie-tour',
+        'destination': 'Multiple Cities',
+        'duration': 8,
+        'price': 890.00,
+        'description': 'A culinary journey through Nepal\'s diverse flavors. Taste authentic Newari, Thakali, and Tibetan dishes, take cooking classes, visit local markets, and learn about Nepal\'s food culture.',
+        'itinerary': 'Day 1-2: Kathmandu food tour, cooking class\nDay 3-4: Pokhara lakeside dining, local market visit\nDay 5: Bandipur traditional meal experience\nDay 6-7: Cooking workshops, spice tours\nDay 8: Departure',
+        'includes': 'All transportation, Accommodation with breakfast, Food tours, Cooking classes, 2 meals daily, English-speaking guide',
+        'excludes': 'International flights, Alcoholic drinks, Travel insurance, Personal expenses',
+        'image_url': '/static/images/food-tour.jpg',
+        'package_type': 'Special Interest'
+    }
+    ]
+    
+    for package_data in sample_packages:
+        package = TravelPackage(**package_data)
+        db.session.add(package)
+    
+    # Seasonal, early-bird and group pricing
+    for rule in pricing.EXAMPLE_RULES:
+        db.session.add(PriceRule(**pricing.validate_rule(rule)))
+
+    db.session.commit()
+    # Fill the similar lists now rather than waiting for a job worker
+    for kind in CATALOG_KINDS:
+        update_similar_items(db.session.connection(), kind)
+    db.session.commit()
+    invalidate_catalog()
+    print("Database initialized with sample data!")
+
+COMMANDS = (upgrade_db, backfill_details, rebuild_search_index, build_images, build_assets, catalog_cli, jobs_cli,
+            similar_cli, bookings_cli, analytics_cli, pricing_cli, freeze_site, init_db)
+
+def init_app(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
@@ -0,0 +1,100 @@
+# config.py - Settings read from the environment
+
+# Every setting has a default and an environment variable of the same name
+# (except DATABASE_URL, which becomes SQLALCHEMY_DATABASE_URI), so a
+# deployment is configured without editing code. create_app() loads these
+# first and then applies the mapping it is given on top.
+
+import os
+import secrets
+
+import ratelimit
+
+
+def secret_key(environ, instance_path):
+    """SECRET_KEY from the environment, else a random key kept in instance/secret_key.
+
+    Every worker on a host reads the same file, so sessions survive restarts
+    and are valid on each of them; several hosts must share SECRET_KEY.
+    """
+    if environ.get('SECRET_KEY'):
+        return environ['SECRET_KEY']
+    path = os.path.join(instance_path, 'secret_key')
+    if not os.path.exists(path):
+        os.makedirs(instance_path, exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # link() fails if another process got there first; its key wins
+            os.link(temporary, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temporary)
+    with open(path) as f:
+        return f.read().strip()
+
+
+def load_config(environ, instance_path):
+    """App settings from environ (os.environ or any mapping of strings)"""
+    config = {}
+    config['SECRET_KEY'] = secret_key(environ, instance_path)
+    config['SQLALCHEMY_DATABASE_URI'] = environ.get('DATABASE_URL', 'sqlite:///trekking.db')
+    config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    config['DATABASE_REPLICA_URL'] = environ.get('DATABASE_REPLICA_URL')  # optional read-only copy for catalog reads
+    config['DATABASE_ARCHIVE_URL'] = environ.get('DATABASE_ARCHIVE_URL')  # optional separate database for archived bookings
+    config['BOOKING_ARCHIVE_DAYS'] = int(environ.get('BOOKING_ARCHIVE_DAYS', 365))  # archive bookings this long past their date
+    config['CATALOG_CACHE_TTL'] = int(environ.get('CATALOG_CACHE_TTL', 300))  # seconds
+    config['CATALOG_CACHE_SIZE'] = int(environ.get('CATALOG_CACHE_SIZE', 512))  # entries
+    config['CATALOG_VERSION_CHECK'] = float(environ.get('CATALOG_VERSION_CHECK', 1))  # seconds between checks for other processes' catalog writes
+    config['PAGE_CACHE_SIZE'] = int(environ.get('PAGE_CACHE_SIZE', 256))  # rendered pages/fragments
+    config['DEPARTURE_CAPACITY'] = int(environ.get('DEPARTURE_CAPACITY', 12))  # seats per date, "Group Size: 2-12"
+    config['SEAT_HOLD_TTL'] = int(environ.get('SEAT_HOLD_TTL', 600))  # seconds a pending hold keeps its seats
+    config['USER_CACHE_TTL'] = int(environ.get('USER_CACHE_TTL', 60))  # seconds
+    config['USER_CACHE_SIZE'] = int(environ.get('USER_CACHE_SIZE', 4096))  # logged-in users per worker
+    config['PASSWORD_HASH_METHOD'] = environ.get('PASSWORD_HASH_METHOD', 'scrypt')  # any werkzeug method string
+    config['PASSWORD_HASH_WORKERS'] = int(environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    config['PASSWORD_HASH_QUEUE'] = int(environ.get('PASSWORD_HASH_QUEUE', 2 * config['PASSWORD_HASH_WORKERS']))
+    config['PASSWORD_HASH_TIMEOUT'] = float(environ.get('PASSWORD_HASH_TIMEOUT', 30))  # seconds before login/register get 503
+    config['METRICS_ENABLED'] = environ.get('METRICS_ENABLED', '1') == '1'  # timing hooks, Server-Timing, /metrics
+    config['METRICS_ALLOWED_IPS'] = environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')  # may scrape /metrics
+    config['METRICS_TOKEN'] = environ.get('METRICS_TOKEN')  # bearer token /metrics and cache stats require; unset: not served
+    config['SLOW_REQUEST_MS'] = int(environ.get('SLOW_REQUEST_MS', 500))  # log slower requests with their SQL
+    config['TRUSTED_PROXIES'] = int(environ.get('TRUSTED_PROXIES', 0))  # reverse proxies whose X-Forwarded-For/-Proto to believe
+    config['RATE_LIMIT_ENABLED'] = environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    config['RATE_LIMIT_FILE'] = environ.get('RATE_LIMIT_FILE', os.path.join(instance_path, 'ratelimit.bin'))  # shared by the workers on a host
+    config['RATE_LIMIT_SLOTS'] = int(environ.get('RATE_LIMIT_SLOTS', 65536))  # buckets kept, 24 bytes each
+    # <endpoint>.<key> -> rate; RATE_LIMITS="login.ip=5/minute,contact.ip=off" overrides single entries
+    config['RATE_LIMITS'] = ratelimit.parse_limits(environ.get('RATE_LIMITS', ''), {
+        'login.ip': '20/minute',
+        'login.username': '10/15min',  # spread-out guessing at one account
+        'register.ip': '5/hour',
+        'booking.user': '30/hour',  # trek, travel and API bookings together
+        'booking.ip': '60/hour',
+        'contact.ip': '5/hour',
+        'quote.ip': '120/minute',  # bulk POST /api/quote
+    })
+    config['STREAM_TEMPLATES'] = environ.get('STREAM_TEMPLATES', '1') == '1'  # stream listing and dashboard pages
+    config['STREAM_CHUNK_SIZE'] = int(environ.get('STREAM_CHUNK_SIZE', 16384))  # characters sent per chunk after the head
+    config['COMPRESSION_ENABLED'] = environ.get('COMPRESSION_ENABLED', '1') == '1'  # off behind a proxy that compresses
+    config['COMPRESSION_MIN_SIZE'] = int(environ.get('COMPRESSION_MIN_SIZE', 1024))  # bytes; smaller bodies go as they are
+    config['COMPRESSION_BROTLI_QUALITY'] = int(environ.get('COMPRESSION_BROTLI_QUALITY', 4))  # 0-11
+    config['COMPRESSION_GZIP_LEVEL'] = int(environ.get('COMPRESSION_GZIP_LEVEL', 6))  # 1-9
+    config['FREEZE_DIR'] = environ.get('FREEZE_DIR', os.path.join(instance_path, 'frozen'))  # `flask freeze` output
+    config['QUOTE_HORIZON_DAYS'] = int(environ.get('QUOTE_HORIZON_DAYS', 730))  # days ahead a departure can be priced
+    config['QUOTE_BATCH_SIZE'] = int(environ.get('QUOTE_BATCH_SIZE', 10000))  # quotes per POST /api/quote
+    config['SIMILAR_ITEMS'] = int(environ.get('SIMILAR_ITEMS', 6))  # neighbours stored per trek/package
+    config['REPORTS_ALLOWED_IPS'] = environ.get('REPORTS_ALLOWED_IPS', '127.0.0.1,::1').split(',')  # booking reports
+    config['REPORTS_TOKEN'] = environ.get('REPORTS_TOKEN')  # bearer token the booking reports require; unset: not served
+    config['MAIL_URL'] = environ.get('MAIL_URL', 'file://' + os.path.join(instance_path, 'outbox'))  # see mailer.py
+    config['MAIL_FROM'] = environ.get('MAIL_FROM', 'Nepal Trekking Portal <bookings@nepaltrekking.com>')
+    config['STAFF_EMAIL'] = environ.get('STAFF_EMAIL', 'info@nepaltrekking.com')  # receives contact form messages
+    config['SUPPLIER_EMAIL'] = environ.get('SUPPLIER_EMAIL', 'operations@nepaltrekking.com')  # new/cancelled bookings
+    config['INVOICE_DIR'] = environ.get('INVOICE_DIR', os.path.join(instance_path, 'invoices'))
+    config['JOB_MAX_ATTEMPTS'] = int(environ.get('JOB_MAX_ATTEMPTS', 5))  # then the job is dead-lettered
+    config['JOB_RETRY_BASE'] = int(environ.get('JOB_RETRY_BASE', 30))  # seconds before the first retry, doubling
+    config['JOB_RETRY_CAP'] = int(environ.get('JOB_RETRY_CAP', 3600))  # longest wait between retries
+    config['JOB_LEASE'] = int(environ.get('JOB_LEASE', 300))  # seconds before a stuck job is handed to another worker
+    return config
@@ -0,0 +1,68 @@
+# database.py - Engine settings read from the environment
+
+# SQLite's defaults (rollback journal, fsync on every commit, no busy wait
+# beyond the driver's, 2 MB page cache) make concurrent bookings queue
+# behind each other and fail with "database is locked". Each new SQLite
+# connection is switched to WAL with synchronous=NORMAL, so readers never
+# block the writer and a commit costs an append to the WAL, not an fsync.
+# Server databases (PostgreSQL) get a sized, pre-pinged connection pool.
+
+from sqlalchemy.engine import make_url
+
+# PRAGMA name -> (environment variable, default)
+SQLITE_PRAGMAS = {
+    'journal_mode': ('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': ('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': ('SQLITE_BUSY_TIMEOUT', '5000'),  # ms a writer waits for the lock
+    'cache_size': ('SQLITE_CACHE_SIZE', '-65536'),  # negative: KiB, so 64 MB per connection
+    'mmap_size': ('SQLITE_MMAP_SIZE', '268435456'),  # bytes of the file read through mmap
+}
+
+# create_engine() argument -> (environment variable, default, type)
+POOL_OPTIONS = {
+    'pool_size': ('DB_POOL_SIZE', '5', int),
+    'max_overflow': ('DB_MAX_OVERFLOW', '10', int),
+    'pool_timeout': ('DB_POOL_TIMEOUT', '30', int),  # seconds to wait for a free connection
+    'pool_recycle': ('DB_POOL_RECYCLE', '1800', int),  # seconds; below server/proxy idle timeouts
+    'pool_pre_ping': ('DB_POOL_PRE_PING', '1', lambda value: value == '1'),
+}
+
+
+def sqlite_pragmas(environ, read_only=False):
+    """(name, value) pairs to run on every new SQLite connection.
+
+    A read-only replica is left in whatever journal mode its writer chose
+    and refuses writes with query_only.
+    """
+    pragmas = [(name, environ.get(variable, default)) for name, (variable, default) in SQLITE_PRAGMAS.items()]
+    if read_only:
+        pragmas = [(name, value) for name, value in pragmas if name != 'journal_mode'] + [('query_only', '1')]
+    return [(name, value) for name, value in pragmas if value != '']
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(uri, environ):
+    """SQLALCHEMY_ENGINE_OPTIONS for uri.
+
+    Pool settings apply to every pooled database; in-memory SQLite gets a
+    single static connection from Flask-SQLAlchemy and takes none.
+    """
+    if _is_memory_sqlite(make_url(uri)):
+        return {}
+    return {option: convert(environ.get(variable, default))
+            for option, (variable, default, convert) in POOL_OPTIONS.items()}
+
+
+def pragma_listener(pragmas):
+    """An engine 'connect' listener that applies pragmas to each DBAPI connection"""
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return set_pragmas
@@ -0,0 +1,95 @@
+# extensions.py - Objects the app's modules share, bound to an app by init_app()
+
+# The other modules import db, login_manager and the proxies below when they
+# load, before any app exists. init_app() sets up the database for an app
+# and builds the objects behind the proxies from its config; they live in
+# app.extensions, so each app (a test's, a script's) has its own caches,
+# password hasher and rate limit file, and a proxy always reaches the one of
+# the app in the current context.
+
+import os
+
+from flask import current_app
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from werkzeug.local import LocalProxy
+
+import database
+import ratelimit
+from catalog_cache import CatalogCache
+from passwords import PasswordHasher
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+
+
+def app_object(name):
+    """Proxy to the object the current app keeps in app.extensions[name]"""
+    return LocalProxy(lambda: current_app.extensions[name])
+
+
+# Catalog reads (listings, facets, detail pages) go to the replica when one is
+# configured. No model is bound to it, so writes always reach the primary;
+# catalog_version is read from it too, so a worker drops its catalog cache
+# for another process's write only once the replica has that write.
+catalog_session = app_object('catalog_session')
+
+# Treks and travel packages change a few times a week, so catalog pages read
+# immutable snapshots through an in-process cache instead of querying the database
+catalog_cache = app_object('catalog_cache')
+# Rendered pages and fragments (see web.cached_page)
+page_cache = app_object('page_cache')
+# Read-only projections of logged-in users (see web.load_user)
+user_cache = app_object('user_cache')
+
+# Password hashing runs on a bounded pool so login bursts can't starve other pages
+password_hasher = app_object('password_hasher')
+
+# Token buckets in a file every worker on the host maps (see ratelimit.py)
+rate_buckets = app_object('rate_buckets')
+
+
+def init_app(app):
+    config = app.config
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                      database.engine_options(config['SQLALCHEMY_DATABASE_URI'], os.environ))
+    config.setdefault('SQLALCHEMY_BINDS', {bind: config[key] for bind, key in (
+        ('replica', 'DATABASE_REPLICA_URL'), ('archive', 'DATABASE_ARCHIVE_URL')) if config[key]})
+    db.init_app(app)
+
+    with app.app_context():
+        # SQLite connections get WAL and the other pragmas in database.py as they open
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', database.pragma_listener(
+                    database.sqlite_pragmas(os.environ, read_only=bind_key == 'replica')))
+        # Archived bookings are bound to 'archive' (see models.py); without
+        # DATABASE_ARCHIVE_URL that is the primary database's own engine
+        db.engines.setdefault('archive', db.engine)
+
+        if config['DATABASE_REPLICA_URL']:
+            replica_session = scoped_session(sessionmaker(bind=db.engines['replica']))
+            app.teardown_appcontext(lambda exc: replica_session.remove())
+            app.extensions['catalog_session'] = replica_session
+        else:
+            app.extensions['catalog_session'] = db.session
+
+    app.extensions['catalog_cache'] = CatalogCache(max_entries=config['CATALOG_CACHE_SIZE'],
+                                                   ttl=config['CATALOG_CACHE_TTL'])
+    app.extensions['page_cache'] = CatalogCache(max_entries=config['PAGE_CACHE_SIZE'],
+                                                ttl=config['CATALOG_CACHE_TTL'])
+    # catalog_version the caches were filled at and when it was last read (see catalog.sync_catalog_version)
+    app.extensions['catalog_version'] = {'version': None, 'checked': None}
+    app.extensions['user_cache'] = CatalogCache(max_entries=config['USER_CACHE_SIZE'],
+                                                ttl=config['USER_CACHE_TTL'])
+    app.extensions['password_hasher'] = PasswordHasher(method=config['PASSWORD_HASH_METHOD'],
+                                                       workers=config['PASSWORD_HASH_WORKERS'],
+                                                       max_queue=config['PASSWORD_HASH_QUEUE'],
+                                                       timeout=config['PASSWORD_HASH_TIMEOUT'])
+    app.extensions['rate_buckets'] = ratelimit.TokenBuckets(config['RATE_LIMIT_FILE'],
+                                                            slots=config['RATE_LIMIT_SLOTS'])
+
+    login_manager.init_app(app)
+    login_manager.login_view = 'main.login'
@@ -0,0 +1,195 @@
+# freeze.py - Static copy of the anonymous catalog pages for nginx or a CDN
+
+# `flask freeze` renders the pages every anonymous visitor sees the same way
+# into a directory tree that a web server can serve without the app:
+#
+#     /treks                          treks/index.html
+#     /treks?region=Everest           treks/index@region=Everest.html
+#     /trek/everest-base-camp         trek/everest-base-camp/index.html
+#
+# i.e. the path plus the query string exactly as a browser submits the
+# filter form, so nginx can map $uri and $args straight to a file. Each page
+# gets deterministic .gz and .br siblings for gzip_static/brotli_static.
+# The static folder is copied alongside, and files that are not already
+# content-hashed (dist/ and images/derived/ are) get a hashed copy the pages
+# reference instead, so everything under /static can be cached forever.
+#
+# A manifest in the output directory records a fingerprint of everything
+# each page was rendered from; a later run renders only the pages whose
+# fingerprint changed and removes the pages that no longer exist.
+
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import urllib.parse
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = '.freeze-manifest.json'
+
+# Already named after their content (see images.py and assets.py), except the manifests
+HASHED_DIRS = ('dist/', 'images/derived/')
+COMPRESSIBLE = ('.html', '.css', '.js', '.json', '.svg', '.txt', '.xml')
+
+# Pages are many and small: brotli 11 saves ~10% over 5 on a catalog page
+# but costs 60 times as long, more than rendering it
+PAGE_BROTLI_QUALITY = 5
+STATIC_BROTLI_QUALITY = 11
+
+
+def query_string(pairs):
+    """A filter query as browsers encode a GET form, leaving out empty values"""
+    return urllib.parse.urlencode([(name, value) for name, value in pairs if value],
+                                  quote_via=urllib.parse.quote_plus)
+
+
+def page_path(url):
+    """Output file, relative to the output directory, for a page URL"""
+    path, _, query = url.partition('?')
+    name = f'index@{query}.html' if query else 'index.html'
+    directory = path.strip('/')
+    return posixpath.join(directory, name) if directory else name
+
+
+def fingerprint(*parts):
+    """Digest of the things a page is rendered from; bytes are hashed as they are, anything else by repr"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def tree_digest(*roots):
+    """Digest of the names and contents of every file under the given directories (or files)"""
+    digest = hashlib.sha1()
+    for root in roots:
+        paths = [root] if os.path.isfile(root) else sorted(
+            os.path.join(directory, name) for directory, _, names in os.walk(root) for name in names)
+        for path in paths:
+            digest.update(os.path.relpath(path, root).encode('utf-8') + b'\0')
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha1(f.read()).digest())
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir):
+    """The previous run's manifest, or an empty one"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        manifest = {'version': MANIFEST_VERSION}
+    manifest.setdefault('pages', {})
+    manifest.setdefault('static', {})
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def write_file(output_dir, relpath, data, brotli_quality=STATIC_BROTLI_QUALITY):
+    """Write data and, for text formats, deterministic .gz and .br siblings"""
+    import brotli
+
+    path = os.path.join(output_dir, relpath)
+    _write_atomic(path, data)
+    if relpath.endswith(COMPRESSIBLE):
+        # mtime=0 keeps the .gz identical across runs, so sync tools skip it
+        _write_atomic(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        _write_atomic(path + '.br', brotli.compress(data, mode=brotli.MODE_TEXT, quality=brotli_quality))
+
+
+def remove_file(output_dir, relpath):
+    """Remove a file with its .gz/.br siblings, and the directories that leaves empty"""
+    path = os.path.join(output_dir, relpath)
+    for suffix in ('', '.gz', '.br'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+    directory = os.path.dirname(path)
+    while directory != os.path.normpath(output_dir) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+def _hashed_name(relpath, data):
+    stem, ext = posixpath.splitext(relpath)
+    return f'{stem}.{hashlib.sha1(data).hexdigest()[:10]}{ext}'
+
+
+def _content_hashed(relpath):
+    return relpath.startswith(HASHED_DIRS) and not relpath.endswith('.json')
+
+
+def sync_static(static_dir, output_dir, manifest, log=print):
+    """Copy static_dir to output_dir, adding hashed copies; returns {path: hashed path}.
+
+    Files are compared by size and mtime with the previous run's manifest
+    (manifest['static'], updated in place). A superseded hashed copy is kept
+    until the run after, so pages cached just before a run can still load it.
+    """
+    previous = manifest['static']
+    current = {}
+    copied = 0
+    for directory, _, names in os.walk(static_dir):
+        for name in sorted(names):
+            source = os.path.join(directory, name)
+            relpath = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            stat = os.stat(source)
+            entry = previous.get(relpath)
+            if (entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]
+                    and os.path.exists(os.path.join(output_dir, entry[2]))):
+                current[relpath] = entry
+                continue
+            with open(source, 'rb') as f:
+                data = f.read()
+            hashed = relpath if _content_hashed(relpath) else _hashed_name(relpath, data)
+            write_file(output_dir, relpath, data)
+            if hashed != relpath:
+                write_file(output_dir, hashed, data)
+            superseded = entry[2] if entry and entry[2] != hashed else (entry[3] if entry else None)
+            if entry and entry[3] and entry[3] not in (hashed, superseded):
+                remove_file(output_dir, entry[3])
+            current[relpath] = [stat.st_size, stat.st_mtime_ns, hashed, superseded]
+            copied += 1
+    for relpath, entry in previous.items():
+        if relpath not in current:
+            for path in {relpath, entry[2], entry[3]} - {None}:
+                remove_file(output_dir, path)
+    manifest['static'] = current
+    if copied:
+        log(f"Copied {copied} static files")
+    return {relpath: entry[2] for relpath, entry in current.items() if entry[2] != relpath}
+
+
+def rewrite_static_refs(html, hashed, prefix='/static/'):
+    """Point /static/... references in a page at the files' hashed copies"""
+    pattern = re.compile(r'(?<![\w/])' + re.escape(prefix) + r'([^"\'()\s,?#]+)')
+    return pattern.sub(lambda match: prefix + hashed.get(match.group(1), match.group(1)), html)
+
+
+def plan(pages, manifest, output_dir):
+    """(urls to render, output paths to delete) for {url: fingerprint} against the previous run"""
+    previous = manifest['pages']
+    render = sorted(url for url, version in pages.items()
+                    if url not in previous or previous[url][0] != version
+                    or not os.path.exists(os.path.join(output_dir, previous[url][1])))
+    delete = sorted(entry[1] for url, entry in previous.items() if url not in pages)
+    return render, delete
@@ -0,0 +1,32 @@
+# gunicorn.conf.py - Settings for `gunicorn` (read from the working directory)
+
+# The app is imported and warmed once in the master, then forked: workers
+# share the compiled templates, catalog cache and imported code copy-on-write
+# instead of building their own. The garbage collector is kept off until
+# the warm objects are frozen, since a collection in a worker would write
+# to (and so copy) every page holding an object it visits.
+# WEB_CONCURRENCY and BIND set the worker count and address.
+
+import gc
+import multiprocessing
+import os
+
+gc.disable()
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 * multiprocessing.cpu_count() + 1))
+preload_app = True
+
+
+def when_ready(server):
+    import wsgi
+    server.log.info("Warmed the app in %.2fs", wsgi.warm_up(wsgi.app))
+    # Everything alive now moves to a generation collections never scan
+    gc.freeze()
+    gc.enable()
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.reopen_connections(wsgi.app)
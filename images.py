@@ -0,0 +1,191 @@
+# images.py - Resized, re-encoded image derivatives and their manifest
+
+# Card images are shown 200px tall but the originals in static/images are
+# full-size JPEGs (food-tour.jpg alone is ~500 KB). `flask build-images`
+# writes smaller copies at several widths in AVIF (when Pillow supports it),
+# WebP and JPEG, named after a hash of their content so they can be cached
+# forever, and records them in a manifest the templates read to build
+# <picture> elements with srcset/sizes.
+
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+
+from markupsafe import Markup, escape
+
+MANIFEST_VERSION = 1
+DEFAULT_WIDTHS = (320, 480, 640, 960, 1280, 1920)
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# (format, file extension, mimetype, Pillow save options), best first
+FORMATS = [
+    ('avif', 'avif', 'image/avif', {'quality': 55, 'speed': 6}),
+    ('webp', 'webp', 'image/webp', {'quality': 78, 'method': 6}),
+    ('jpeg', 'jpg', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+]
+MIMETYPES = {name: mimetype for name, _, mimetype, _ in FORMATS}
+
+
+def available_formats():
+    """Formats this Pillow build can encode (AVIF needs Pillow 11.2+ with libavif)"""
+    from PIL import features
+    return [name for name, *_ in FORMATS if name == 'jpeg' or features.check(name)]
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(image, fmt, options):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format=fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def build_derivatives(static_dir, source_subdir='images', output_subdir='images/derived',
+                      widths=DEFAULT_WIDTHS, formats=None, force=False, log=print):
+    """Generate derivatives for every image under static_dir/source_subdir.
+
+    Images whose content and requested widths/formats are unchanged since the
+    last run are skipped. Files the new manifest no longer references are
+    removed. Returns the manifest dict, which is also written to
+    static_dir/output_subdir/manifest.json.
+    """
+    from PIL import Image, ImageOps
+
+    formats = [fmt for fmt, *_ in FORMATS if fmt in (formats or available_formats())]
+    widths = sorted(set(widths))
+    source_root = os.path.join(static_dir, source_subdir)
+    output_root = os.path.join(static_dir, output_subdir)
+    os.makedirs(output_root, exist_ok=True)
+    manifest_path = os.path.join(output_root, 'manifest.json')
+    previous = load_manifest(manifest_path)
+    settings = {'widths': widths, 'formats': formats}
+
+    images = {}
+    for name in sorted(os.listdir(source_root)):
+        source = os.path.join(source_root, name)
+        stem, ext = os.path.splitext(name)
+        if not os.path.isfile(source) or ext.lower() not in SOURCE_EXTENSIONS:
+            continue
+        key = f'{source_subdir}/{name}'
+        source_hash = _file_hash(source)
+        entry = previous.get(key)
+        if (not force and entry and entry['source_hash'] == source_hash and entry['settings'] == settings
+                and all(os.path.exists(os.path.join(static_dir, path))
+                        for variants in entry['variants'].values() for _, path in variants)):
+            images[key] = entry
+            continue
+
+        with Image.open(source) as original:
+            # Phone photos carry their rotation in EXIF; bake it in before resizing
+            original = ImageOps.exif_transpose(original)
+            original.load()
+        # Never upscale: widths wider than the original collapse to its own width
+        targets = sorted({min(width, original.width) for width in widths})
+        variants = {fmt: [] for fmt in formats}
+        for width in targets:
+            height = round(original.height * width / original.width)
+            resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+            for fmt, extension, _, options in FORMATS:
+                if fmt not in variants:
+                    continue
+                data = _encode(resized, fmt, options)
+                path = f'{output_subdir}/{stem}-{width}.{hashlib.sha1(data).hexdigest()[:10]}.{extension}'
+                with open(os.path.join(static_dir, path), 'wb') as f:
+                    f.write(data)
+                variants[fmt].append((width, path))
+        images[key] = {
+            'source_hash': source_hash,
+            'settings': settings,
+            'width': original.width,
+            'height': original.height,
+            'variants': variants,
+        }
+        smallest = min(os.path.getsize(os.path.join(static_dir, path)) for _, path in variants[formats[0]])
+        log(f"{key}: {len(targets)} widths x {len(formats)} formats "
+            f"({os.path.getsize(source) // 1024} KB -> {smallest // 1024} KB at {targets[0]}px {formats[0]})")
+
+    manifest = {'version': MANIFEST_VERSION, 'images': images}
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+    keep = {os.path.basename(path) for entry in images.values()
+            for variants in entry['variants'].values() for _, path in variants}
+    for name in os.listdir(output_root):
+        if name != 'manifest.json' and name not in keep:
+            os.remove(os.path.join(output_root, name))
+    return manifest
+
+
+def load_manifest(path):
+    """Return the images section of a manifest file, or {} if there is none"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest['images']
+
+
+class ImageManifest:
+    """The derivative manifest, re-read whenever `flask build-images` rewrites it"""
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._images = load_manifest(self.path) if mtime else {}
+                    self._mtime = mtime
+        return self._images.get(key)
+
+
+def picture_markup(entry, src, url_for_path, sizes, attrs):
+    """<picture> with one <source> per modern format and a JPEG <img> fallback.
+
+    entry is a manifest entry or None; without one a plain <img src> is
+    returned so images that were never built still show.
+    """
+    attributes = ''.join(f' {name}="{escape(value)}"' for name, value in attrs.items() if value is not None)
+    if entry is None:
+        return Markup(f'<img src="{escape(src)}"{attributes}>')
+
+    def srcset(fmt):
+        return ', '.join(f'{url_for_path(path)} {width}w' for width, path in entry['variants'][fmt])
+
+    fallback_fmt = 'jpeg' if 'jpeg' in entry['variants'] else next(iter(entry['variants']))
+    fallback = entry['variants'][fallback_fmt]
+    fallback_src = next((path for width, path in fallback if width >= 640), fallback[-1][1])
+    parts = ['<picture>']
+    for fmt in entry['variants']:
+        if fmt != fallback_fmt:
+            parts.append(f'<source type="{MIMETYPES[fmt]}" srcset="{escape(srcset(fmt))}" sizes="{escape(sizes)}">')
+    # width/height give the browser the aspect ratio before the image arrives
+    parts.append(
+        f'<img src="{escape(url_for_path(fallback_src))}" srcset="{escape(srcset(fallback_fmt))}" '
+        f'sizes="{escape(sizes)}" width="{entry["width"]}" height="{entry["height"]}"{attributes}>'
+    )
+    parts.append('</picture>')
+    return Markup(''.join(parts))
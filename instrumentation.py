@@ -0,0 +1,110 @@
+# instrumentation.py - Request timing, Server-Timing headers and /metrics
+
+# Time spent in SQL, templates and password hashing is added up per request
+# and reported in a Server-Timing header, as per-endpoint histograms on
+# /metrics and, for slow requests, in a log line listing the slowest SQL.
+# With METRICS_ENABLED=0 init_app() installs none of the hooks below.
+
+import time
+
+from flask import before_render_template, current_app, g, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import metrics
+
+metrics_registry = metrics.Registry()
+request_duration = metrics_registry.histogram(
+    'http_request_duration_seconds', 'Time to serve a request', labels=('endpoint', 'method'))
+request_db_time = metrics_registry.histogram(
+    'http_request_db_seconds', 'Time spent executing SQL per request', labels=('endpoint',))
+request_render_time = metrics_registry.histogram(
+    'http_request_render_seconds', 'Time spent rendering templates per request', labels=('endpoint',))
+request_hash_time = metrics_registry.histogram(
+    'http_request_password_hash_seconds', 'Time spent hashing or verifying passwords per request', labels=('endpoint',))
+request_queries = metrics_registry.histogram(
+    'http_request_queries', 'SQL statements executed per request', labels=('endpoint',), buckets=metrics.COUNT_BUCKETS)
+requests_total = metrics_registry.counter(
+    'http_requests_total', 'Requests served', labels=('endpoint', 'method', 'status'))
+slow_requests_total = metrics_registry.counter(
+    'http_slow_requests_total', 'Requests slower than SLOW_REQUEST_MS', labels=('endpoint',))
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and metrics.current_stats.get() is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = metrics.current_stats.get()
+    started = getattr(context, '_query_started', None)
+    if stats is not None and started is not None:
+        stats.record_query(statement, time.perf_counter() - started)
+
+def _start_render(sender, template, context, **extra):
+    stats = metrics.current_stats.get()
+    if stats is not None:
+        stats.start_render()
+
+def _finish_render(sender, template, context, **extra):
+    stats = metrics.current_stats.get()
+    if stats is not None:
+        stats.finish_render()
+
+def _record_hash_time(seconds):
+    stats = metrics.current_stats.get()
+    if stats is not None:
+        stats.hash_time += seconds
+
+def _start_request_stats():
+    g._request_stats_token = metrics.current_stats.set(metrics.RequestStats())
+
+def _observe_request(app, stats, endpoint, method, path, status):
+    total = time.perf_counter() - stats.started
+    request_duration.observe(total, endpoint, method)
+    request_db_time.observe(stats.db_time, endpoint)
+    request_render_time.observe(stats.render_time, endpoint)
+    request_hash_time.observe(stats.hash_time, endpoint)
+    request_queries.observe(stats.queries, endpoint)
+    requests_total.inc(endpoint, method, status)
+    
+    if total * 1000 >= app.config['SLOW_REQUEST_MS']:
+        slow_requests_total.inc(endpoint)
+        app.logger.warning(
+            'Slow request %s %s (%s): %.0f ms total, %.0f ms in %d queries, %.0f ms rendering, %.0f ms hashing%s',
+            method, path, endpoint, total * 1000, stats.db_time * 1000,
+            stats.queries, stats.render_time * 1000, stats.hash_time * 1000,
+            ''.join(f'\n  {elapsed * 1000:8.1f} ms  {statement}' for elapsed, statement in stats.slowest_statements()))
+
+def _finish_request_stats(response):
+    stats = metrics.current_stats.get()
+    if stats is None:
+        return response
+    # Server-Timing covers the work done before the headers go out
+    response.headers['Server-Timing'] = stats.server_timing(time.perf_counter() - stats.started)
+    observe = (current_app._get_current_object(), stats, request.endpoint or 'none', request.method,
+               request.full_path.rstrip('?'), str(response.status_code))
+    if response.is_streamed:
+        # Streamed pages query and render while the body is sent; count that
+        # too (the app goes along, as the context may be gone by then)
+        response.call_on_close(lambda: _observe_request(*observe))
+    else:
+        _observe_request(*observe)
+    return response
+
+def _reset_request_stats(exc):
+    token = g.pop('_request_stats_token', None)
+    if token is not None:
+        metrics.current_stats.reset(token)
+
+def init_app(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_start_render, app)
+    template_rendered.connect(_finish_render, app)
+    app.extensions['password_hasher'].observer = _record_hash_time
+    # Registered before any other request hooks, so their time is included
+    app.before_request(_start_request_stats)
+    app.after_request(_finish_request_stats)
+    app.teardown_request(_reset_request_stats)
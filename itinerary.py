@@ -0,0 +1,64 @@
+# itinerary.py - Parse free-text itinerary/includes/excludes into structured data
+
+# Treks and travel packages store their itinerary as "Day N: text" lines and
+# their includes/excludes as comma-separated lists. These helpers turn that
+# text into the structure the detail templates render, once, when a row is
+# saved, instead of splitting the strings on every page view.
+
+import re
+
+# Altitudes written like "(2,800m)", "(5416 m)" or "(5,545 m)"
+_ALTITUDE_RE = re.compile(r'\((\d{1,2},?\d{3})\s*m\)')
+
+DETAILS_VERSION = 1
+
+
+def parse_itinerary(text):
+    """Split itinerary text into [{'day', 'text', 'altitudes'}] entries"""
+    entries = []
+    for line in (text or '').splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        day, sep, rest = line.partition(':')
+        if not sep:
+            day, rest = None, line
+        entries.append({
+            'day': day.strip() if day else None,
+            'text': rest.strip(),
+            'altitudes': [int(value.replace(',', '')) for value in _ALTITUDE_RE.findall(rest)],
+        })
+    return entries
+
+
+def parse_items(text):
+    """Split a comma-separated list, keeping commas inside parentheses.
+
+    "Personal expenses (drinks, hot shower), Tips" is two items, not three.
+    """
+    items, current, depth = [], [], 0
+    for char in text or '':
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(depth - 1, 0)
+        if char == ',' and depth == 0:
+            items.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    items.append(''.join(current))
+    return [item.strip() for item in items if item.strip()]
+
+
+def build_details(itinerary, includes, excludes):
+    """Structured form of a trek/package's text fields, as stored in `details`"""
+    days = parse_itinerary(itinerary)
+    altitudes = [altitude for day in days for altitude in day['altitudes']]
+    return {
+        'v': DETAILS_VERSION,
+        'itinerary': days,
+        'highest_point': max(altitudes) if altitudes else None,
+        'includes': parse_items(includes),
+        'excludes': parse_items(excludes),
+    }
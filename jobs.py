@@ -0,0 +1,219 @@
+# jobs.py - Durable background jobs stored in the application database
+
+# Work that doesn't need to finish before the response (emails, supplier
+# notifications, invoices) is written to a jobs table in the same
+# transaction as the change that caused it, and run by `flask jobs work`
+# processes. A worker claims a job with a conditional UPDATE, so two
+# workers never run it at the same time, and holds it for a lease; a job
+# whose worker died is picked up again once the lease runs out. Failures
+# are retried with exponential backoff; after max_attempts the job moves to
+# the dead-letter table for someone to look at. Jobs may run more than
+# once (a worker can die after the work but before recording it), so
+# handlers should be safe to repeat.
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.exc import OperationalError
+
+log = logging.getLogger(__name__)
+
+# What a handler gets besides its payload
+JobInfo = namedtuple('JobInfo', ['id', 'name', 'key', 'attempts'])
+
+
+class PermanentError(Exception):
+    """Raised by a handler for failures a retry can't fix; the job goes straight to the dead letters"""
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def backoff(attempts, base, cap):
+    """Seconds to wait before retry number `attempts` (1-based): base * 2^(n-1), capped, with jitter"""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _insert_ignore(connection, table, rows):
+    """INSERT that skips rows whose idempotency key is already queued; returns rows added"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        added = 0
+        for row in rows:
+            if row.get('key') is None or not connection.execute(
+                    select(table.c.id).where(table.c.key == row['key'])).first():
+                added += connection.execute(insert(table).values(**row)).rowcount
+        return added
+    return connection.execute(dialect_insert(table).values(rows).on_conflict_do_nothing()).rowcount
+
+
+class JobQueue:
+    """Handlers by name plus the operations on the jobs and dead-letter tables.
+
+    jobs and dead_jobs are the SQLAlchemy Table objects; context is a
+    callable returning a context manager each job runs inside (the app uses
+    it to provide an application context). handlers, if given, is a dict of
+    handlers by name that several queues can share.
+    """
+
+    def __init__(self, jobs, dead_jobs, max_attempts=5, retry_base=30, retry_cap=3600, lease=300,
+                 context=None, handlers=None):
+        self.jobs = jobs
+        self.dead_jobs = dead_jobs
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.lease = lease
+        self.context = context
+        self.handlers = {} if handlers is None else handlers
+
+    def task(self, name=None):
+        """Register a handler(payload, job_info) under name (default: the function name)"""
+        def decorator(handler):
+            self.handlers[name or handler.__name__] = handler
+            return handler
+        return decorator
+
+    def enqueue(self, connection, name, payload, key=None, delay=0):
+        """Queue a job as part of the caller's transaction.
+
+        With a key, a second enqueue while a job with that key is still in
+        the table does nothing. Returns whether a job was added.
+        """
+        return bool(self.enqueue_many(connection, [(name, payload, key)], delay))
+
+    def enqueue_many(self, connection, entries, delay=0):
+        """Queue (name, payload, key) entries with a single INSERT; returns how many were added"""
+        now = datetime.utcnow()
+        rows = []
+        for name, payload, key in entries:
+            if name not in self.handlers:
+                raise KeyError(f"no job handler named {name!r}")
+            rows.append({'name': name, 'key': key, 'payload': payload, 'status': 'queued', 'attempts': 0,
+                         'run_at': now + timedelta(seconds=delay), 'created_at': now})
+        return _insert_ignore(connection, self.jobs, rows)
+
+    def claim(self, engine, worker_id):
+        """Lease the next due job to worker_id; returns its row or None"""
+        jobs = self.jobs
+        now = datetime.utcnow()
+        claimable = or_(and_(jobs.c.status == 'queued', jobs.c.run_at <= now),
+                        and_(jobs.c.status == 'running', jobs.c.locked_until <= now))
+        with engine.begin() as connection:
+            candidates = connection.execute(
+                select(jobs.c.id).where(claimable).order_by(jobs.c.run_at, jobs.c.id).limit(5)).scalars().all()
+            for job_id in candidates:
+                # Another worker may have taken it since the SELECT; only one UPDATE matches
+                claimed = connection.execute(update(jobs).where(jobs.c.id == job_id, claimable).values(
+                    status='running', attempts=jobs.c.attempts + 1, locked_by=worker_id,
+                    locked_until=now + timedelta(seconds=self.lease))).rowcount
+                if claimed:
+                    return connection.execute(select(jobs).where(jobs.c.id == job_id)).first()
+        return None
+
+    def _finish(self, engine, job, worker_id, values):
+        with engine.begin() as connection:
+            connection.execute(update(self.jobs).where(
+                self.jobs.c.id == job.id, self.jobs.c.locked_by == worker_id).values(**values))
+
+    def _bury(self, engine, job, error):
+        """Move a job to the dead-letter table"""
+        with engine.begin() as connection:
+            connection.execute(insert(self.dead_jobs).values(
+                job_id=job.id, name=job.name, key=job.key, payload=job.payload, attempts=job.attempts,
+                error=error, created_at=job.created_at, failed_at=datetime.utcnow()))
+            connection.execute(delete(self.jobs).where(self.jobs.c.id == job.id))
+        log.error("job %s (%s) moved to dead letters after %d attempts", job.id, job.name, job.attempts)
+
+    def run(self, engine, job, worker_id):
+        """Run one claimed job and record the outcome; returns True if it succeeded"""
+        handler = self.handlers.get(job.name)
+        try:
+            if handler is None:
+                raise PermanentError(f"no job handler named {job.name!r}")
+            info = JobInfo(job.id, job.name, job.key, job.attempts)
+            if self.context is not None:
+                with self.context():
+                    handler(job.payload, info)
+            else:
+                handler(job.payload, info)
+        except Exception as e:
+            error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+            if isinstance(e, PermanentError) or job.attempts >= self.max_attempts:
+                self._bury(engine, job, traceback.format_exc())
+            else:
+                delay = backoff(job.attempts, self.retry_base, self.retry_cap)
+                self._finish(engine, job, worker_id, {
+                    'status': 'queued', 'locked_by': None, 'locked_until': None, 'last_error': error,
+                    'run_at': datetime.utcnow() + timedelta(seconds=delay)})
+                log.warning("job %s (%s) failed on attempt %d, retrying in %.0fs: %s",
+                            job.id, job.name, job.attempts, delay, error)
+            return False
+        self._finish(engine, job, worker_id, {
+            'status': 'done', 'locked_by': None, 'locked_until': None, 'finished_at': datetime.utcnow()})
+        return True
+
+    def work(self, engine, worker_id=None, poll_interval=1.0, burst=False, should_stop=lambda: False):
+        """Claim and run jobs until should_stop() (or, with burst, until none are due).
+
+        Returns the number of jobs run.
+        """
+        worker_id = worker_id or default_worker_id()
+        ran = 0
+        while not should_stop():
+            try:
+                job = self.claim(engine, worker_id)
+            except OperationalError as e:
+                # SQLite lock contention with another worker; back off briefly and try again
+                log.debug("could not claim a job: %s", e)
+                time.sleep(random.uniform(0.01, 0.1))
+                continue
+            if job is None:
+                if burst:
+                    break
+                time.sleep(poll_interval)
+                continue
+            self.run(engine, job, worker_id)
+            ran += 1
+        return ran
+
+    def retry_dead(self, connection, ids=None):
+        """Put dead jobs (all, or those with the given dead-letter ids) back in the queue.
+        
+        Returns (jobs requeued, dead-letter ids left in place because a job
+        with the same idempotency key is still in the queue).
+        """
+        query = select(self.dead_jobs).order_by(self.dead_jobs.c.id)
+        if ids:
+            query = query.where(self.dead_jobs.c.id.in_(ids))
+        dead = connection.execute(query).all()
+        now = datetime.utcnow()
+        requeued, skipped = 0, []
+        for row in dead:
+            if not _insert_ignore(connection, self.jobs, [{
+                    'name': row.name, 'key': row.key, 'payload': row.payload, 'status': 'queued', 'attempts': 0,
+                    'run_at': now, 'created_at': row.created_at or now}]):
+                skipped.append(row.id)
+                continue
+            connection.execute(delete(self.dead_jobs).where(self.dead_jobs.c.id == row.id))
+            requeued += 1
+        return requeued, skipped
+
+    def prune(self, connection, older_than):
+        """Delete finished jobs older than a timedelta; their keys can then be queued again"""
+        cutoff = datetime.utcnow() - older_than
+        return connection.execute(delete(self.jobs).where(
+            self.jobs.c.status == 'done', self.jobs.c.finished_at < cutoff)).rowcount
@@ -0,0 +1,150 @@
+# metrics.py - Per-request timing and Prometheus-format counters/histograms
+
+# Every request gets a RequestStats that SQLAlchemy, template and password
+# hashing hooks add to; after the response it is folded into the endpoint's
+# histograms and, when the request was slow, logged with its SQL. Values are
+# per worker process, like the caches.
+
+from bisect import bisect_left
+from contextvars import ContextVar
+import threading
+import time
+
+# Seconds; roughly doubling from 1ms to 10s
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+MAX_STATEMENTS = 50  # SQL statements kept per request for the slow-request log
+
+current_stats = ContextVar('request_stats', default=None)
+
+_INF = 'le="+Inf"'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f'{self.name}{_labels(self.labels, label_values)} {value}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram, rendered the way Prometheus expects"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=TIME_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [count per bucket..., overflow, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_labels(self.labels, label_values, [le])} {cumulative}'
+            cumulative += series[len(self.buckets)]
+            yield f'{self.name}_bucket{_labels(self.labels, label_values, [_INF])} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labels, label_values)} {series[-1]:.6f}'
+            yield f'{self.name}_count{_labels(self.labels, label_values)} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    """Time spent in each layer while serving one request"""
+    __slots__ = ('started', 'queries', 'db_time', 'render_time', 'hash_time', 'statements', '_render_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.hash_time = 0.0
+        self.statements = []
+        self._render_started = None
+
+    def record_query(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append((elapsed, statement))
+
+    def start_render(self):
+        self._render_started = time.perf_counter()
+
+    def finish_render(self):
+        if self._render_started is not None:
+            self.render_time += time.perf_counter() - self._render_started
+            self._render_started = None
+
+    def server_timing(self, total):
+        """Value for the Server-Timing response header (durations in ms)"""
+        return (f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+                f'render;dur={self.render_time * 1000:.1f}, '
+                f'hash;dur={self.hash_time * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}')
+
+    def slowest_statements(self, limit=10):
+        return sorted(self.statements, key=lambda item: item[0], reverse=True)[:limit]
@@ -0,0 +1,129 @@
+# migrations.py - Versioned schema changes for existing databases
+
+# db.create_all() only creates missing tables, so indexes and columns added
+# to models after a database was first created are applied from here by
+# `flask upgrade-db`. Every step is idempotent, which makes it safe to run
+# against a database that create_all() has just built from scratch.
+
+from flask import current_app
+from sqlalchemy import inspect, text
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+
+def add_column_if_missing(table, column, ddl):
+    """Build a step that runs ALTER TABLE ... ADD COLUMN only when needed"""
+    def step(connection):
+        existing = {col['name'] for col in inspect(connection).get_columns(table)}
+        if column not in existing:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return step
+
+
+def count_existing_departures(connection):
+    """Departures for the bookings made before capacity was tracked, at DEPARTURE_CAPACITY
+    or the seats already sold if that is more (needs an app context)"""
+    for kind, table, item_column, date_column in (('trek', 'bookings', 'trek_id', 'trek_date'),
+                                                  ('travel', 'travel_bookings', 'package_id', 'travel_date')):
+        connection.execute(text(
+            "INSERT INTO departures (item_kind, item_id, departure_date, capacity, seats_booked, seats_held, version) "
+            f"SELECT :kind, {item_column}, {date_column}, "
+            "CASE WHEN SUM(number_of_people) > :capacity THEN SUM(number_of_people) ELSE :capacity END, "
+            f"SUM(number_of_people), 0, 0 FROM {table} WHERE status != 'cancelled' "
+            f"GROUP BY {item_column}, {date_column}"),
+            {'kind': kind, 'capacity': current_app.config['DEPARTURE_CAPACITY']})
+
+
+# (migration id, steps) in the order they must run; a step is either a SQL
+# string or a callable taking the connection
+MIGRATIONS = [
+    ('0001_booking_timeline_indexes', [
+        "CREATE INDEX IF NOT EXISTS ix_bookings_user_trek_date ON bookings (user_id, trek_date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_travel_bookings_user_travel_date ON travel_bookings (user_id, travel_date, id)",
+    ]),
+    ('0002_catalog_listing_indexes', [
+        "CREATE INDEX IF NOT EXISTS ix_treks_region_difficulty_price ON treks (region, difficulty, price, id)",
+        "CREATE INDEX IF NOT EXISTS ix_treks_region_price ON treks (region, price, id)",
+        "CREATE INDEX IF NOT EXISTS ix_treks_difficulty_price ON treks (difficulty, price, id)",
+        "CREATE INDEX IF NOT EXISTS ix_treks_price ON treks (price, id)",
+        "CREATE INDEX IF NOT EXISTS ix_treks_duration ON treks (duration, id)",
+        "CREATE INDEX IF NOT EXISTS ix_travel_packages_destination_type_price ON travel_packages (destination, package_type, price, id)",
+        "CREATE INDEX IF NOT EXISTS ix_travel_packages_destination_price ON travel_packages (destination, price, id)",
+        "CREATE INDEX IF NOT EXISTS ix_travel_packages_type_price ON travel_packages (package_type, price, id)",
+        "CREATE INDEX IF NOT EXISTS ix_travel_packages_price ON travel_packages (price, id)",
+        "CREATE INDEX IF NOT EXISTS ix_travel_packages_duration ON travel_packages (duration, id)",
+        "ANALYZE",
+    ]),
+    ('0003_catalog_updated_at', [
+        add_column_if_missing('treks', 'updated_at', 'TIMESTAMP'),
+        add_column_if_missing('travel_packages', 'updated_at', 'TIMESTAMP'),
+        "UPDATE treks SET updated_at = created_at WHERE updated_at IS NULL",
+        "UPDATE travel_packages SET updated_at = created_at WHERE updated_at IS NULL",
+    ]),
+    # Filled in by `flask backfill-details`; rows without it are parsed on read
+    ('0004_catalog_details', [
+        add_column_if_missing('treks', 'details', 'JSON'),
+        add_column_if_missing('travel_packages', 'details', 'JSON'),
+    ]),
+    # departures/seat_holds are created by create_all(); existing bookings are
+    # counted into departures so capacity checks see them (CASE rather than
+    # SQLite's two-argument MAX so this also runs on PostgreSQL)
+    ('0005_departure_capacity', [
+        add_column_if_missing('bookings', 'departure_id', 'INTEGER REFERENCES departures (id)'),
+        add_column_if_missing('travel_bookings', 'departure_id', 'INTEGER REFERENCES departures (id)'),
+        count_existing_departures,
+        "UPDATE bookings SET departure_id = (SELECT d.id FROM departures d WHERE d.item_kind = 'trek' "
+        "AND d.item_id = bookings.trek_id AND d.departure_date = bookings.trek_date) "
+        "WHERE departure_id IS NULL AND status != 'cancelled'",
+        "UPDATE travel_bookings SET departure_id = (SELECT d.id FROM departures d WHERE d.item_kind = 'travel' "
+        "AND d.item_id = travel_bookings.package_id AND d.departure_date = travel_bookings.travel_date) "
+        "WHERE departure_id IS NULL AND status != 'cancelled'",
+    ]),
+    # booking_rollups is created by create_all(); existing bookings are
+    # summed into it (the same totals `flask analytics rebuild` computes)
+    ('0006_booking_rollups', [
+        "DELETE FROM booking_rollups",
+        "INSERT INTO booking_rollups (kind, item_id, month, bookings, cancellations, people, revenue) "
+        "SELECT 'trek', trek_id, SUBSTR(CAST(trek_date AS VARCHAR(10)), 1, 7), COUNT(*), "
+        "SUM(CASE WHEN status = 'cancelled' THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN status = 'cancelled' THEN 0 ELSE COALESCE(number_of_people, 0) END), "
+        "SUM(CASE WHEN status = 'cancelled' THEN 0 ELSE COALESCE(total_price, 0) END) "
+        "FROM bookings GROUP BY trek_id, SUBSTR(CAST(trek_date AS VARCHAR(10)), 1, 7)",
+        "INSERT INTO booking_rollups (kind, item_id, month, bookings, cancellations, people, revenue) "
+        "SELECT 'travel', package_id, SUBSTR(CAST(travel_date AS VARCHAR(10)), 1, 7), COUNT(*), "
+        "SUM(CASE WHEN status = 'cancelled' THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN status = 'cancelled' THEN 0 ELSE COALESCE(number_of_people, 0) END), "
+        "SUM(CASE WHEN status = 'cancelled' THEN 0 ELSE COALESCE(total_price, 0) END) "
+        "FROM travel_bookings GROUP BY package_id, SUBSTR(CAST(travel_date AS VARCHAR(10)), 1, 7)",
+    ]),
+    # catalog_version is created by create_all(); its one row is added here
+    ('0007_catalog_version', [
+        "INSERT INTO catalog_version (id, version) SELECT 1, 0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM catalog_version WHERE id = 1)",
+    ]),
+]
+
+
+def applied_migrations(connection):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+        f"id VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return {row[0] for row in connection.execute(text(f"SELECT id FROM {MIGRATIONS_TABLE}"))}
+
+
+def upgrade(connection):
+    """Apply every pending migration and return the ids that ran"""
+    done = applied_migrations(connection)
+    ran = []
+    for migration_id, steps in MIGRATIONS:
+        if migration_id in done:
+            continue
+        for step in steps:
+            if callable(step):
+                step(connection)
+            else:
+                connection.execute(text(step))
+        connection.execute(text(f"INSERT INTO {MIGRATIONS_TABLE} (id) VALUES (:id)"), {'id': migration_id})
+        ran.append(migration_id)
+    return ran
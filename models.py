@@ -0,0 +1,346 @@
+# models.py - Database models
+
+# Tables, their indexes and the mapper events that belong to the rows
+# themselves. Everything that reads or writes them lives in catalog.py,
+# bookings.py and tasks.py.
+
+from datetime import datetime
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from extensions import db, password_hasher
+from itinerary import build_details
+
+
+# Database Models
+class User(UserMixin, db.Model):
+    """User Model for storing user information"""
+    __tablename__ = 'users'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(200), nullable=False)
+    full_name = db.Column(db.String(100))
+    phone = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationship with bookings
+    bookings = db.relationship('Booking', backref='user', lazy=True)
+    
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
+    
+    def check_password(self, password):
+        return password_hasher.verify(self.password_hash, password)
+
+class Trek(db.Model):
+    """Trek Model for storing trekking package information"""
+    __tablename__ = 'treks'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)
+    region = db.Column(db.String(50), nullable=False)  # Everest, Annapurna, Langtang
+    duration = db.Column(db.Integer, nullable=False)  # in days
+    difficulty = db.Column(db.String(20), nullable=False)  # Easy, Moderate, Difficult
+    max_altitude = db.Column(db.Integer)  # in meters
+    price = db.Column(db.Float, nullable=False)
+    description = db.Column(db.Text)
+    itinerary = db.Column(db.Text)
+    includes = db.Column(db.Text)
+    excludes = db.Column(db.Text)
+    details = db.Column(db.JSON)  # itinerary/includes/excludes parsed on save, see itinerary.py
+    image_url = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationship with bookings
+    bookings = db.relationship('Booking', backref='trek', lazy=True)
+    
+    # Listing filters and sort orders (see migrations 0002_catalog_listing_indexes)
+    __table_args__ = (
+        db.Index('ix_treks_region_difficulty_price', 'region', 'difficulty', 'price', 'id'),
+        db.Index('ix_treks_region_price', 'region', 'price', 'id'),
+        db.Index('ix_treks_difficulty_price', 'difficulty', 'price', 'id'),
+        db.Index('ix_treks_price', 'price', 'id'),
+        db.Index('ix_treks_duration', 'duration', 'id'),
+    )
+
+class Departure(db.Model):
+    """Seat capacity for one trek or travel package on one date"""
+    __tablename__ = 'departures'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    item_kind = db.Column(db.String(10), nullable=False)  # trek, travel
+    item_id = db.Column(db.Integer, nullable=False)
+    departure_date = db.Column(db.Date, nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    seats_booked = db.Column(db.Integer, nullable=False, default=0)  # pending + confirmed bookings
+    seats_held = db.Column(db.Integer, nullable=False, default=0)  # unexpired SeatHold rows
+    version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every seat change
+    
+    __table_args__ = (
+        db.UniqueConstraint('item_kind', 'item_id', 'departure_date', name='uq_departures_item_date'),
+    )
+
+class SeatHold(db.Model):
+    """Seats set aside while a booking is being written; released when it expires"""
+    __tablename__ = 'seat_holds'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    departure_id = db.Column(db.Integer, db.ForeignKey('departures.id'), nullable=False)
+    seats = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_seat_holds_departure_expires', 'departure_id', 'expires_at'),
+    )
+
+class Booking(db.Model):
+    """Booking Model for storing trek bookings"""
+    __tablename__ = 'bookings'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    booking_date = db.Column(db.DateTime, default=datetime.utcnow)
+    trek_date = db.Column(db.Date, nullable=False)
+    number_of_people = db.Column(db.Integer, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, confirmed, cancelled
+    special_requests = db.Column(db.Text)
+    
+    # Foreign keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    trek_id = db.Column(db.Integer, db.ForeignKey('treks.id'), nullable=False)
+    departure_id = db.Column(db.Integer, db.ForeignKey('departures.id'))
+    
+    # Dashboard timeline reads a user's bookings newest trek date first
+    __table_args__ = (
+        db.Index('ix_bookings_user_trek_date', 'user_id', 'trek_date', 'id'),
+    )
+
+class TravelPackage(db.Model):
+    """Travel Package Model for city tours and holiday packages"""
+    __tablename__ = 'travel_packages'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)
+    destination = db.Column(db.String(50), nullable=False)  # Kathmandu, Pokhara, etc.
+    duration = db.Column(db.Integer, nullable=False)  # in days
+    price = db.Column(db.Float, nullable=False)
+    description = db.Column(db.Text)
+    itinerary = db.Column(db.Text)
+    includes = db.Column(db.Text)
+    excludes = db.Column(db.Text)
+    details = db.Column(db.JSON)  # itinerary/includes/excludes parsed on save, see itinerary.py
+    image_url = db.Column(db.String(200))
+    package_type = db.Column(db.String(50))  # Cultural, Adventure, Relaxation
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationship with bookings (if you want to book travel packages too)
+    travel_bookings = db.relationship('TravelBooking', backref='package', lazy=True)
+    
+    # Listing filters and sort orders (see migrations 0002_catalog_listing_indexes)
+    __table_args__ = (
+        db.Index('ix_travel_packages_destination_type_price', 'destination', 'package_type', 'price', 'id'),
+        db.Index('ix_travel_packages_destination_price', 'destination', 'price', 'id'),
+        db.Index('ix_travel_packages_type_price', 'package_type', 'price', 'id'),
+        db.Index('ix_travel_packages_price', 'price', 'id'),
+        db.Index('ix_travel_packages_duration', 'duration', 'id'),
+    )
+
+class TravelBooking(db.Model):
+    """Booking for travel packages"""
+    __tablename__ = 'travel_bookings'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    booking_date = db.Column(db.DateTime, default=datetime.utcnow)
+    travel_date = db.Column(db.Date, nullable=False)
+    number_of_people = db.Column(db.Integer, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), default='pending')
+    
+    # Foreign keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    package_id = db.Column(db.Integer, db.ForeignKey('travel_packages.id'), nullable=False)
+    departure_id = db.Column(db.Integer, db.ForeignKey('departures.id'))
+    
+    # Dashboard timeline reads a user's bookings newest travel date first
+    __table_args__ = (
+        db.Index('ix_travel_bookings_user_travel_date', 'user_id', 'travel_date', 'id'),
+    )
+
+# Bookings moved out of the hot tables by `flask bookings archive`; same
+# columns plus archived_at, no foreign keys (they may live in another
+# database, DATABASE_ARCHIVE_URL; without one, extensions.init_app points
+# the bind at the primary database)
+ARCHIVE_BIND = 'archive'
+
+class ArchivedBooking(db.Model):
+    """Trek booking moved to the archive"""
+    __tablename__ = 'bookings_archive'
+    __bind_key__ = ARCHIVE_BIND
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # id it had in bookings
+    booking_date = db.Column(db.DateTime)
+    trek_date = db.Column(db.Date, nullable=False)
+    number_of_people = db.Column(db.Integer, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20))
+    special_requests = db.Column(db.Text)
+    user_id = db.Column(db.Integer, nullable=False)
+    trek_id = db.Column(db.Integer, nullable=False)
+    departure_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_bookings_archive_user_trek_date', 'user_id', 'trek_date', 'id'),
+    )
+
+class ArchivedTravelBooking(db.Model):
+    """Travel booking moved to the archive"""
+    __tablename__ = 'travel_bookings_archive'
+    __bind_key__ = ARCHIVE_BIND
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # id it had in travel_bookings
+    booking_date = db.Column(db.DateTime)
+    travel_date = db.Column(db.Date, nullable=False)
+    number_of_people = db.Column(db.Integer, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20))
+    user_id = db.Column(db.Integer, nullable=False)
+    package_id = db.Column(db.Integer, nullable=False)
+    departure_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_travel_bookings_archive_user_travel_date', 'user_id', 'travel_date', 'id'),
+    )
+
+class Job(db.Model):
+    """Background job waiting to run, running, or done (see jobs.py)"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(200), unique=True)  # idempotency key; NULL for jobs that may repeat
+    payload = db.Column(db.JSON)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    # Workers look for the earliest due job
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+class DeadJob(db.Model):
+    """Job that failed JOB_MAX_ATTEMPTS times, kept for inspection and `flask jobs retry-dead`"""
+    __tablename__ = 'dead_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer)
+    name = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(200))
+    payload = db.Column(db.JSON)
+    attempts = db.Column(db.Integer, nullable=False)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    failed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class BookingRollup(db.Model):
+    """Booking totals for one trek or package in one departure month (see analytics.py)"""
+    __tablename__ = 'booking_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # trek, travel
+    item_id = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM of the trek/travel date
+    bookings = db.Column(db.Integer, nullable=False, default=0)  # including cancelled
+    cancellations = db.Column(db.Integer, nullable=False, default=0)
+    people = db.Column(db.Integer, nullable=False, default=0)  # on bookings that aren't cancelled
+    revenue = db.Column(db.Float, nullable=False, default=0.0)  # total_price of bookings that aren't cancelled
+    
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'item_id', 'month', name='uq_booking_rollups_item_month'),
+        db.Index('ix_booking_rollups_kind_month', 'kind', 'month'),
+    )
+
+class CatalogVector(db.Model):
+    """Similarity feature vector of a trek or travel package (see similar.py)"""
+    __tablename__ = 'catalog_vectors'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # trek, travel
+    item_id = db.Column(db.Integer, nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)  # little-endian float32
+    version = db.Column(db.Integer, nullable=False, default=1)  # bumped whenever the vector changes
+    indexed_version = db.Column(db.Integer, nullable=False, default=0)  # version the neighbours were found for
+    threshold = db.Column(db.Float)  # score of the item's last stored neighbour
+    
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'item_id', name='uq_catalog_vectors_item'),
+    )
+
+class SimilarItem(db.Model):
+    """One entry of a trek's or package's precomputed list of similar items"""
+    __tablename__ = 'similar_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)  # 0 = most similar
+    similar_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'item_id', 'rank', name='uq_similar_items_rank'),
+        db.Index('ix_similar_items_similar', 'kind', 'similar_id'),
+    )
+
+class CatalogVersion(db.Model):
+    """Counter every catalog write bumps, so each process can tell its catalog cache is stale (see catalog.py)"""
+    __tablename__ = 'catalog_version'
+    
+    id = db.Column(db.Integer, primary_key=True)  # one row, id 1
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class PriceRule(db.Model):
+    """A seasonal, early-bird or group price adjustment (see pricing.py)"""
+    __tablename__ = 'price_rules'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    rule = db.Column(db.String(20), nullable=False)  # season, early_bird, group
+    kind = db.Column(db.String(10))  # trek, travel; NULL for both
+    item_id = db.Column(db.Integer)  # one trek/package; NULL for every item of the kind
+    starts = db.Column(db.String(5))  # season: first and last day as MM-DD
+    ends = db.Column(db.String(5))
+    min_days = db.Column(db.Integer)  # early_bird: booked at least this many days ahead
+    min_people = db.Column(db.Integer)  # group: parties of at least this size
+    percent = db.Column(db.Float, nullable=False)  # +15 adds 15%, -10 takes 10% off
+
+# Parse itinerary/includes/excludes once per write instead of in templates
+def _parse_catalog_details(mapper, connection, target):
+    target.details = build_details(target.itinerary, target.includes, target.excludes)
+
+for _model in (Trek, TravelPackage):
+    event.listen(_model, 'before_insert', _parse_catalog_details)
+    event.listen(_model, 'before_update', _parse_catalog_details)
+
+# Models by the names used in URLs, jobs and the search index
+CATALOG_MODELS = (Trek, TravelPackage)
+SEARCH_KINDS = {Trek: 'trek', TravelPackage: 'travel'}
+CATALOG_KINDS = {kind: model for model, kind in SEARCH_KINDS.items()}
+# booking kind -> (booking model, item model, item foreign key, departure date column)
+BOOKING_MODELS = {'trek': (Booking, Trek, 'trek_id', 'trek_date'),
+                  'travel': (TravelBooking, TravelPackage, 'package_id', 'travel_date')}
+ARCHIVED_BOOKING_MODELS = {'trek': ArchivedBooking, 'travel': ArchivedTravelBooking}
@@ -0,0 +1,76 @@
+# passwords.py - Password hashing on a bounded worker pool
+
+# scrypt and PBKDF2 spend their time inside hashlib, which releases the GIL,
+# so a small thread pool runs hashes in parallel while capping how many cores
+# logins can take from the rest of the site. When the pool and its queue are
+# full, new work is rejected at once instead of piling up request threads,
+# and work still waiting after `timeout` seconds is given up the same way.
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import os
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when every worker is busy and the wait queue is full, or a hash timed out"""
+
+
+class PasswordHasher:
+    """Hash and verify passwords with a configurable werkzeug method.
+
+    method is any werkzeug method string, e.g. 'scrypt', 'scrypt:16384:8:1'
+    or 'pbkdf2:sha256:600000'. Hashes made with different parameters still
+    verify, and needs_rehash() reports them so they can be upgraded.
+    """
+
+    def __init__(self, method='scrypt', workers=None, max_queue=None, timeout=30):
+        self.method = method
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 2 if max_queue is None else max_queue
+        self.timeout = timeout
+        # Werkzeug fills in default parameters; remember the full prefix
+        # ("scrypt:32768:8:1") that new hashes will carry
+        self.prefix = generate_password_hash('', method=method).split('$', 1)[0]
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self.rejected = 0
+        # Optional callable given the seconds each hash/verify took, queueing included
+        self.observer = None
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy('password hashing is saturated')
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        started = time.perf_counter()
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Still queued: don't run it at all (its slot is released by the callback)
+            future.cancel()
+            self.rejected += 1
+            raise HasherBusy(f'password hashing took longer than {self.timeout} seconds') from None
+        finally:
+            if self.observer is not None:
+                self.observer(time.perf_counter() - started)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different method or cost"""
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
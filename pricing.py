@@ -0,0 +1,298 @@
+# pricing.py - Price quotes: rate rules compiled into per-item tables, evaluated in batches
+
+# A quote is base price x a date factor x a group factor x people. Rules
+# adjust prices by a percentage:
+#
+#   season      departures between two month-days (every year, may wrap
+#               past December) - every matching season applies
+#   early_bird  bookings made at least min_days before departure - the
+#               rule with the largest min_days reached applies
+#   group       parties of at least min_people - the rule with the largest
+#               min_people reached applies
+#
+# A rule is for one item (kind and item_id), every item of a kind, or
+# everything, and only the most specific level that has rules is used: per
+# item for early-bird and group rules, per item and departure day for
+# seasons. So an item can opt out of a kind-wide discount with a 0% rule of
+# its own, and a season for treks replaces the seasons for everything on
+# the days it covers but not on the others. Quotes are for departures from today to horizon days
+# ahead, so the departure's day offset is also the booking lead time: the
+# season and early-bird factors of one set of rules fold into a single row
+# indexed by that offset, and the group factors into a row indexed by party
+# size. Items with the same rules share their rows, so a batch of quotes
+# costs a few array lookups and multiplications, not a loop over rules.
+
+from collections import namedtuple
+from datetime import date, datetime
+
+import numpy as np
+
+RULE_TYPES = ('season', 'early_bird', 'group')
+KINDS = ('trek', 'travel')
+# Importable/exported rule columns, in file order
+RULE_FIELDS = ['name', 'rule', 'kind', 'item_id', 'starts', 'ends', 'min_days', 'min_people', 'percent']
+
+# Quote error codes (0 = priced) and the message each one is reported with
+ERRORS = (None, 'unknown item', 'date must be a YYYY-MM-DD date from today to {horizon} days ahead',
+          'number_of_people must be at least 1')
+UNKNOWN_ITEM, BAD_DATE, BAD_PEOPLE = 1, 2, 3
+# The range of item ids and party sizes a batch can hold
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# The rules `flask init-db` starts with: the trekking seasons, the monsoon
+# and winter lows, and early booking and group discounts
+EXAMPLE_RULES = [
+    {'name': 'Autumn high season', 'rule': 'season', 'starts': '10-01', 'ends': '11-30', 'percent': 15},
+    {'name': 'Spring season', 'rule': 'season', 'starts': '03-01', 'ends': '05-15', 'percent': 10},
+    {'name': 'Monsoon', 'rule': 'season', 'kind': 'trek', 'starts': '06-15', 'ends': '08-31', 'percent': -20},
+    {'name': 'Winter', 'rule': 'season', 'kind': 'trek', 'starts': '12-15', 'ends': '02-15', 'percent': -10},
+    {'name': 'Early bird, 90 days', 'rule': 'early_bird', 'min_days': 90, 'percent': -5},
+    {'name': 'Early bird, 180 days', 'rule': 'early_bird', 'min_days': 180, 'percent': -10},
+    {'name': 'Group of 4 or more', 'rule': 'group', 'min_people': 4, 'percent': -5},
+    {'name': 'Group of 8 or more', 'rule': 'group', 'min_people': 8, 'percent': -10},
+]
+
+Quotes = namedtuple('Quotes', ['unit_price', 'total_price', 'error'])
+
+
+class InvalidRule(ValueError):
+    """A rate rule that cannot be stored; the message says why"""
+
+
+class QuoteError(ValueError):
+    """A single quote that cannot be priced; the message says why"""
+
+
+def _month_day(value, field):
+    """'MM-DD' -> MMDD as an int, checked against a leap year"""
+    try:
+        parsed = datetime.strptime(f'2000-{value}', '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise InvalidRule(f"{field} must be MM-DD, got {value!r}")
+    return parsed.month * 100 + parsed.day
+
+
+def validate_rule(record):
+    """Check and convert one rule record (from a file or the API) into PriceRule column values"""
+    rule = record.get('rule')
+    if rule not in RULE_TYPES:
+        raise InvalidRule(f"rule must be one of {', '.join(RULE_TYPES)}")
+    kind = record.get('kind') or None
+    if kind is not None and kind not in KINDS:
+        raise InvalidRule(f"kind must be one of {', '.join(KINDS)} or empty")
+    values = {'name': (record.get('name') or '').strip() or rule, 'rule': rule, 'kind': kind,
+              'item_id': None, 'starts': None, 'ends': None, 'min_days': None, 'min_people': None}
+    try:
+        values['percent'] = float(record.get('percent'))
+        if record.get('item_id') not in (None, ''):
+            values['item_id'] = int(record['item_id'])
+    except (TypeError, ValueError):
+        raise InvalidRule("percent must be a number and item_id a whole number")
+    if values['percent'] <= -100:
+        raise InvalidRule("percent must be above -100")
+    if values['item_id'] is not None and kind is None:
+        raise InvalidRule("a rule for one item needs its kind")
+    if rule == 'season':
+        _month_day(record.get('starts'), 'starts')
+        _month_day(record.get('ends'), 'ends')
+        values['starts'], values['ends'] = record['starts'], record['ends']
+    else:
+        field = 'min_days' if rule == 'early_bird' else 'min_people'
+        try:
+            values[field] = int(record.get(field))
+        except (TypeError, ValueError):
+            raise InvalidRule(f"{rule} rules need {field} as a whole number")
+        if values[field] < (0 if rule == 'early_bird' else 1):
+            raise InvalidRule(f"{field} is out of range")
+    return values
+
+
+def _level(rule):
+    """2: a rule for one item, 1: for a kind, 0: for everything"""
+    return bool(rule.kind) + (rule.item_id is not None)
+
+
+def _scoped(rules, kind, item_id):
+    """The rules of each type that apply to one item.
+
+    Every matching season (they are narrowed per day later); for the other
+    types only those at the item's most specific level.
+    """
+    scoped = {}
+    for rule_type in RULE_TYPES:
+        matching = [rule for rule in rules.get(rule_type, ()) if rule.kind in (None, kind)
+                    and rule.item_id in (None, item_id)]
+        if rule_type != 'season':
+            level = max(map(_level, matching), default=0)
+            matching = [rule for rule in matching if _level(rule) == level]
+        scoped[rule_type] = tuple(matching)
+    return scoped
+
+
+def _season_factors(rules, month_days):
+    """Product of the seasons covering each day, from the most specific level covering it"""
+    factors = np.ones(len(month_days))
+    for level in range(3):
+        level_factors = np.ones(len(month_days))
+        covered = np.zeros(len(month_days), dtype=bool)
+        for rule in rules:
+            if _level(rule) != level:
+                continue
+            starts, ends = _month_day(rule.starts, 'starts'), _month_day(rule.ends, 'ends')
+            if starts <= ends:
+                in_season = (month_days >= starts) & (month_days <= ends)
+            else:
+                in_season = (month_days >= starts) | (month_days <= ends)
+            level_factors[in_season] *= 1 + rule.percent / 100
+            covered |= in_season
+        factors[covered] = level_factors[covered]
+    return factors
+
+
+def _step_factors(rules, threshold, size):
+    """factors[i] = the factor of the rule with the largest threshold <= i"""
+    factors = np.ones(size)
+    for rule in sorted(rules, key=lambda rule: getattr(rule, threshold)):
+        factors[getattr(rule, threshold):] = 1 + rule.percent / 100
+    return factors
+
+
+class QuoteTables:
+    """Every item's price and rule rows for departures from today to today + horizon - 1.
+
+    items are (kind, item_id, price); rules have PriceRule's attributes.
+    Party sizes above max_people get max_people's group factor.
+    """
+
+    def __init__(self, items, rules, today, horizon=730, max_people=50):
+        self.today = np.datetime64(today, 'D')
+        self.horizon = horizon
+        self.max_people = max_people
+        by_type = {}
+        for rule in rules:
+            by_type.setdefault(rule.rule, []).append(rule)
+
+        days = self.today + np.arange(horizon)
+        months = days.astype('datetime64[M]')
+        month_days = ((months.astype(np.int64) % 12) + 1) * 100 + (days - months).astype(np.int64) + 1
+
+        # Items are kept sorted by id within each kind, so rows() can binary search them
+        self.ids, self.offsets = {}, {}
+        prices, rule_rows, rule_sets = [], [], {}
+        for kind in KINDS:
+            kind_items = sorted((item_id, price) for item_kind, item_id, price in items if item_kind == kind)
+            self.offsets[kind] = len(prices)
+            self.ids[kind] = np.array([item_id for item_id, _ in kind_items], dtype=np.int64)
+            for item_id, price in kind_items:
+                scoped = _scoped(by_type, kind, item_id)
+                key = tuple(tuple(rule.id for rule in scoped[rule_type]) for rule_type in RULE_TYPES)
+                rule_rows.append(rule_sets.setdefault(key, (len(rule_sets), scoped))[0])
+                prices.append(price)
+        self.prices = np.array(prices, dtype=np.float64)
+        self.rule_row = np.array(rule_rows, dtype=np.intp)
+
+        # Date factors (season x early bird by day offset) and group factors by party size
+        self.date_factors = np.ones((max(len(rule_sets), 1), horizon))
+        self.group_factors = np.ones((max(len(rule_sets), 1), max_people + 1))
+        for i, scoped in rule_sets.values():
+            self.date_factors[i] = _season_factors(scoped['season'], month_days)
+            self.date_factors[i] *= _step_factors(scoped['early_bird'], 'min_days', horizon)
+            self.group_factors[i] = _step_factors(scoped['group'], 'min_people', max_people + 1)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def rows(self, kinds, item_ids):
+        """Table row of each (kind, item id); -1 for items the tables don't have"""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        kinds = np.asarray(kinds)
+        rows = np.full(len(item_ids), -1, dtype=np.intp)
+        for kind in KINDS:
+            selected = np.flatnonzero(kinds == kind)
+            ids = self.ids[kind]
+            if not len(selected) or not len(ids):
+                continue
+            wanted = item_ids[selected]
+            positions = np.minimum(np.searchsorted(ids, wanted), len(ids) - 1)
+            found = ids[positions] == wanted
+            rows[selected[found]] = self.offsets[kind] + positions[found]
+        return rows
+
+    def quote(self, kinds, item_ids, dates, people, prices=None):
+        """Quotes for a batch of (kind, item id, departure date, party size).
+
+        dates are 'YYYY-MM-DD' strings, dates or datetime64[D]; anything
+        unparseable counts as out of range. prices, if given, replace the
+        tables' base prices (e.g. an item's row just read for a booking).
+        Returns Quotes of arrays: unit and total price (NaN where the quote
+        failed) and the ERRORS code of each quote.
+        """
+        rows = self.rows(kinds, item_ids)
+        offsets = (_parse_dates(dates) - self.today).astype(np.int64)
+        people = np.asarray(people, dtype=np.int64)
+
+        error = np.zeros(len(rows), dtype=np.int8)
+        error[people < 1] = BAD_PEOPLE
+        error[(offsets < 0) | (offsets >= self.horizon)] = BAD_DATE
+        error[rows < 0] = UNKNOWN_ITEM
+        valid = error == 0
+        rows, offsets = np.where(valid, rows, 0), np.where(valid, offsets, 0)
+
+        if not len(self.prices):
+            # Nothing to index; every quote already failed as an unknown item
+            return Quotes(np.full(len(rows), np.nan), np.full(len(rows), np.nan), error)
+        rule_rows = self.rule_row[rows]
+        base = self.prices[rows] if prices is None else np.asarray(prices, dtype=np.float64)
+        factor = (self.date_factors[rule_rows, offsets] *
+                  self.group_factors[rule_rows, np.clip(people, 0, self.max_people)])
+        total = np.round(base * factor * people, 2)
+        unit = np.round(total / np.maximum(people, 1), 2)
+        total[~valid] = np.nan
+        unit[~valid] = np.nan
+        return Quotes(unit, total, error)
+
+    def message(self, error):
+        """Text for an ERRORS code"""
+        return ERRORS[error].format(horizon=self.horizon)
+
+    def quote_one(self, kind, item_id, departure_date, people, price=None):
+        """(unit price, total price) for one quote; raises QuoteError"""
+        if not (INT64_MIN <= item_id <= INT64_MAX and INT64_MIN <= people <= INT64_MAX):
+            raise QuoteError('item_id and number_of_people must be 64-bit integers')
+        quotes = self.quote([kind], [item_id], [departure_date], [people],
+                            prices=None if price is None else [price])
+        if quotes.error[0]:
+            raise QuoteError(self.message(quotes.error[0]))
+        return float(quotes.unit_price[0]), float(quotes.total_price[0])
+
+
+def _parse_date(value):
+    """A date, or a string that is exactly YYYY-MM-DD, as datetime64[D]; NaT for anything else"""
+    if isinstance(value, date):
+        return np.datetime64(value, 'D')
+    if isinstance(value, str) and len(value) == 10:
+        try:
+            return np.datetime64(datetime.strptime(value, '%Y-%m-%d').date(), 'D')
+        except ValueError:
+            pass
+    return np.datetime64('NaT')
+
+
+def _parse_dates(dates):
+    """datetime64[D] array of dates; NaT for anything that isn't a date or a YYYY-MM-DD string"""
+    if isinstance(dates, np.ndarray) and dates.dtype == np.dtype('datetime64[D]'):
+        return dates
+    strings = np.asarray(dates)
+    if strings.dtype == np.dtype('U10'):
+        # numpy also reads '2027-03' and '2027-03-01T10:00', so first check
+        # the shape: digits with '-' at 4 and 7 (shorter strings are padded
+        # with NULs, which aren't digits)
+        chars = strings.view(np.uint32).reshape(len(strings), 10)
+        digits = np.delete(chars, (4, 7), axis=1)
+        exact = (chars[:, 4] == ord('-')) & (chars[:, 7] == ord('-')) & ((digits >= ord('0')) &
+                                                                         (digits <= ord('9'))).all(axis=1)
+        try:
+            return np.where(exact, strings, 'NaT').astype('datetime64[D]')
+        except ValueError:
+            pass  # a day that doesn't exist, e.g. 2027-02-30
+    return np.array([_parse_date(value) for value in dates], dtype='datetime64[D]')
@@ -0,0 +1,158 @@
+# ratelimit.py - Token buckets shared by every worker process on a host
+
+# Buckets live in a memory-mapped file: a fixed-size open-addressing table
+# of (key hash, tokens, last update) slots. Any process that maps the same
+# file sees the same buckets, so a limit holds however many workers the
+# requests are spread over. A lookup probes at most PROBES slots under a
+# short lock and never allocates, so every check costs the same; when all
+# probed slots are taken, the one idle the longest is reused (an idle bucket
+# has refilled anyway). Losing the file only resets the limits.
+
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+MAGIC = b'RLTB0001'
+HEADER = struct.Struct('<8sQ')  # magic, slot count
+SLOT = struct.Struct('<Qdd')  # key hash (0 = empty), tokens, last update (unix time)
+PROBES = 8
+
+PERIODS = {'s': 1, 'sec': 1, 'second': 1, 'm': 60, 'min': 60, 'minute': 60,
+           'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+_RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+?)s?\s*$')
+
+
+class Rate:
+    """A limit of `count` requests per `period` seconds; bursts of up to count are allowed"""
+
+    __slots__ = ('count', 'period')
+
+    def __init__(self, count, period):
+        self.count = count
+        self.period = period
+
+    @property
+    def per_second(self):
+        return self.count / self.period
+
+    def __repr__(self):
+        return f'Rate({self.count}/{self.period}s)'
+
+
+def parse_rate(value):
+    """'10/minute', '5/10min', '100/hour' -> Rate; 'off' or '' -> None"""
+    if value is None or value.strip().lower() in ('', 'off', 'none'):
+        return None
+    match = _RATE_RE.match(value.lower())
+    if not match or match.group(3) not in PERIODS or int(match.group(1)) < 1:
+        raise ValueError(f"invalid rate {value!r}; use e.g. 10/minute, 5/10min or off")
+    count, multiplier, unit = match.groups()
+    return Rate(int(count), int(multiplier or 1) * PERIODS[unit])
+
+
+def parse_limits(overrides, defaults):
+    """Limits by name from defaults ({name: rate string}) and 'name=rate,...' overrides"""
+    limits = dict(defaults)
+    for entry in filter(None, (part.strip() for part in overrides.split(','))):
+        name, sep, rate = entry.partition('=')
+        if not sep:
+            raise ValueError(f"invalid RATE_LIMITS entry {entry!r}; use name=rate")
+        limits[name.strip()] = rate
+    return {name: parse_rate(rate) for name, rate in limits.items()}
+
+
+def _key_hash(key):
+    # Never 0, which marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') | 1
+
+
+class TokenBuckets:
+    """The shared bucket table in a file; safe to use from threads and forked processes"""
+
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = self._map = None
+
+    def _open(self):
+        # POSIX record locks belong to a process, so each process (e.g. after
+        # a fork) opens its own descriptor; threads share it under _lock
+        if self._pid == os.getpid():
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        size = HEADER.size + self.slots * SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, HEADER.size, 0)
+            if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, self.slots):
+                # New file, or made for another table size: start empty
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, HEADER.pack(MAGIC, self.slots), 0)
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._file = fd
+        self._pid = os.getpid()
+
+    def take(self, key, rate, cost=1.0, now=None):
+        """Take cost tokens from key's bucket; returns seconds to wait, 0.0 if allowed"""
+        now = time.time() if now is None else now
+        key_hash = _key_hash(key)
+        start = key_hash % self.slots
+        with self._lock:
+            self._open()
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+            try:
+                offset, tokens = self._find(key_hash, start, rate, now)
+                if tokens >= cost:
+                    SLOT.pack_into(self._map, offset, key_hash, tokens - cost, now)
+                    return 0.0
+                SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+                return (cost - tokens) / rate.per_second
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+    def _find(self, key_hash, start, rate, now):
+        """(offset, current tokens) of the key's slot, claiming one if it has none"""
+        mapped = self._map
+        victim = victim_updated = None
+        for probe in range(PROBES):
+            offset = HEADER.size + ((start + probe) % self.slots) * SLOT.size
+            slot_hash, tokens, updated = SLOT.unpack_from(mapped, offset)
+            if slot_hash == key_hash:
+                # A clock stepping back never adds tokens
+                return offset, min(rate.count, tokens + max(0.0, now - updated) * rate.per_second)
+            if slot_hash == 0:
+                return offset, float(rate.count)
+            if victim is None or updated < victim_updated:
+                victim, victim_updated = offset, updated
+        return victim, float(rate.count)
+
+    def reset(self):
+        """Empty every bucket"""
+        with self._lock:
+            self._open()
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+            try:
+                self._map[HEADER.size:] = bytes(self.slots * SLOT.size)
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+
+def retry_after_header(seconds):
+    """Retry-After value: whole seconds, rounded up, at least 1"""
+    return str(max(1, math.ceil(seconds)))
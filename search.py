@@ -0,0 +1,246 @@
+# search.py - Full-text search over treks and travel packages (SQLite FTS5)
+
+# Other databases have no FTS5 table: search() matches the catalog tables
+# directly with case-insensitive LIKE there (see _like_search).
+
+from collections import namedtuple
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import and_, case, literal, null, or_, select, text, union_all
+
+from models import TravelPackage, Trek
+
+SEARCH_TABLE = 'catalog_search'
+
+# Treks and packages share one index; the kind is folded into the rowid so a
+# row can be replaced or removed by primary key instead of scanning the index
+KIND_OFFSET = {'trek': 0, 'travel': 1}
+KIND_BY_OFFSET = {offset: kind for kind, offset in KIND_OFFSET.items()}
+
+# Relative bm25 weight of each indexed column (order matches the table)
+COLUMN_WEIGHTS = (
+    ('name', 10.0),
+    ('region', 4.0),
+    ('destination', 4.0),
+    ('description', 2.0),
+    ('itinerary', 1.0),
+    ('includes', 0.5),
+)
+
+# Control characters mark highlighted terms so the text can be HTML-escaped
+# before the markers are turned into <mark> tags
+_HL_START, _HL_END = '\x02', '\x03'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SearchResult = namedtuple('SearchResult', [
+    'kind', 'id', 'slug', 'name', 'snippet', 'image_url', 'price', 'duration', 'label', 'score'
+])
+
+
+def _rowid(kind, item_id):
+    return item_id * 2 + KIND_OFFSET[kind]
+
+
+def create_index(connection):
+    """Create the FTS5 table if it does not exist yet"""
+    columns = ', '.join(name for name, _ in COLUMN_WEIGHTS)
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"slug UNINDEXED, image_url UNINDEXED, price UNINDEXED, duration UNINDEXED, "
+        f"label UNINDEXED, {columns}, "
+        f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    ))
+
+
+def _document(kind, item):
+    """Map a Trek or TravelPackage to the indexed column values"""
+    if kind == 'trek':
+        region, destination, label = item.region, None, item.difficulty
+    else:
+        region, destination, label = None, item.destination, item.package_type
+    return {
+        'slug': item.slug,
+        'image_url': item.image_url,
+        'price': item.price,
+        'duration': item.duration,
+        'label': label,
+        'name': item.name,
+        'region': region,
+        'destination': destination,
+        'description': item.description,
+        'itinerary': item.itinerary,
+        'includes': item.includes,
+    }
+
+
+def index_document(connection, kind, item):
+    """Insert or replace a single trek/package in the index"""
+    remove_document(connection, kind, item.id)
+    doc = _document(kind, item)
+    columns = ', '.join(doc)
+    params = ', '.join(':' + key for key in doc)
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES (:rowid, {params})"),
+                       dict(doc, rowid=_rowid(kind, item.id)))
+
+
+def index_documents(connection, kind, items):
+    """Insert or replace a batch of treks/packages (e.g. from a bulk import)"""
+    docs = [dict(_document(kind, item), rowid=_rowid(kind, item.id)) for item in items]
+    if not docs:
+        return
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+                       [{'rowid': doc['rowid']} for doc in docs])
+    columns = ', '.join(docs[0])
+    params = ', '.join(':' + key for key in docs[0])
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE} ({columns}) VALUES ({params})"), docs)
+
+
+def remove_document(connection, kind, item_id):
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+                       {'rowid': _rowid(kind, item_id)})
+
+
+def rebuild_index(connection, items):
+    """Drop and repopulate the index from (kind, item) pairs"""
+    connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    create_index(connection)
+    count = 0
+    for kind, item in items:
+        index_document(connection, kind, item)
+        count += 1
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"))
+    return count
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 query where every word is a prefix term.
+
+    Words are quoted so FTS5 operators typed by the user (AND, NEAR, *, ^)
+    are treated as plain text.
+    """
+    tokens = _TOKEN_RE.findall(query or '')
+    return ' AND '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def highlight_markup(value):
+    """Escape indexed text and wrap matched terms in <mark>"""
+    if not value:
+        return Markup('')
+    escaped = str(escape(value))
+    return Markup(escaped.replace(_HL_START, '<mark>').replace(_HL_END, '</mark>'))
+
+
+def search(connection, query, kind=None, limit=20, offset=0):
+    """Return (results, has_more) ranked best match first"""
+    match = build_match_query(query)
+    if not match:
+        return [], False
+    if connection.dialect.name != 'sqlite':
+        return _like_search(connection, _TOKEN_RE.findall(query), kind, limit, offset)
+
+    weights = ', '.join(str(weight) for _, weight in COLUMN_WEIGHTS)
+    name_col = 5  # position of "name" among all table columns
+    sql = (
+        f"SELECT rowid, slug, image_url, price, duration, label, "
+        f"highlight({SEARCH_TABLE}, {name_col}, :hl_start, :hl_end) AS name, "
+        f"snippet({SEARCH_TABLE}, -1, :hl_start, :hl_end, '...', 16) AS snippet, "
+        f"bm25({SEARCH_TABLE}, 0, 0, 0, 0, 0, {weights}) AS score "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"
+    )
+    params = {'match': match, 'hl_start': _HL_START, 'hl_end': _HL_END,
+              'limit': limit + 1, 'offset': offset}
+    if kind in KIND_OFFSET:
+        sql += " AND rowid % 2 = :kind_offset"
+        params['kind_offset'] = KIND_OFFSET[kind]
+    sql += " ORDER BY score LIMIT :limit OFFSET :offset"
+
+    rows = connection.execute(text(sql), params).fetchall()
+    results = [
+        SearchResult(
+            kind=KIND_BY_OFFSET[row.rowid % 2],
+            id=row.rowid // 2,
+            slug=row.slug,
+            name=highlight_markup(row.name),
+            snippet=highlight_markup(row.snippet),
+            image_url=row.image_url,
+            price=row.price,
+            duration=row.duration,
+            label=row.label,
+            score=round(-row.score, 4),
+        )
+        for row in rows[:limit]
+    ]
+    return results, len(rows) > limit
+
+
+# LIKE search
+# Every word must occur in one of the indexed columns, and a row scores the
+# column weight for each word found in that column. Highlights and snippets
+# are made in Python from the page's rows, marking words that start with a
+# search word as FTS5 does.
+SNIPPET_WORDS = 16
+_SNIPPET_COLUMNS = ('description', 'itinerary', 'includes', 'region', 'destination')
+
+
+def _like_select(kind, tokens):
+    table = (Trek if kind == 'trek' else TravelPackage).__table__
+    columns = {name: table.c.get(name) for name, _ in COLUMN_WEIGHTS}
+    found = {(name, token): column.icontains(token, autoescape=True)
+             for name, column in columns.items() if column is not None for token in tokens}
+    score = sum(case((found[name, token], weight), else_=0.0)
+                for name, weight in COLUMN_WEIGHTS if columns[name] is not None for token in tokens)
+    every_word = and_(*(or_(*(found[name, token] for name in columns if columns[name] is not None))
+                        for token in tokens))
+    label = table.c.difficulty if kind == 'trek' else table.c.package_type
+    return select(literal(kind).label('kind'), table.c.id, table.c.slug, table.c.image_url, table.c.price,
+                  table.c.duration, label.label('label'), table.c.name,
+                  *((columns[name] if columns[name] is not None else null()).label(name)
+                    for name in _SNIPPET_COLUMNS),
+                  score.label('score')).where(every_word)
+
+
+def _like_snippet(row, words):
+    """Up to SNIPPET_WORDS words of the first text column with a match, around the first one"""
+    for name in _SNIPPET_COLUMNS:
+        value = getattr(row, name) or ''
+        match = words.search(value)
+        if match:
+            break
+    else:
+        value, match = row.description or '', None
+    tokens = value.split()
+    first = len(value[:match.start()].split()) if match else 0
+    start = max(0, min(first - SNIPPET_WORDS // 4, len(tokens) - SNIPPET_WORDS))
+    snippet = ' '.join(tokens[start:start + SNIPPET_WORDS])
+    return ('...' if start else '') + snippet + ('...' if start + SNIPPET_WORDS < len(tokens) else '')
+
+
+def _like_search(connection, tokens, kind, limit, offset):
+    """search() without the FTS5 table: LIKE over the treks and travel_packages rows"""
+    kinds = [kind] if kind in KIND_OFFSET else list(KIND_OFFSET)
+    matches = union_all(*(_like_select(each_kind, tokens) for each_kind in kinds)).subquery()
+    sql = (select(matches).order_by(matches.c.score.desc(), matches.c.name, matches.c.kind, matches.c.id)
+           .limit(limit + 1).offset(offset))
+    words = re.compile(r'\b(?:{})\w*'.format('|'.join(map(re.escape, tokens))), re.IGNORECASE)
+
+    def mark(value):
+        return words.sub(lambda match: _HL_START + match.group(0) + _HL_END, value)
+
+    rows = connection.execute(sql).fetchall()
+    results = [
+        SearchResult(
+            kind=row.kind,
+            id=row.id,
+            slug=row.slug,
+            name=highlight_markup(mark(row.name)),
+            snippet=highlight_markup(mark(_like_snippet(row, words))),
+            image_url=row.image_url,
+            price=row.price,
+            duration=row.duration,
+            label=row.label,
+            score=float(row.score),
+        )
+        for row in rows[:limit]
+    ]
+    return results, len(rows) > limit
@@ -0,0 +1,172 @@
+# similar.py - Feature vectors and batched top-k neighbours for "similar treks / packages"
+
+# Each trek or package becomes a unit-length vector built only from its own
+# fields: categories are hashed into fixed buckets, numbers are spread over
+# fixed bins (so a 12-day trek is close to an 11-day one) and trek text is
+# a hashed bag of words. Nothing depends on the rest of the catalog, so a
+# changed item gets a new vector without touching the others, and cosine
+# similarity is a plain dot product. Neighbours are found for blocks of
+# items at once with one matrix product per block; the app stores them and
+# detail pages only read the stored lists.
+
+import math
+import re
+import zlib
+
+import numpy as np
+
+TEXT_BUCKETS = 256
+CATEGORY_BUCKETS = 32
+
+# log-spaced so the bins are as wide, relatively, at 3 days as at 20
+DURATION_BINS = np.log(np.array([2, 3, 4, 6, 8, 10, 13, 16, 20, 25, 30], dtype=np.float64))
+PRICE_BINS = np.log(np.geomspace(100, 10000, 15))
+ALTITUDE_BINS = np.arange(1500.0, 7001.0, 500.0)
+DIFFICULTY_LEVELS = {'easy': 0, 'moderate': 1, 'difficult': 2, 'strenuous': 3}
+DIFFICULTY_BINS = np.arange(len(DIFFICULTY_LEVELS), dtype=np.float64)
+
+# Catalog columns a vector is built from; changes to other columns keep it
+FIELDS = {
+    'trek': ('region', 'difficulty', 'duration', 'max_altitude', 'price', 'description', 'itinerary'),
+    'travel': ('destination', 'package_type', 'duration', 'price'),
+}
+
+# Share of the similarity each field contributes when both items have it
+TREK_WEIGHTS = {'region': 0.30, 'difficulty': 0.15, 'duration': 0.15, 'altitude': 0.10,
+                'price': 0.15, 'text': 0.15}
+PACKAGE_WEIGHTS = {'destination': 0.40, 'type': 0.20, 'duration': 0.20, 'price': 0.20}
+
+_WORD_RE = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+STOP_WORDS = frozenset('the and with for from day days trek tour through past into via explore '
+                       'our your you are this that all'.split())
+
+
+def _bucket(value, size):
+    # crc32 rather than hash(): vectors must match across processes and restarts
+    return zlib.crc32(value.encode('utf-8')) % size
+
+
+def _category(value, size=CATEGORY_BUCKETS):
+    block = np.zeros(size)
+    if value:
+        block[_bucket(value.strip().lower(), size)] = 1.0
+    return block
+
+
+def _soft_bins(value, centers):
+    """Gaussian weights of value over bin centres, one bin wide"""
+    if value is None:
+        return np.zeros(len(centers))
+    width = centers[1] - centers[0]
+    return np.exp(-0.5 * ((value - centers) / width) ** 2)
+
+
+def _words(*texts, size=TEXT_BUCKETS):
+    """Hashed bag of words with sublinear counts; signs from a second hash limit collision bias"""
+    counts = {}
+    for text in texts:
+        for word in _WORD_RE.findall((text or '').lower()):
+            if word not in STOP_WORDS:
+                counts[word] = counts.get(word, 0) + 1
+    block = np.zeros(size)
+    for word, count in counts.items():
+        sign = 1.0 if zlib.adler32(word.encode('utf-8')) & 1 else -1.0
+        block[_bucket(word, size)] += sign * (1.0 + math.log(count))
+    return block
+
+
+def _combine(blocks, weights):
+    parts = []
+    for name, block in blocks.items():
+        norm = np.linalg.norm(block)
+        parts.append(block * (math.sqrt(weights[name]) / norm) if norm else block)
+    vector = np.concatenate(parts)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).astype(np.float32)
+
+
+def trek_vector(region, difficulty, duration, max_altitude, price, description, itinerary):
+    level = DIFFICULTY_LEVELS.get((difficulty or '').strip().lower())
+    return _combine({
+        'region': _category(region),
+        'difficulty': _soft_bins(level, DIFFICULTY_BINS),
+        'duration': _soft_bins(math.log(duration) if duration else None, DURATION_BINS),
+        'altitude': _soft_bins(max_altitude, ALTITUDE_BINS),
+        'price': _soft_bins(math.log(price) if price else None, PRICE_BINS),
+        'text': _words(description, itinerary),
+    }, TREK_WEIGHTS)
+
+
+def package_vector(destination, package_type, duration, price):
+    return _combine({
+        'destination': _category(destination),
+        'type': _category(package_type),
+        'duration': _soft_bins(math.log(duration) if duration else None, DURATION_BINS),
+        'price': _soft_bins(math.log(price) if price else None, PRICE_BINS),
+    }, PACKAGE_WEIGHTS)
+
+
+def item_vector(kind, item):
+    """Vector for a Trek/TravelPackage or any row with the same attribute names"""
+    if kind == 'trek':
+        return trek_vector(item.region, item.difficulty, item.duration, item.max_altitude, item.price,
+                           item.description, item.itinerary)
+    return package_vector(item.destination, item.package_type, item.duration, item.price)
+
+
+def to_blob(vector):
+    return np.asarray(vector, dtype='<f4').tobytes()
+
+
+def from_blobs(blobs):
+    """Stack stored vectors into an (n, dimensions) float32 matrix"""
+    blobs = list(blobs)
+    if not blobs:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.frombuffer(b''.join(blobs), dtype='<f4').reshape(len(blobs), -1)
+
+
+def top_k(vectors, k, rows=None, block_size=1024):
+    """The k most similar vectors to each of vectors[rows] (all rows by default), itself excluded.
+
+    Returns (indexes, scores), both shaped (len(rows), k) and best first.
+    Similarities are computed block_size rows at a time, so memory stays at
+    block_size * len(vectors) scores however large the catalog is.
+    """
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows, dtype=np.int64)
+    k = max(0, min(k, len(vectors) - 1))
+    indexes = np.empty((len(rows), k), dtype=np.int64)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+    if not k:
+        return indexes, scores
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        similarity = vectors[block] @ vectors.T
+        similarity[np.arange(len(block)), block] = -np.inf
+        best = np.argpartition(similarity, -k, axis=1)[:, -k:]
+        best_scores = np.take_along_axis(similarity, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        indexes[start:start + len(block)] = np.take_along_axis(best, order, axis=1)
+        scores[start:start + len(block)] = np.take_along_axis(best_scores, order, axis=1)
+    return indexes, scores
+
+
+def rows_to_refresh(vectors, changed, thresholds, listing, block_size=1024):
+    """Rows whose top-k can differ after the vectors of the changed rows were replaced.
+
+    Those are the changed rows, the rows listing one of them (listing, looked
+    up by the caller) and the rows a changed vector now beats the last
+    neighbour of; thresholds holds each row's last stored score, or None
+    for rows whose list is shorter than k. Returns sorted row indexes.
+    """
+    changed = np.asarray(changed, dtype=np.int64)
+    thresholds = np.array([-np.inf if value is None else value for value in thresholds])
+    refresh = np.zeros(len(vectors), dtype=bool)
+    refresh[changed] = True
+    refresh[np.asarray(listing, dtype=np.int64)] = True
+    for start in range(0, len(changed), block_size):
+        block = changed[start:start + block_size]
+        similarity = vectors[block] @ vectors.T
+        similarity[np.arange(len(block)), block] = -np.inf
+        refresh |= (similarity > thresholds).any(axis=0)
+    return np.flatnonzero(refresh)
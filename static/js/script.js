@@ -70,8 +70,11 @@ document.addEventListener('DOMContentLoaded', function() {
         const trekDate = document.getElementById('trek_date');
         
         // Calculate total price
-        if (peopleInput) {
-            peopleInput.addEventListener('input', updateTotalPrice);
+        if (peopleInput && trekDate) {
+            const update = () => updateQuote(bookingForm, trekDate, peopleInput,
+                                             null, document.getElementById('totalDisplay'));
+            peopleInput.addEventListener('input', update);
+            trekDate.addEventListener('change', update);
         }
         
         // Validate date (cannot be in past)
@@ -94,15 +97,38 @@ document.addEventListener('DOMContentLoaded', function() {
         return re.test(email);
     }
     
-    // Update total price in booking form
-    function updateTotalPrice() {
-        const people = parseInt(document.getElementById('number_of_people').value) || 1;
-        const pricePerPerson = parseFloat(document.querySelector('.display-6')?.textContent.replace('$', '')) || 0;
-        const totalDisplay = document.getElementById('totalDisplay');
+    // Update the total in a booking form from the server's quote (/api/quote),
+    // so the page shows the seasonal, early-bird and group rates the booking
+    // will be charged. The form names the item with data-quote-url,
+    // data-quote-kind and data-quote-item.
+    function updateQuote(form, dateInput, peopleInput, totalDisplay, totalSummary) {
+        const people = parseInt(peopleInput.value) || 1;
+        function show(amount) {
+            if (totalDisplay) totalDisplay.textContent = amount;
+            if (totalSummary) {
+                totalSummary.innerHTML = `<span>Total (${people} person${people > 1 ? 's' : ''}):</span> <strong>${amount}</strong>`;
+            }
+        }
         
-        if (totalDisplay) {
-            totalDisplay.innerHTML = `<span>Total (${people} person${people > 1 ? 's' : ''}):</span> <strong>$${people * pricePerPerson}</strong>`;
+        if (!dateInput.value) {
+            show('Choose a date');
+            return;
         }
+        // Only the answer for the latest date and party size is shown
+        if (form.quoteRequest) form.quoteRequest.abort();
+        form.quoteRequest = new AbortController();
+        const params = new URLSearchParams({
+            kind: form.dataset.quoteKind,
+            item_id: form.dataset.quoteItem,
+            date: dateInput.value,
+            number_of_people: people
+        });
+        fetch(`${form.dataset.quoteUrl}?${params}`, {signal: form.quoteRequest.signal})
+            .then(response => response.json())
+            .then(body => show(body.data ? `$${body.data.total_price.toFixed(2)}` : body.error))
+            .catch(error => {
+                if (error.name !== 'AbortError') show('Price unavailable');
+            });
     }
     
     // Add smooth scrolling to all links
@@ -119,6 +145,22 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
+    // Listing filters leave empty fields and the default sort out of the URL,
+    // so the same filters always give the same URL (and its frozen page)
+    document.querySelectorAll('form[data-compact-query]').forEach(form => {
+        form.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const params = new URLSearchParams();
+            new FormData(form).forEach((value, name) => {
+                if (value && !(name === 'sort' && value === 'default')) {
+                    params.append(name, value);
+                }
+            });
+            const query = params.toString();
+            window.location.href = form.getAttribute('action') + (query ? '?' + query : '');
+        });
+    });
+
     // Add to favorites functionality (if needed)
     const favButtons = document.querySelectorAll('.favorite-btn');
     favButtons.forEach(btn => {
@@ -135,24 +177,6 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
-    // Search functionality (basic)
-    const searchInput = document.getElementById('searchInput');
-    if (searchInput) {
-        searchInput.addEventListener('keyup', function() {
-            const searchTerm = this.value.toLowerCase();
-            const cards = document.querySelectorAll('.card');
-            
-            cards.forEach(card => {
-                const title = card.querySelector('.card-title')?.textContent.toLowerCase() || '';
-                if (title.includes(searchTerm)) {
-                    card.style.display = 'block';
-                } else {
-                    card.style.display = 'none';
-                }
-            });
-        });
-    }
-    
     // Password strength indicator
     const passwordInput = document.getElementById('password');
     if (passwordInput) {
@@ -221,29 +245,23 @@ document.addEventListener('DOMContentLoaded', function() {
         
         const travelPeopleInput = document.getElementById('travel_people');
         const travelTotalDisplay = document.getElementById('travelTotal');
-        const travelPriceInput = document.getElementById('travel_price');
         const travelDateInput = document.getElementById('travel_date');
         const travelForm = document.getElementById('travelBookingForm');
         
-        // Get price from hidden input
-        let travelPricePerPerson = 0;
-        if (travelPriceInput) {
-            travelPricePerPerson = parseFloat(travelPriceInput.value);
-        }
-        
         // Function to update total price
         function updateTravelTotal() {
-            if (travelPeopleInput && travelTotalDisplay) {
-                const people = parseInt(travelPeopleInput.value) || 1;
-                const total = people * travelPricePerPerson;
-                travelTotalDisplay.textContent = total;
+            if (travelPeopleInput && travelDateInput) {
+                updateQuote(travelForm, travelDateInput, travelPeopleInput, travelTotalDisplay, null);
             }
         }
         
-        // Update total when number of people changes
+        // Update total when the date or number of people changes
         if (travelPeopleInput) {
             travelPeopleInput.addEventListener('input', updateTravelTotal);
         }
+        if (travelDateInput) {
+            travelDateInput.addEventListener('change', updateTravelTotal);
+        }
         
         // Set minimum date to today
         if (travelDateInput) {
@@ -293,16 +311,9 @@ document.addEventListener('DOMContentLoaded', function() {
         const trekPeopleInput = document.getElementById('trek_people');
         const trekTotalDisplay = document.getElementById('trekTotal');
         const trekTotalSummary = document.getElementById('trekTotalDisplay');
-        const trekPriceInput = document.getElementById('trek_price');
         const termsCheckbox = document.getElementById('terms');
         const trekBookingForm = document.getElementById('trekBookingForm');
         
-        // Get price from hidden input
-        let trekPricePerPerson = 0;
-        if (trekPriceInput) {
-            trekPricePerPerson = parseFloat(trekPriceInput.value);
-        }
-        
         // Function 1: Set minimum date to today
         function setTrekMinDate() {
             if (trekDateInput) {
@@ -317,11 +328,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Function 2: Calculate and update total price
         function updateTrekTotal() {
-            if (trekPeopleInput && trekTotalDisplay && trekTotalSummary) {
-                const people = parseInt(trekPeopleInput.value) || 1;
-                const total = people * trekPricePerPerson;
-                trekTotalDisplay.textContent = total;
-                trekTotalSummary.innerHTML = '<span>Total (' + people + ' person' + (people > 1 ? 's' : '') + '):</span> <strong>$' + total + '</strong>';
+            if (trekPeopleInput && trekDateInput) {
+                updateQuote(trekBookingForm, trekDateInput, trekPeopleInput, trekTotalDisplay, trekTotalSummary);
             }
         }
         
@@ -364,6 +372,7 @@ document.addEventListener('DOMContentLoaded', function() {
         // Attach all event listeners for trek booking
         setTrekMinDate();
         if (trekPeopleInput) trekPeopleInput.addEventListener('input', updateTrekTotal);
+        if (trekDateInput) trekDateInput.addEventListener('change', updateTrekTotal);
         if (trekBookingForm) {
             trekBookingForm.addEventListener('submit', validateTrekForm);
             trekBookingForm.addEventListener('submit', showTrekLoading);
@@ -380,16 +389,9 @@ document.addEventListener('DOMContentLoaded', function() {
         const travelPeopleInput = document.getElementById('travel_people');
         const travelTotalDisplay = document.getElementById('travelTotal');
         const travelTotalSummary = document.getElementById('travelTotalDisplay');
-        const travelPriceInput = document.getElementById('travel_price');
         const termsCheckbox = document.getElementById('terms');
         const travelBookingForm = document.getElementById('travelBookingForm');
         
-        // Get price from hidden input
-        let travelPricePerPerson = 0;
-        if (travelPriceInput) {
-            travelPricePerPerson = parseFloat(travelPriceInput.value);
-        }
-        
         // Function 1: Set minimum date to today
         function setTravelMinDate() {
             if (travelDateInput) {
@@ -404,11 +406,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Function 2: Calculate and update total price
         function updateTravelTotal() {
-            if (travelPeopleInput && travelTotalDisplay && travelTotalSummary) {
-                const people = parseInt(travelPeopleInput.value) || 1;
-                const total = people * travelPricePerPerson;
-                travelTotalDisplay.textContent = total;
-                travelTotalSummary.innerHTML = '<span>Total (' + people + ' person' + (people > 1 ? 's' : '') + '):</span> <strong>$' + total + '</strong>';
+            if (travelPeopleInput && travelDateInput) {
+                updateQuote(travelBookingForm, travelDateInput, travelPeopleInput, travelTotalDisplay, travelTotalSummary);
             }
         }
         
@@ -451,6 +450,7 @@ document.addEventListener('DOMContentLoaded', function() {
         // Attach all event listeners for travel booking
         setTravelMinDate();
         if (travelPeopleInput) travelPeopleInput.addEventListener('input', updateTravelTotal);
+        if (travelDateInput) travelDateInput.addEventListener('change', updateTravelTotal);
         if (travelBookingForm) {
             travelBookingForm.addEventListener('submit', validateTravelForm);
             travelBookingForm.addEventListener('submit', showTravelLoading);
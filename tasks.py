@@ -0,0 +1,133 @@
+# tasks.py - Background jobs: emails, supplier notifications and invoices
+
+# Emails, supplier notifications and invoices are queued in the same
+# transaction as the booking or message that needs them and sent by
+# `flask jobs work`, so pages never wait on SMTP. Handlers look rows up again
+# when they run and must be safe to repeat: mail is keyed by a Message-ID
+# derived from the job's idempotency key.
+
+import hashlib
+import os
+
+from flask import current_app, render_template
+from sqlalchemy import event
+
+import jobs
+import mailer
+from extensions import app_object, db
+from models import ARCHIVED_BOOKING_MODELS, BOOKING_MODELS, DeadJob, Job, User
+
+# Handlers register in job_handlers as their modules load; init_app() gives
+# each app its own queue over them, with its JOB_* settings and running jobs
+# inside its context
+job_handlers = {}
+job_queue = app_object('job_queue')
+mail_transport = app_object('mail_transport')
+
+def job_handler(name=None):
+    """Register a handler(payload, job_info) under name (default: the function name)"""
+    def decorator(handler):
+        job_handlers[name or handler.__name__] = handler
+        return handler
+    return decorator
+
+NEW_BOOKING_JOBS = ('booking_confirmation', 'booking_invoice', 'supplier_notification')
+CANCELLED_BOOKING_JOBS = ('booking_cancelled', 'supplier_notification')
+
+def send_mail(to, subject, template, job, reply_to=None, attachments=(), **context):
+    """Render a plain-text email template and hand it to the configured transport"""
+    message_id = '<{}@nepaltrekking.com>'.format(hashlib.sha1((job.key or str(job.id)).encode('utf-8')).hexdigest())
+    body = render_template(template, **context)
+    mail_transport.send(mailer.build_message(current_app.config['MAIL_FROM'], to, subject, body,
+                                             message_id=message_id, reply_to=reply_to, attachments=attachments))
+
+def _booking_context(payload):
+    """Template context for a booking job; a booking that is gone can't be retried"""
+    kind = payload['kind']
+    model, item_model, item_fk, date_field = BOOKING_MODELS[kind]
+    # A cancelled booking can be archived before its emails go out
+    booking = (db.session.get(model, payload['booking_id'])
+               or db.session.get(ARCHIVED_BOOKING_MODELS[kind], payload['booking_id']))
+    if booking is None:
+        raise jobs.PermanentError(f"{kind} booking {payload['booking_id']} no longer exists")
+    return {
+        'kind': kind,
+        'booking': booking,
+        'item': db.session.get(item_model, getattr(booking, item_fk)),
+        'customer': db.session.get(User, booking.user_id),
+        'departure_date': getattr(booking, date_field),
+        'reference': f"{'TRK' if kind == 'trek' else 'TRV'}-{booking.id:06d}",
+    }
+
+def render_invoice(context):
+    return render_template('email/invoice.txt', **context)
+
+@job_handler()
+def contact_message(payload, job):
+    send_mail(current_app.config['STAFF_EMAIL'], f"Contact form: {payload.get('subject') or payload['email']}",
+              'email/contact_message.txt', job, reply_to=payload['email'], contact=payload)
+
+@job_handler()
+def booking_confirmation(payload, job):
+    context = _booking_context(payload)
+    send_mail(context['customer'].email, f"Booking received: {context['item'].name} ({context['reference']})",
+              'email/booking_confirmation.txt', job,
+              attachments=[(f"invoice-{context['reference']}.txt", render_invoice(context).encode('utf-8'),
+                            'text/plain')],
+              **context)
+
+@job_handler()
+def booking_invoice(payload, job):
+    """Write the invoice to INVOICE_DIR for accounts (the customer's copy goes with the confirmation)"""
+    context = _booking_context(payload)
+    os.makedirs(current_app.config['INVOICE_DIR'], exist_ok=True)
+    path = os.path.join(current_app.config['INVOICE_DIR'], f"invoice-{context['reference']}.txt")
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(render_invoice(context))
+    os.replace(path + '.tmp', path)
+
+@job_handler()
+def supplier_notification(payload, job):
+    context = _booking_context(payload)
+    cancelled = payload.get('event') == 'cancelled'
+    send_mail(current_app.config['SUPPLIER_EMAIL'],
+              f"{'Cancelled' if cancelled else 'New'} booking {context['reference']}: "
+              f"{context['item'].name} on {context['departure_date']:%Y-%m-%d}",
+              'email/supplier_notification.txt', job, cancelled=cancelled, **context)
+
+@job_handler()
+def booking_cancelled(payload, job):
+    context = _booking_context(payload)
+    send_mail(context['customer'].email, f"Booking cancelled: {context['item'].name} ({context['reference']})",
+              'email/booking_cancelled.txt', job, **context)
+
+def _queue_booking_jobs(kind):
+    """Mapper listeners queueing the jobs for a new or newly cancelled booking in its flush"""
+    def after_insert(mapper, connection, target):
+        payload = {'kind': kind, 'booking_id': target.id}
+        job_queue.enqueue_many(connection, [(name, payload, f'{name}:{kind}:{target.id}')
+                                            for name in NEW_BOOKING_JOBS])
+    
+    def after_update(mapper, connection, target):
+        added = db.inspect(target).attrs.status.history.added
+        if added and added[0] == 'cancelled':
+            queue_cancellation_jobs(connection, kind, target.id)
+    return after_insert, after_update
+
+def queue_cancellation_jobs(connection, kind, booking_id):
+    """Queue the jobs for a booking just cancelled, in the caller's transaction"""
+    payload = {'kind': kind, 'booking_id': booking_id, 'event': 'cancelled'}
+    job_queue.enqueue_many(connection, [(name, payload, f'{name}:cancelled:{kind}:{booking_id}')
+                                        for name in CANCELLED_BOOKING_JOBS])
+
+for _kind, (_model, *_) in BOOKING_MODELS.items():
+    _after_insert, _after_update = _queue_booking_jobs(_kind)
+    event.listen(_model, 'after_insert', _after_insert)
+    event.listen(_model, 'after_update', _after_update)
+
+def init_app(app):
+    app.extensions['job_queue'] = jobs.JobQueue(
+        Job.__table__, DeadJob.__table__, max_attempts=app.config['JOB_MAX_ATTEMPTS'],
+        retry_base=app.config['JOB_RETRY_BASE'], retry_cap=app.config['JOB_RETRY_CAP'],
+        lease=app.config['JOB_LEASE'], context=app.app_context, handlers=job_handlers)
+    app.extensions['mail_transport'] = mailer.transport_from_url(app.config['MAIL_URL'])
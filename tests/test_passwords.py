@@ -0,0 +1,68 @@
+"""PasswordHasher turns work it cannot take or finish in time into HasherBusy"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import HasherBusy, PasswordHasher  # noqa: E402
+
+FAST = 'pbkdf2:sha256:1000'
+
+
+@pytest.fixture
+def release():
+    """Set at teardown to free whatever the test left blocking a worker"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_queued_hash_times_out_as_busy(release):
+    hasher = PasswordHasher(method=FAST, workers=1, max_queue=1, timeout=0.2)
+    hasher._executor.submit(release.wait)
+    with pytest.raises(HasherBusy, match='longer than'):
+        hasher.hash('secret')
+    assert hasher.rejected == 1
+
+    # The timed-out hash never runs and the pool works again once the worker is free
+    release.set()
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+    hasher.shutdown()
+
+
+def test_saturated_pool_rejects_at_once(release):
+    hasher = PasswordHasher(method=FAST, workers=1, max_queue=0, timeout=5)
+    blocker = threading.Thread(target=hasher._run, args=(release.wait,))
+    blocker.start()
+    while hasher._slots._value:
+        threading.Event().wait(0.01)
+    with pytest.raises(HasherBusy, match='saturated'):
+        hasher.hash('secret')
+    release.set()
+    blocker.join()
+    hasher.shutdown()
+
+
+def test_register_gets_503_when_hashing_times_out(tmp_path, release):
+    from app import create_app
+    from extensions import db
+
+    app = create_app({'TESTING': True, 'WTF_CSRF_ENABLED': False, 'RATE_LIMIT_ENABLED': False,
+                      'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/test.db',
+                      'PASSWORD_HASH_METHOD': FAST, 'PASSWORD_HASH_WORKERS': 1, 'PASSWORD_HASH_QUEUE': 1,
+                      'PASSWORD_HASH_TIMEOUT': 0.2})
+    with app.app_context():
+        db.create_all()
+    hasher = app.extensions['password_hasher']
+    hasher._executor.submit(release.wait)
+    response = app.test_client().post('/register', data={
+        'username': 'walker', 'email': 'walker@example.com', 'password': 'correct horse',
+        'full_name': 'Walker', 'phone': ''})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+    release.set()
+    hasher.shutdown()
@@ -0,0 +1,656 @@
+# views.py - The site's pages and its JSON API
+
+# All routes live on the 'main' blueprint, which create_app() registers, so
+# url_for() and templates name them 'main.<view>'.
+
+from datetime import datetime
+from functools import wraps
+import hashlib
+import io
+
+from flask import (Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request,
+                   url_for)
+from flask_login import current_user, login_required, login_user, logout_user
+
+import api
+import catalog_io
+import search as catalog_search
+from bookings import (BOOKING_STATUSES, REPORT_FIELDS, REPORT_GROUPS, SeatsUnavailable, TimelineEntry, booking_report,
+                      booking_timeline, cancel_reservation, create_booking, parse_report_args)
+from catalog import (INT64_MAX, INT64_MIN, LISTING_PAGE_SIZE, PACKAGE_SORTS, SEARCH_PAGE_SIZE, SORT_LABELS, TREK_SORTS,
+                     PackageSnapshot, TrekSnapshot, get_featured_treks, get_package_by_slug, get_similar_packages,
+                     get_quote_tables, get_similar_treks, get_trek_by_slug, list_packages, list_treks,
+                     package_facets, parse_package_filters, parse_trek_filters, sync_catalog_version, trek_facets)
+from extensions import catalog_cache, db, page_cache, password_hasher, user_cache
+from instrumentation import metrics_registry
+from models import Booking, TravelBooking, TravelPackage, Trek, User
+from passwords import HasherBusy
+from pricing import QuoteError
+from tasks import job_queue
+from web import (CachedPage, api_error, api_response, cached_page, catalog_last_modified, internal_only, rate_limit,
+                 stream_page, template_mtime)
+
+bp = Blueprint('main', __name__)
+
+@bp.before_request
+def _sync_catalog():
+    """Drop cached catalog data another worker's write has made stale"""
+    sync_catalog_version()
+
+# Routes
+@bp.route('/')
+@cached_page(last_modified=lambda: max(
+    [catalog_last_modified(trek) for trek in get_featured_treks(3)] + [template_mtime('base.html', 'index.html')]))
+def index():
+    """Home page route"""
+    # Get featured treks (3 most recent)
+    featured_treks = get_featured_treks(3)
+    return render_template('index.html', featured_treks=featured_treks)
+
+@bp.route('/about')
+@cached_page(last_modified=lambda: template_mtime('base.html', 'about.html'))
+def about():
+    """About page route"""
+    return render_template('about.html')
+
+@bp.route('/treks')
+def treks():
+    """All treks listing page"""
+    filters = parse_trek_filters(request.args)
+    cursor = request.args.get('after')
+    
+    # Filter treks based on query parameters
+    return stream_page('treks.html', load_treks=lambda: list_treks(filters, cursor=cursor),
+                       load_facets=lambda: trek_facets(filters), filters=filters,
+                       sorts=[(key, SORT_LABELS[key]) for key in TREK_SORTS])
+
+@bp.route('/trek/<slug>')
+@cached_page(last_modified=lambda slug: catalog_last_modified(get_trek_by_slug(slug)))
+def trek_detail(slug):
+    """Individual trek detail page"""
+    trek = get_trek_by_slug(slug)
+    if trek is None:
+        abort(404)
+    return render_template('trek_detail.html', trek=trek, similar_treks=get_similar_treks(trek.id))
+
+@bp.route('/register', methods=['GET', 'POST'])
+@rate_limit('register', 'ip')
+def register():
+    """User registration route"""
+    if request.method == 'POST':
+        username = request.form.get('username')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        full_name = request.form.get('full_name')
+        phone = request.form.get('phone')
+        
+        # Check if user already exists
+        user_exists = User.query.filter((User.username == username) | (User.email == email)).first()
+        
+        if user_exists:
+            flash('Username or email already exists', 'danger')
+            return redirect(url_for('main.register'))
+        
+        # Create new user
+        new_user = User(
+            username=username,
+            email=email,
+            full_name=full_name,
+            phone=phone
+        )
+        try:
+            new_user.set_password(password)
+        except HasherBusy:
+            flash('We are handling a lot of requests right now. Please try again in a moment.', 'warning')
+            return render_template('register.html'), 503, {'Retry-After': '5'}
+        
+        db.session.add(new_user)
+        db.session.commit()
+        
+        flash('Registration successful! Please login.', 'success')
+        return redirect(url_for('main.login'))
+    
+    return render_template('register.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+@rate_limit('login', 'ip', 'username')
+def login():
+    """User login route"""
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        user = User.query.filter_by(username=username).first()
+        
+        try:
+            password_ok = user is not None and user.check_password(password)
+        except HasherBusy:
+            flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '5'}
+        
+        if password_ok:
+            # Upgrade hashes made with an older method or cost while we have the password
+            if password_hasher.needs_rehash(user.password_hash):
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except HasherBusy:
+                    pass  # keep the old hash; it is upgraded on a later login
+            login_user(user)
+            flash('Login successful!', 'success')
+            return redirect(url_for('main.dashboard'))
+        else:
+            flash('Invalid username or password', 'danger')
+    
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    """User logout route"""
+    logout_user()
+    flash('You have been logged out', 'info')
+    return redirect(url_for('main.index'))
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    """User dashboard route"""
+    status = request.args.get('status')
+    cursor = request.args.get('before')
+    archived = request.args.get('archived') == '1'
+    
+    user_id = current_user.id
+    
+    # Trek and travel bookings merged into one timeline, newest date first;
+    # archived history only when asked for
+    return stream_page('dashboard.html',
+                       load_bookings=lambda: booking_timeline(user_id, status=status, cursor=cursor, archived=archived),
+                       status=status if status in BOOKING_STATUSES else None,
+                       statuses=BOOKING_STATUSES,
+                       archived=archived,
+                       show_bookings='status' in request.args or bool(cursor) or archived)
+
+@bp.route('/book/<int:trek_id>', methods=['GET', 'POST'])
+@login_required
+@rate_limit('booking', 'user', 'ip')
+def book_trek(trek_id):
+    """Trek booking route"""
+    trek = Trek.query.get_or_404(trek_id)
+    
+    if request.method == 'POST':
+        trek_date = _iso_date(request.form.get('trek_date'))
+        people = request.form.get('number_of_people', type=int)
+        special_requests = request.form.get('special_requests')
+        
+        if trek_date is None:
+            flash('Please choose a departure date.', 'danger')
+            return redirect(url_for('main.book_trek', trek_id=trek.id))
+        if people is None or people < 1:
+            flash('Number of people must be at least 1', 'danger')
+            return redirect(url_for('main.book_trek', trek_id=trek.id))
+        
+        try:
+            create_booking('trek', trek, trek_date, people, current_user.id, special_requests)
+        except SeatsUnavailable as exc:
+            flash(f'Sorry, only {exc.available} seats are left on {trek_date:%Y-%m-%d}. '
+                  'Please choose another date or fewer people.', 'danger')
+            return redirect(url_for('main.book_trek', trek_id=trek.id))
+        except QuoteError as exc:
+            flash(f'Sorry, we could not price that booking: {exc}.', 'danger')
+            return redirect(url_for('main.book_trek', trek_id=trek.id))
+        
+        flash('Booking successful! We will contact you soon.', 'success')
+        return redirect(url_for('main.dashboard'))
+    
+    return render_template('booking.html', trek=trek)
+
+@bp.route('/contact', methods=['GET', 'POST'])
+@rate_limit('contact', 'ip')
+def contact():
+    """Contact page route"""
+    if request.method == 'POST':
+        contact = {field: request.form.get(field, '').strip() for field in ('name', 'email', 'subject', 'message')}
+        
+        if not contact['email'] or not contact['message']:
+            flash('Please enter your email address and a message.', 'danger')
+            return render_template('contact.html')
+        
+        # Mailed to STAFF_EMAIL by a worker; a double-submitted form is queued once
+        digest = hashlib.sha1('\0'.join(contact.values()).encode('utf-8')).hexdigest()
+        job_queue.enqueue(db.session.connection(), 'contact_message', contact, key=f'contact_message:{digest}')
+        db.session.commit()
+        
+        flash('Thank you for your message. We will get back to you soon!', 'success')
+        return redirect(url_for('main.contact'))
+    
+    return render_template('contact.html')
+
+@bp.route('/cancel-booking/<int:booking_id>')
+@login_required
+def cancel_booking(booking_id):
+    """Cancel a booking"""
+    booking = Booking.query.get_or_404(booking_id)
+    
+    # Ensure user can only cancel their own bookings
+    if booking.user_id != current_user.id:
+        flash('Unauthorized action', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    cancel_reservation('trek', booking)
+    
+    flash('Booking cancelled successfully', 'success')
+    return redirect(url_for('main.dashboard'))
+
+# Travel Packages Routes
+@bp.route('/travel')
+def travel():
+    """All travel packages listing page"""
+    filters = parse_package_filters(request.args)
+    cursor = request.args.get('after')
+    
+    return stream_page('travel.html', load_packages=lambda: list_packages(filters, cursor=cursor),
+                       load_facets=lambda: package_facets(filters), filters=filters,
+                       sorts=[(key, SORT_LABELS[key]) for key in PACKAGE_SORTS])
+
+@bp.route('/travel/<slug>')
+@cached_page(last_modified=lambda slug: catalog_last_modified(get_package_by_slug(slug)))
+def travel_detail(slug):
+    """Individual travel package detail page"""
+    package = get_package_by_slug(slug)
+    if package is None:
+        abort(404)
+    return render_template('travel_detail.html', package=package, similar_packages=get_similar_packages(package.id))
+
+@bp.route('/book-travel/<int:package_id>', methods=['GET', 'POST'])
+@login_required
+@rate_limit('booking', 'user', 'ip')
+def book_travel(package_id):
+    """Travel package booking route"""
+    package = TravelPackage.query.get_or_404(package_id)
+    
+    if request.method == 'POST':
+        travel_date = _iso_date(request.form.get('travel_date'))
+        people = request.form.get('number_of_people', type=int)
+        
+        if travel_date is None:
+            flash('Please choose a departure date.', 'danger')
+            return redirect(url_for('main.book_travel', package_id=package.id))
+        if people is None or people < 1:
+            flash('Number of people must be at least 1', 'danger')
+            return redirect(url_for('main.book_travel', package_id=package.id))
+        
+        try:
+            create_booking('travel', package, travel_date, people, current_user.id)
+        except SeatsUnavailable as exc:
+            flash(f'Sorry, only {exc.available} seats are left on {travel_date:%Y-%m-%d}. '
+                  'Please choose another date or fewer people.', 'danger')
+            return redirect(url_for('main.book_travel', package_id=package.id))
+        except QuoteError as exc:
+            flash(f'Sorry, we could not price that booking: {exc}.', 'danger')
+            return redirect(url_for('main.book_travel', package_id=package.id))
+        
+        flash('Travel package booked successfully!', 'success')
+        return redirect(url_for('main.dashboard'))
+    
+    return render_template('book_travel.html', package=package)
+
+# Static Pages Routes
+@bp.route('/privacy')
+@cached_page(last_modified=lambda: template_mtime('base.html', 'privacy.html'))
+def privacy():
+    """Privacy Policy page"""
+    return render_template('privacy.html')
+
+@bp.route('/terms')
+@cached_page(last_modified=lambda: template_mtime('base.html', 'terms.html'))
+def terms():
+    """Terms and Conditions page"""
+    return render_template('terms.html')
+
+def _page_arg():
+    """?page= from 1; capped so the offset of even a 100-result page fits in 64 bits"""
+    return min(max(request.args.get('page', 1, type=int), 1), INT64_MAX // 100)
+
+@bp.route('/search')
+def search():
+    """Full-text search across treks and travel packages"""
+    q = request.args.get('q', '').strip()
+    kind = request.args.get('type')
+    page = _page_arg()
+    
+    results, has_more = catalog_search.search(db.session.connection(), q, kind=kind,
+                                              limit=SEARCH_PAGE_SIZE,
+                                              offset=(page - 1) * SEARCH_PAGE_SIZE)
+    return render_template('search.html', q=q, kind=kind, page=page,
+                           results=results, has_more=has_more)
+
+@bp.route('/api/search')
+def search_json():
+    """JSON variant of /search for client-side suggestions"""
+    q = request.args.get('q', '').strip()
+    kind = request.args.get('type')
+    page = _page_arg()
+    limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), 100)
+    
+    results, has_more = catalog_search.search(db.session.connection(), q, kind=kind,
+                                              limit=limit, offset=(page - 1) * limit)
+    return jsonify({
+        'query': q,
+        'page': page,
+        'has_more': has_more,
+        'results': [
+            dict(result._asdict(),
+                 name=str(result.name),
+                 snippet=str(result.snippet),
+                 url=url_for('main.trek_detail' if result.kind == 'trek' else 'main.travel_detail', slug=result.slug))
+            for result in results
+        ],
+    })
+
+# Price quotes
+# One quote (GET, used by the booking forms) or up to QUOTE_BATCH_SIZE of
+# them in one POST for resellers. Priced by the same tables as bookings, so
+# a quote for today is what booking it would cost.
+QUOTE_FIELDS = ('kind', 'item_id', 'date', 'number_of_people')
+
+@bp.route('/api/quote')
+def api_quote():
+    """Price of one booking: ?kind=trek|travel&item_id=&date=YYYY-MM-DD&number_of_people="""
+    tables = get_quote_tables()
+    kind = request.args.get('kind')
+    item_id = request.args.get('item_id', type=int)
+    people = request.args.get('number_of_people', 1, type=int)
+    for field, value in (('item_id', item_id), ('number_of_people', people)):
+        if value is not None and not INT64_MIN <= value <= INT64_MAX:
+            return api_error(400, f'{field} is out of range')
+    try:
+        unit_price, total_price = tables.quote_one(kind, item_id or 0, request.args.get('date', ''), people)
+    except QuoteError as e:
+        return api_error(404 if tables.rows([kind], [item_id or 0])[0] < 0 else 400, str(e))
+    return api_response({'data': {'kind': kind, 'item_id': item_id, 'date': request.args['date'],
+                                  'number_of_people': people, 'unit_price': unit_price,
+                                  'total_price': total_price}})
+
+@bp.route('/api/quote', methods=['POST'])
+@rate_limit('quote', 'ip')
+def api_quote_batch():
+    """Price many bookings at once.
+    
+    Body: {"quotes": [{"kind": "trek", "item_id": 1, "date": "YYYY-MM-DD",
+    "number_of_people": 2}, ...]}. Answers a quote, or its error, for each
+    one in the same order.
+    """
+    try:
+        body = api.decode(request.get_data(), request.mimetype)
+    except ValueError as e:
+        return api_error(400, str(e))
+    quotes = body.get('quotes') if isinstance(body, dict) else None
+    if not isinstance(quotes, list) or not all(isinstance(quote, dict) for quote in quotes):
+        return api_error(400, 'expected {"quotes": [{...}, ...]}')
+    if len(quotes) > current_app.config['QUOTE_BATCH_SIZE']:
+        return api_error(400, f"at most {current_app.config['QUOTE_BATCH_SIZE']} quotes per request")
+    
+    columns = {field: [quote.get(field) for quote in quotes] for field in QUOTE_FIELDS}
+    columns['number_of_people'] = [1 if people is None else people for people in columns['number_of_people']]
+    dates = [value if isinstance(value, str) else '' for value in columns['date']]
+    for field in ('item_id', 'number_of_people'):
+        # bool is an int subclass, but true isn't an id
+        if not all(type(value) is int and INT64_MIN <= value <= INT64_MAX for value in columns[field]):
+            return api_error(400, f'{field} must be a 64-bit whole number in every quote')
+    tables = get_quote_tables()
+    unit_prices, total_prices, errors = tables.quote(columns['kind'], columns['item_id'], dates,
+                                                     columns['number_of_people'])
+    data = []
+    for i, (unit_price, total_price, error) in enumerate(zip(unit_prices.tolist(), total_prices.tolist(),
+                                                             errors.tolist())):
+        quote = {field: columns[field][i] for field in QUOTE_FIELDS}
+        if error:
+            quote['error'] = tables.message(error)
+        else:
+            quote['unit_price'], quote['total_price'] = unit_price, total_price
+        data.append(quote)
+    return api_response({'data': data})
+
+# JSON API (v1)
+# The catalog and a member's bookings for the mobile app and resellers, as
+# JSON or MessagePack (?format= or Accept). Listings take the /treks and
+# /travel filters plus ?fields=, ?limit= and ?cursor=; catalog responses
+# are encoded once per URL and format and kept in the page cache, so a
+# repeat request costs a cache lookup and a matching ETag gets a 304.
+TREK_SUMMARY_FIELDS = ('id', 'slug', 'name', 'region', 'duration', 'difficulty', 'max_altitude',
+                       'price', 'image_url', 'updated_at')
+PACKAGE_SUMMARY_FIELDS = ('id', 'slug', 'name', 'destination', 'duration', 'package_type',
+                          'price', 'image_url', 'updated_at')
+API_BOOKING_MODELS = {'trek': Trek, 'travel': TravelPackage}
+
+def _iso_date(value):
+    """value as a date if it is a string that is exactly YYYY-MM-DD, else None"""
+    if isinstance(value, str) and len(value) == 10:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return None
+
+def _whole_number(value):
+    """True for a JSON integer that fits a 64-bit column (not true/false, though bool is an int subclass)"""
+    return type(value) is int and INT64_MIN <= value <= INT64_MAX
+
+def api_login_required(view):
+    """Like login_required, but answers 401 instead of redirecting to the login form"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return api_error(401, 'login required')
+        return view(*args, **kwargs)
+    return wrapper
+
+def _api_limit():
+    return min(max(request.args.get('limit', LISTING_PAGE_SIZE, type=int), 1), api.MAX_LIMIT)
+
+def _api_page(records, project, next_cursor):
+    next_url = None
+    if next_cursor:
+        args = dict(request.view_args, **request.args.to_dict())
+        args['cursor'] = next_cursor
+        next_url = url_for(request.endpoint, **args)
+    return {'data': [project(record) for record in records],
+            'next_cursor': next_cursor,
+            'links': {'next': next_url}}
+
+def cached_api_response(build):
+    """Serve build()'s payload for this URL and format from the page cache.
+    
+    build() returns the payload, or None for a missing resource, and may
+    raise api.FieldError for a bad ?fields=. Only catalog data may go into
+    the payload, since the entry is shared by every client.
+    """
+    mimetype = api.negotiate(request.accept_mimetypes, request.args.get('format'))
+    if mimetype is None:
+        return api_response(None)
+    
+    key = ('api', request.endpoint, tuple(sorted(request.view_args.items())),
+           tuple(sorted(request.args.items(multi=True))), mimetype)
+    page = page_cache.get(key)
+    if page is None:
+        version = page_cache.version
+        try:
+            payload = build()
+        except api.FieldError as e:
+            return api_error(400, str(e))
+        if payload is None:
+            return api_error(404, 'not found')
+        body = api.encode(payload, mimetype)
+        page = CachedPage(body=body, etag=hashlib.sha1(body).hexdigest(), last_modified=None, mimetype=mimetype)
+        page_cache.set(key, page, version=version)
+    
+    response = current_app.response_class(page.body, mimetype=page.mimetype)
+    response.set_etag(page.etag)
+    response.vary.add('Accept')
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@bp.route('/api/v1/treks')
+def api_treks():
+    """Treks matching the /treks filters, one cursor page at a time"""
+    def build():
+        fields = api.parse_fields(request.args.get('fields'), TrekSnapshot._fields, TREK_SUMMARY_FIELDS)
+        page = list_treks(parse_trek_filters(request.args), cursor=request.args.get('cursor'), limit=_api_limit())
+        return _api_page(page.items, api.projector(TrekSnapshot._fields, fields), page.next_cursor)
+    return cached_api_response(build)
+
+@bp.route('/api/v1/treks/<slug>')
+def api_trek(slug):
+    def build():
+        trek = get_trek_by_slug(slug)
+        if trek is None:
+            return None
+        fields = api.parse_fields(request.args.get('fields'), TrekSnapshot._fields, TrekSnapshot._fields)
+        return {'data': api.projector(TrekSnapshot._fields, fields)(trek)}
+    return cached_api_response(build)
+
+@bp.route('/api/v1/packages')
+def api_packages():
+    """Travel packages matching the /travel filters, one cursor page at a time"""
+    def build():
+        fields = api.parse_fields(request.args.get('fields'), PackageSnapshot._fields, PACKAGE_SUMMARY_FIELDS)
+        page = list_packages(parse_package_filters(request.args), cursor=request.args.get('cursor'),
+                             limit=_api_limit())
+        return _api_page(page.items, api.projector(PackageSnapshot._fields, fields), page.next_cursor)
+    return cached_api_response(build)
+
+@bp.route('/api/v1/packages/<slug>')
+def api_package(slug):
+    def build():
+        package = get_package_by_slug(slug)
+        if package is None:
+            return None
+        fields = api.parse_fields(request.args.get('fields'), PackageSnapshot._fields, PackageSnapshot._fields)
+        return {'data': api.projector(PackageSnapshot._fields, fields)(package)}
+    return cached_api_response(build)
+
+@bp.route('/api/v1/bookings')
+@api_login_required
+def api_bookings():
+    """The member's trek and travel bookings, newest date first (?status= and ?archived=1 as on the dashboard)"""
+    try:
+        fields = api.parse_fields(request.args.get('fields'), TimelineEntry._fields, TimelineEntry._fields)
+    except api.FieldError as e:
+        return api_error(400, str(e))
+    entries, next_cursor = booking_timeline(current_user.id, status=request.args.get('status'),
+                                            cursor=request.args.get('cursor'), limit=_api_limit(),
+                                            archived=request.args.get('archived') == '1')
+    response = api_response(_api_page(entries, api.projector(TimelineEntry._fields, fields), next_cursor))
+    response.add_etag()
+    response.vary.add('Cookie')
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@bp.route('/api/v1/bookings', methods=['POST'])
+@api_login_required
+@rate_limit('booking', 'user', 'ip')
+def api_create_booking():
+    """Book a trek or travel package.
+    
+    Body: {"kind": "trek" | "travel", "item_id": 1, "date": "YYYY-MM-DD",
+    "number_of_people": 2, "special_requests": "..." (treks only)}
+    """
+    try:
+        body = api.decode(request.get_data(), request.mimetype)
+    except ValueError as e:
+        return api_error(400, str(e))
+    if not isinstance(body, dict):
+        return api_error(400, 'expected an object')
+    
+    kind = body.get('kind')
+    if kind not in API_BOOKING_MODELS:
+        return api_error(400, "kind must be 'trek' or 'travel'")
+    item_id = body.get('item_id')
+    if not _whole_number(item_id):
+        return api_error(400, 'item_id must be a 64-bit whole number')
+    people = body.get('number_of_people', 1)
+    if not _whole_number(people):
+        return api_error(400, 'number_of_people must be a 64-bit whole number')
+    if people < 1:
+        return api_error(400, 'number_of_people must be at least 1')
+    departure_date = _iso_date(body.get('date'))
+    if departure_date is None:
+        return api_error(400, 'date must be YYYY-MM-DD')
+    item = db.session.get(API_BOOKING_MODELS[kind], item_id)
+    if item is None:
+        return api_error(404, f'no {kind} with item_id {item_id}')
+    special_requests = body.get('special_requests') if kind == 'trek' else None
+    if special_requests is not None and not isinstance(special_requests, str):
+        return api_error(400, 'special_requests must be text')
+    
+    # Read before the commit expires them
+    item_name, item_slug = item.name, item.slug
+    try:
+        booking = create_booking(kind, item, departure_date, people, current_user.id, special_requests)
+    except SeatsUnavailable as exc:
+        return api_error(409, f'only {exc.available} seats are left on {departure_date:%Y-%m-%d}',
+                         available=exc.available)
+    except QuoteError as exc:
+        return api_error(400, str(exc))
+    entry = TimelineEntry(kind, booking.id, departure_date, booking.booking_date, item_name, item_slug,
+                          booking.number_of_people, booking.total_price, booking.status)
+    return api_response({'data': entry._asdict()}, 201)
+
+@bp.route('/internal/cache-stats')
+@internal_only('METRICS_ALLOWED_IPS', 'METRICS_TOKEN')
+def cache_stats():
+    """Catalog, page and user cache counters for this worker"""
+    return jsonify({'catalog': catalog_cache.stats(), 'pages': page_cache.stats(), 'users': user_cache.stats()})
+
+@bp.route('/internal/reports/bookings')
+@internal_only('REPORTS_ALLOWED_IPS', 'REPORTS_TOKEN')
+def booking_report_json():
+    """Booking totals from the rollups: ?group=trek|package|region|month&kind=&from=YYYY-MM&to=YYYY-MM"""
+    report_args = parse_report_args(request.args)
+    if report_args is None:
+        return api_error(400, 'group must be one of ' + ', '.join(REPORT_GROUPS) +
+                         "; kind trek or travel; from/to as YYYY-MM")
+    group, kind, start, end = report_args
+    return api_response({'group': group, 'kind': kind, 'from': start, 'to': end,
+                         'data': booking_report(group, kind, start, end)})
+
+@bp.route('/internal/reports/bookings.csv')
+@internal_only('REPORTS_ALLOWED_IPS', 'REPORTS_TOKEN')
+def booking_report_csv():
+    """The same report as a CSV download"""
+    report_args = parse_report_args(request.args)
+    if report_args is None:
+        abort(400)
+    stream = io.StringIO()
+    catalog_io.write_rows(stream, 'csv', REPORT_FIELDS,
+                          ([line[field] for field in REPORT_FIELDS] for line in booking_report(*report_args)))
+    response = current_app.response_class(stream.getvalue(), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="bookings-by-{report_args[0]}.csv"'
+    return response
+
+@bp.route('/metrics')
+@internal_only('METRICS_ALLOWED_IPS', 'METRICS_TOKEN')
+def prometheus_metrics():
+    """Request timing histograms for this worker in Prometheus text format"""
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    return current_app.response_class(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/cancel-travel-booking/<int:booking_id>')
+@login_required
+def cancel_travel_booking(booking_id):
+    """Cancel a travel booking"""
+    booking = TravelBooking.query.get_or_404(booking_id)
+    
+    # Ensure user can only cancel their own bookings
+    if booking.user_id != current_user.id:
+        flash('Unauthorized action', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    cancel_reservation('travel', booking)
+    
+    flash('Travel booking cancelled successfully', 'success')
+    return redirect(url_for('main.dashboard'))
@@ -0,0 +1,346 @@
+# web.py - Request-side helpers shared by the views
+
+# Page and fragment caching, responsive images and bundled assets, streamed
+# pages, rate limiting, the logged-in user cache and JSON API responses.
+# init_app() registers the template globals, the static file view and the
+# response hooks on an app.
+
+from collections import namedtuple
+from datetime import datetime
+from functools import wraps
+import hashlib
+import hmac
+import mimetypes
+import os
+
+from flask import (abort, current_app, g, get_flashed_messages, make_response, render_template, request,
+                   send_from_directory, session, stream_template, url_for)
+from flask_login import UserMixin, current_user
+from markupsafe import Markup
+from sqlalchemy import event
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import api
+import assets
+import compression
+import images
+import metrics
+import ratelimit
+from extensions import app_object, db, login_manager, page_cache, rate_buckets, user_cache
+from instrumentation import metrics_registry
+from models import User
+
+# Rendered page cache
+# Anonymous visitors all get the same HTML for catalog and static pages, so
+# those responses are kept fully rendered with a strong ETag. A conditional
+# GET that matches is answered with 304 straight from the cache.
+CachedPage = namedtuple('CachedPage', ['body', 'etag', 'last_modified', 'mimetype'])
+
+def _page_cacheable():
+    """Only anonymous GETs with no pending flash messages share a rendering"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if '_flashes' in session:
+        return False
+    return not current_user.is_authenticated
+
+def template_mtime(*names):
+    """When the newest of the named templates changed (a cached_page last_modified)"""
+    paths = [os.path.join(current_app.root_path, current_app.template_folder, name) for name in names]
+    return datetime.utcfromtimestamp(max(os.path.getmtime(path) for path in paths))
+
+def catalog_last_modified(item):
+    """When a trek or package snapshot last changed (a cached_page last_modified)"""
+    return item.updated_at or item.created_at
+
+def cached_page(last_modified=None):
+    """Serve a view from the page cache for anonymous visitors.
+    
+    last_modified is called with the view arguments and returns the datetime
+    the page content last changed. Cached views must not read request.args,
+    since the query string is not part of the cache key.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if not _page_cacheable():
+                return view(**kwargs)
+            
+            key = (request.endpoint, tuple(sorted(kwargs.items())))
+            page = page_cache.get(key)
+            if page is None:
+                version = page_cache.version
+                response = make_response(view(**kwargs))
+                # Don't share anything that is an error, sets cookies or flashed
+                if response.status_code != 200 or session.modified or 'Set-Cookie' in response.headers:
+                    return response
+                body = response.get_data()
+                page = CachedPage(
+                    body=body,
+                    etag=hashlib.sha1(body).hexdigest(),
+                    last_modified=last_modified(**kwargs) if last_modified else datetime.utcnow(),
+                    mimetype=response.mimetype,
+                )
+                page_cache.set(key, page, version=version)
+            
+            response = current_app.response_class(page.body, mimetype=page.mimetype)
+            response.set_etag(page.etag)
+            if page.last_modified:
+                response.last_modified = page.last_modified
+            # Logged-in visitors get different HTML at the same URL
+            response.vary.add('Cookie')
+            response.cache_control.public = True
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+def cached_fragment(*key, caller):
+    """Cache a rendered template block: {% call cached_fragment('name', id) %}...{% endcall %}
+    
+    Fragments are shared by every visitor, including logged-in ones, so the
+    block must only depend on catalog data named in the key.
+    """
+    return page_cache.get_or_load(('fragment',) + key, lambda: Markup(caller()))
+
+# Responsive images
+# Derivatives built by `flask build-images` live under static/images/derived
+# with content-hashed names, so they never change at a given URL
+IMAGE_DERIVED_DIR = 'images/derived'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+image_manifest = app_object('image_manifest')
+
+def responsive_image(src, sizes='100vw', lazy=True, **attrs):
+    """<picture> for a static image with AVIF/WebP/JPEG srcsets at every built width.
+    
+    sizes is the CSS width the image is shown at, e.g. '(min-width: 768px) 33vw, 100vw'.
+    Any other keyword (alt, class, style, onerror) becomes an <img> attribute.
+    Images without derivatives, including external URLs, render as a plain <img>.
+    """
+    if lazy:
+        attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    prefix = current_app.static_url_path + '/'
+    entry = image_manifest.get(src[len(prefix):]) if src and src.startswith(prefix) else None
+    return images.picture_markup(entry, src, lambda path: prefix + path, sizes, attrs)
+
+# Bundled CSS/JS
+# `flask build-assets` writes one hashed stylesheet and script to static/dist,
+# each with .gz and .br copies picked by the static view below
+ASSET_DIR = 'dist'
+asset_manifest = app_object('asset_manifest')
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+def asset_url(bundle):
+    """URL of a built bundle ('app.css', 'app.js'), or None if assets were never built"""
+    path = asset_manifest.get(bundle)
+    return url_for('static', filename=path) if path else None
+
+def static_file(filename):
+    """Flask's static view, serving built assets' .br/.gz copies when accepted"""
+    if not filename.startswith(ASSET_DIR + '/'):
+        return current_app.send_static_file(filename)
+    for encoding, suffix in PRECOMPRESSED:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(current_app.static_folder, filename + suffix)):
+            response = send_from_directory(current_app.static_folder, filename + suffix,
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.content_encoding = encoding
+            break
+    else:
+        response = current_app.send_static_file(filename)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _cache_immutable_static(response):
+    """Far-future caching for content-hashed images and bundles (not their manifests)"""
+    filename = request.view_args.get('filename', '') if request.endpoint == 'static' else ''
+    if (filename.startswith((IMAGE_DERIVED_DIR + '/', ASSET_DIR + '/')) and not filename.endswith('.json')
+            and response.status_code in (200, 304)):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+# Streamed pages and response compression
+# Listing and dashboard pages are rendered as they are sent: base.html marks
+# the end of the page head with stream_flush(), which goes out as its own
+# chunk, and the rest follows in STREAM_CHUNK_SIZE pieces, so the whole page
+# is never held in memory. Text responses are compressed chunk by chunk on
+# the way out (compression.py). A streamed page has sent 200 once its first
+# chunk is out and can't turn into an error page after that, so the page's
+# loaders (the load_* callables its template calls) run before the response
+# is returned; their errors get the usual error response.
+def stream_flush():
+    """Send what has been rendered so far as its own chunk (a no-op when not streaming)"""
+    flushes = g.get('_stream_flushes')
+    if flushes is not None:
+        flushes.append(True)
+    return ''
+
+def _stream_chunks(parts, size, flushes):
+    # flushes is checked for every template fragment, so it's a plain list rather than g
+    buffer, buffered = [], 0
+    try:
+        for part in parts:
+            buffer.append(part)
+            buffered += len(part)
+            if buffered >= size or flushes:
+                yield ''.join(buffer)
+                buffer, buffered = [], 0
+                flushes.clear()
+        if buffer:
+            yield ''.join(buffer)
+    finally:
+        stats = metrics.current_stats.get()
+        if stats is not None:
+            stats.finish_render()
+        parts.close()
+
+def stream_page(template_name, **context):
+    """render_template's streaming counterpart for large pages (STREAM_TEMPLATES=0 renders in one piece)"""
+    if not current_app.config['STREAM_TEMPLATES']:
+        return render_template(template_name, **context)
+    # The session cookie is written with the headers, so flashed messages must be taken now
+    get_flashed_messages()
+    for name, loader in context.items():
+        if name.startswith('load_'):
+            context[name] = (lambda result: lambda: result)(loader())
+    flushes = g._stream_flushes = []
+    chunks = _stream_chunks(stream_template(template_name, **context), current_app.config['STREAM_CHUNK_SIZE'], flushes)
+    return current_app.response_class(chunks, mimetype='text/html')
+
+# Rate limiting
+# POSTs that cost a password hash, a booking or an email are limited per
+# client IP, username or user with token buckets in a memory-mapped file
+# (ratelimit.py), so the limits hold across every worker on the host.
+# Refused requests get 429 and Retry-After before any real work is done.
+rate_limited_total = metrics_registry.counter(
+    'http_rate_limited_total', 'Requests refused by a rate limit', labels=('limit',))
+
+# key name -> the value requests are counted by (None: not limited on that key)
+# remote_addr is the client's address: behind TRUSTED_PROXIES reverse proxies
+# init_app() has ProxyFix take it from X-Forwarded-For instead of the proxy's
+RATE_LIMIT_KEYS = {
+    'ip': lambda: request.remote_addr,
+    'username': lambda: (request.form.get('username') or '').strip().lower() or None,
+    'user': lambda: str(current_user.id) if current_user.is_authenticated else None,
+}
+
+def check_rate_limits(name, keys):
+    """Seconds until the request's buckets for limit `name` all have a token; 0.0 to go ahead"""
+    wait = 0.0
+    for key in keys:
+        rate = current_app.config['RATE_LIMITS'].get(f'{name}.{key}')
+        value = RATE_LIMIT_KEYS[key]() if rate else None
+        if value is not None:
+            wait = max(wait, rate_buckets.take(f'{name}.{key}:{value}', rate))
+    return wait
+
+def rate_limit(name, *keys, methods=('POST',)):
+    """Limit a view's requests by each of keys (names in RATE_LIMIT_KEYS) under RATE_LIMITS[name.key]"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if current_app.config['RATE_LIMIT_ENABLED'] and request.method in methods:
+                wait = check_rate_limits(name, keys)
+                if wait:
+                    rate_limited_total.inc(name)
+                    retry_after = ratelimit.retry_after_header(wait)
+                    if request.path.startswith('/api/'):
+                        response = api_error(429, 'too many requests', retry_after=int(retry_after))
+                    else:
+                        response = make_response(render_template('rate_limited.html', retry_after=int(retry_after)), 429)
+                    response.headers['Retry-After'] = retry_after
+                    return response
+            return view(**kwargs)
+        return wrapper
+    return decorator
+
+# Internal pages
+# Reports and operational data are served to the app's operators only: the
+# request must come from an allowed address and carry the configured token
+# as `Authorization: Bearer <token>`. Without a token they are not served.
+def internal_only(ips_setting, token_setting):
+    """404 a view's requests unless from config[ips_setting] with config[token_setting] as bearer token"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            token = current_app.config[token_setting]
+            supplied = request.headers.get('Authorization', '')
+            if (not token or request.remote_addr not in current_app.config[ips_setting]
+                    or not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())):
+                abort(404)
+            return view(**kwargs)
+        return wrapper
+    return decorator
+
+# Logged-in user cache
+# Every authenticated request loads its user; most pages only need the name
+# in the navbar, so a read-only projection is cached per worker
+
+class CachedUser(UserMixin, namedtuple('CachedUser', ['id', 'username', 'email', 'full_name', 'phone', 'created_at'])):
+    """Read-only stand-in for User used as current_user (no password hash)"""
+    __slots__ = ()
+
+def _user_projection(user):
+    if user is None:
+        return None
+    return CachedUser(*(getattr(user, field) for field in CachedUser._fields))
+
+@event.listens_for(db.session, 'after_flush')
+def _track_user_writes(session, flush_context):
+    """Remember which users a flush created, changed or deleted"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            session.info.setdefault('dirty_user_ids', set()).add(obj.id)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_users_on_commit(session):
+    for user_id in session.info.pop('dirty_user_ids', ()):
+        user_cache.discard(user_id)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_user_writes(session):
+    session.info.pop('dirty_user_ids', None)
+
+@login_manager.user_loader
+def load_user(user_id):
+    try:
+        user_id = int(user_id)
+    except ValueError:
+        return None
+    return user_cache.get_or_load(user_id, lambda: _user_projection(db.session.get(User, user_id)))
+
+# JSON API responses
+def api_response(payload, status=200, mimetype=None):
+    """Encode payload in the negotiated format (406 if the client asked for one we lack)"""
+    mimetype = mimetype or api.negotiate(request.accept_mimetypes, request.args.get('format'))
+    if mimetype is None:
+        mimetype, status = api.JSON, 406
+        payload = {'error': 'unsupported format; use one of: ' + ', '.join(api.available_mimetypes())}
+    response = current_app.response_class(api.encode(payload, mimetype), status=status, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
+def api_error(status, message, **extra):
+    return api_response(dict(extra, error=message), status)
+
+
+def init_app(app):
+    app.extensions['image_manifest'] = images.ImageManifest(
+        os.path.join(app.static_folder, IMAGE_DERIVED_DIR, 'manifest.json'))
+    app.extensions['asset_manifest'] = assets.AssetManifest(os.path.join(app.static_folder, ASSET_DIR, 'manifest.json'))
+    for function in (cached_fragment, responsive_image, asset_url, stream_flush):
+        app.add_template_global(function)
+    app.view_functions['static'] = static_file
+    app.after_request(_cache_immutable_static)
+    if app.config['COMPRESSION_ENABLED']:
+        app.wsgi_app = compression.CompressionMiddleware(app.wsgi_app,
+                                                         min_size=app.config['COMPRESSION_MIN_SIZE'],
+                                                         brotli_quality=app.config['COMPRESSION_BROTLI_QUALITY'],
+                                                         gzip_level=app.config['COMPRESSION_GZIP_LEVEL'])
+    if app.config['TRUSTED_PROXIES']:
+        # Outermost, so everything below sees the client's address and scheme
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'],
+                                x_proto=app.config['TRUSTED_PROXIES'])
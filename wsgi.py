@@ -0,0 +1,50 @@
+# wsgi.py - WSGI entry point for production servers
+
+# `gunicorn wsgi:app` (settings in gunicorn.conf.py) or any other WSGI server.
+# With a preforking server the app is built once in the master: warm_up()
+# then compiles every template and fills the catalog cache there, so the
+# forked workers start with all of it and share those pages copy-on-write
+# instead of each paying for its own. Database connections are never
+# carried across fork: warm_up() closes them, reopen_connections() makes a
+# worker's pools forget any the parent still holds.
+
+import time
+
+from app import create_app
+from catalog import (get_featured_treks, get_quote_tables, list_packages, list_treks, package_facets,
+                     parse_package_filters, parse_trek_filters, sync_catalog_version, trek_facets)
+from extensions import catalog_session, db
+
+app = create_app()
+
+
+def warm_up(app):
+    """Compile templates and prime the catalog cache; returns the seconds it took"""
+    started = time.perf_counter()
+    with app.app_context():
+        # The catalog version the workers' caches start at, read before they are filled
+        sync_catalog_version(max_age=0)
+        for name in app.jinja_env.list_templates():
+            if name.endswith('.html'):
+                app.jinja_env.get_template(name)
+        # What the home page and the unfiltered listings show, i.e. most anonymous traffic
+        get_featured_treks(3)
+        for parse, load, facets in ((parse_trek_filters, list_treks, trek_facets),
+                                    (parse_package_filters, list_packages, package_facets)):
+            filters = parse({})
+            load(filters)
+            facets(filters)
+        # The booking forms' totals and every booking are priced from these
+        get_quote_tables()
+        catalog_session.remove()
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    return time.perf_counter() - started
+
+
+def reopen_connections(app):
+    """In a forked worker: drop pooled connections inherited from the parent without closing them"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)